@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import data_processing
+from data_processing import CSV_ENGINES, FILES, dataset_file_path, read_dataset_file, setup
+from synthetic import write_synthetic_dataset
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def benchmark(name, datasetdir, repeat):
+    print(f"--> {name.upper()} DATASET ({datasetdir})")
+    heading = f" {'engine':10}|{'read files (s)':>16} |{'setup (s)':>11} |{'identical':>10}"
+    print(heading)
+    print('-' * len(heading))
+
+    reference = None
+    for engine in CSV_ENGINES:
+        # parsing of the files alone
+        read_time, _ = best_time(lambda: [read_dataset_file(
+            dataset_file_path(datasetdir, fi), engine) for fi in FILES], repeat)
+
+        # the whole setup, whose resulting frame must not depend on the engine
+        setup_time, _ = best_time(
+            lambda: setup(datasetdir, engine=engine), 1)
+        frame = data_processing.df
+        if reference is None:
+            reference, identical = frame, '-'
+        else:
+            pd.testing.assert_frame_equal(reference, frame)
+            identical = 'yes'
+
+        print(f" {engine:10}|{read_time:16.3f} |{setup_time:11.3f} |{identical:>10}")
+    print()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Compare the engines used to parse the dataset files.')
+    parser.add_argument(
+        'dataset_path',
+        metavar='DATASET PATH',
+        nargs='?',
+        help='path to where the real dataset files are (optional)'
+    )
+    parser.add_argument('--days', type=int, default=60,
+                        help='days of data in each synthetic file (default: 60)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of times the files are read (default: 3)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    with tempfile.TemporaryDirectory() as synthetic_path:
+        write_synthetic_dataset(synthetic_path, days=args.days)
+        benchmark('synthetic', synthetic_path, args.repeat)
+
+    if args.dataset_path:
+        benchmark('real', args.dataset_path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
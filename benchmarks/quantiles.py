@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import data_processing
+from data_processing import SKETCH_BIN_WIDTHS, histogram_quantiles, is_various, merged_histograms, setup
+from synthetic import write_synthetic_dataset
+
+# quantiles compared with the exact ones
+QUANTILES = [.01, .1, .25, .5, .75, .9, .99]
+
+# groups of hourly buckets, as attributes of their dates
+GROUPS = {
+    'hour': ['hour'],
+    'day of week x hour': ['dayofweek', 'hour'],
+}
+
+
+def exact_quantiles(variable, by, interpolation='linear'):
+    readings = data_processing.df[is_various]
+    dates = readings.index.floor('h')
+    keys = [getattr(dates, attribute).rename(attribute) for attribute in by]
+    return readings[variable].groupby(keys).quantile(
+        QUANTILES, interpolation=interpolation).unstack()
+
+
+def compare_quantiles(variable):
+    width = SKETCH_BIN_WIDTHS[variable]
+    heading = f" {'group':20}|{'exact (s)':>10} |{'sketch (s)':>11} |{'max error':>10} |{'bin width':>10}"
+    print(heading)
+    print('-' * len(heading))
+
+    for name, by in GROUPS.items():
+        start = time.perf_counter()
+        exact = exact_quantiles(variable, by)
+        exact_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sketch = histogram_quantiles(merged_histograms(variable, by), variable, QUANTILES)
+        sketch_time = time.perf_counter() - start
+
+        error = (sketch - exact).abs().to_numpy().max()
+        print(f" {name:20}|{exact_time:10.3f} |{sketch_time:11.3f} |{error:10.3f} |{width:10.3f}")
+    print()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Compare the quantiles of the histogram sketches with the exact quantiles.')
+    parser.add_argument(
+        'dataset_path',
+        metavar='DATASET PATH',
+        nargs='?',
+        help='path to where the real dataset files are (optional, a synthetic dataset is used otherwise)'
+    )
+    parser.add_argument('--days', type=int, default=60,
+                        help='days of data in each synthetic file (default: 60)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    with tempfile.TemporaryDirectory() as synthetic_path:
+        if args.dataset_path is None:
+            write_synthetic_dataset(synthetic_path, days=args.days)
+        setup(args.dataset_path or synthetic_path)
+
+    # the histograms are built with the pyramid, once, before any timing
+    data_processing.get_pyramid()
+
+    for variable in SKETCH_BIN_WIDTHS:
+        print(f"--> {variable.upper()} QUANTILES {QUANTILES}")
+        compare_quantiles(variable)
+
+
+if __name__ == "__main__":
+    main()
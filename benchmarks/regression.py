@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import data_processing
+from data_processing import build_pyramid, setup
+from synthetic import write_synthetic_dataset
+import plot
+from charts import coverage_timeline, device_battery_by_day, raw_signals
+
+# directory of the scripts
+PACKAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# stored results the runs are compared with
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# fixed synthetic dataset the pipeline runs on, small enough for a laptop
+# (the rolling charts need more than 30 days)
+REGRESSION_DATASET = {'days': 45, 'entries_per_day': 200, 'seed': 0}
+
+# largest increase (as a share of the baseline) of the time and of the peak
+# memory of a stage before it is a regression, and the increase always allowed
+# (short stages vary by more than their share between runs)
+TIME_TOLERANCE = .5
+MEMORY_TOLERANCE = .25
+TIME_SLACK = .05
+MEMORY_SLACK = 1
+
+# functions describing the dataset, measured on their own
+INFORMATION_FUNCTIONS = ['general_information_by_tenant', 'information_state_message', 'information_feedback_message',
+                         'information_temp_humid_press_message', 'information_door_message',
+                         'information_movement_message', 'information_meteorology_message']
+
+# code run in a new process for each script, reporting its peak resident memory
+# (in MB) to the file given as the first argument; on Linux it is read from
+# /proc, since getrusage() keeps the peak of the process that started it
+SCRIPT_RUNNER = '''
+import os, runpy, sys
+report = sys.argv.pop(1)
+sys.argv = sys.argv[1:]
+sys.path.insert(0, os.path.dirname(os.path.abspath(sys.argv[0])))
+runpy.run_path(sys.argv[0], run_name='__main__')
+peak = None
+try:
+    with open('/proc/self/status') as f:
+        peak = next(int(line.split()[1]) / 2**10 for line in f if line.startswith('VmHWM:'))
+except OSError:
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == 'darwin' else 2**10)
+    except ImportError:
+        pass
+with open(report, 'w') as f:
+    f.write(str(peak))
+'''
+
+
+def pipeline_stages():
+    # stages measured inside this process, in the order the scripts run them, in the format
+    #   (name, function)
+    # (the pyramid is built again at every run, instead of being taken from the cache)
+    stages = [('pyramid', lambda: setattr(data_processing, 'pyramid', build_pyramid()))]
+    charts = plot.TENANT_CHARTS + plot.DOOR_CHARTS + plot.METEO_CHARTS + plot.CORRELATION_CHARTS + plot.TREND_CHARTS
+    stages += [(f'chart {file_name}', lambda chart=chart, kwargs=kwargs: chart(**kwargs))
+               for file_name, chart, kwargs in charts]
+    stages += [('chart coverage-timeline.pdf', coverage_timeline),
+               ('chart raw-signals', lambda: raw_signals(data_processing.FILES[0])),
+               ('chart device-battery-by-day.pdf', device_battery_by_day)]
+    stages += [(f'information {name}', getattr(data_processing, name)) for name in INFORMATION_FUNCTIONS]
+    return stages
+
+
+def measure(function, repeat):
+    # best time of the runs, and the peak memory (MB) allocated during one
+    # more run traced on its own (tracing slows the run down)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+        plt.close('all')
+
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    plt.close('all')
+    return {'time': min(times), 'memory': peak}
+
+
+def measure_script(arguments, repeat):
+    # best time of the runs of a script, in a new process each time
+    times, peak = [], None
+    with tempfile.TemporaryDirectory() as report_path:
+        report = os.path.join(report_path, 'peak')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', SCRIPT_RUNNER, report] + arguments, check=True,
+                           cwd=PACKAGE_PATH, stdout=subprocess.DEVNULL, env={**os.environ, 'MPLBACKEND': 'Agg'})
+            times.append(time.perf_counter() - start)
+            with open(report) as f:
+                reported = f.read()
+            peak = None if reported == 'None' else float(reported)
+    return {'time': min(times), 'memory': peak}
+
+
+def run_pipeline(repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as dataset_path:
+        write_synthetic_dataset(dataset_path, **REGRESSION_DATASET)
+
+        # setup() is measured first, and then run once more so that every stage starts from a new dataset
+        results['setup'] = measure(lambda: setup(dataset_path), repeat)
+        setup(dataset_path)
+        for name, function in pipeline_stages():
+            results[name] = measure(function, repeat)
+            print(f"{name:70}{results[name]['time']:8.3f}s", file=sys.stderr)
+
+        with tempfile.TemporaryDirectory() as images_path:
+            results['script plot.py'] = measure_script(
+                [os.path.join(PACKAGE_PATH, 'plot.py'), dataset_path, images_path], repeat)
+        results['script data.py'] = measure_script(
+            [os.path.join(PACKAGE_PATH, 'data.py'), dataset_path], repeat)
+    return results
+
+
+def environment():
+    # versions and machine the results were measured with
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'system': platform.system(),
+        'cpus': os.cpu_count()
+    }
+
+
+def compare(baseline, results, time_tolerance, memory_tolerance):
+    # stages slower or using more memory than the baseline allows
+    heading = (f" {'stage':64}|{'time (s)':>10} |{'baseline':>10} |{'change':>8} |"
+               f"{'memory (MB)':>12} |{'baseline':>10} |{'change':>8} | status")
+    print(heading)
+    print('-' * len(heading))
+
+    def change(now, before): return f'{now / before - 1:+8.0%}' if before else f"{'-':>8}"
+
+    regressions = []
+    for stage, result in results.items():
+        before = baseline['stages'].get(stage)
+        if before is None:
+            print(f" {stage:64}|{result['time']:10.3f} |{'-':>10} |{'-':>8} |"
+                  f"{result['memory'] or float('nan'):12.1f} |{'-':>10} |{'-':>8} | new")
+            continue
+
+        problems = []
+        if result['time'] > before['time'] * (1 + time_tolerance) + TIME_SLACK:
+            problems.append('slower')
+        if result['memory'] is not None and before['memory'] is not None and \
+                result['memory'] > before['memory'] * (1 + memory_tolerance) + MEMORY_SLACK:
+            problems.append('more memory')
+        if problems:
+            regressions.append(stage)
+
+        print(f" {stage:64}|{result['time']:10.3f} |{before['time']:10.3f} |{change(result['time'], before['time'])} |"
+              f"{result['memory'] or float('nan'):12.1f} |{before['memory'] or float('nan'):10.1f} |"
+              f"{change(result['memory'] or 0, before['memory'])} | {', '.join(problems) or 'ok'}")
+
+    missing = [stage for stage in baseline['stages'] if stage not in results]
+    for stage in missing:
+        print(f" {stage:64}| missing from this run")
+    return regressions
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Compare the time and peak memory of each stage of the pipeline with a stored baseline.')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='file with the stored results (default: benchmarks/baseline.json)')
+    parser.add_argument('--update', action='store_true',
+                        help='store the results of this run as the baseline instead of comparing them')
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE,
+                        help=f'largest increase of the time of a stage, as a share (default: {TIME_TOLERANCE})')
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE,
+                        help=f'largest increase of the peak memory of a stage, as a share (default: {MEMORY_TOLERANCE})')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of runs of each stage, keeping the fastest (default: 3)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    results = run_pipeline(args.repeat)
+
+    if args.update:
+        with open(args.baseline, 'w') as f:
+            json.dump({'environment': environment(), 'dataset': REGRESSION_DATASET, 'stages': results}, f, indent=2)
+        print(f"stored the results of {len(results)} stages in '{args.baseline}'")
+        return
+
+    if not os.path.exists(args.baseline):
+        sys.exit(f"'{args.baseline}' does not exist: store a baseline first with --update")
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    # the times only compare on the same machine and dataset
+    if baseline['dataset'] != REGRESSION_DATASET:
+        sys.exit(f"the baseline was measured on another dataset ({baseline['dataset']}): store it again with --update")
+    for key, value in environment().items():
+        if baseline['environment'].get(key) != value:
+            print(f"{key}: {baseline['environment'].get(key)} in the baseline, {value} now")
+    print()
+
+    regressions = compare(baseline, results, args.time_tolerance, args.memory_tolerance)
+    print()
+    if regressions:
+        sys.exit(f"{len(regressions)} stages regressed: {', '.join(regressions)}")
+    print('no stage regressed')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from data_processing import DEFAULT_FILES
+
+# share of the entries of each type of message, in the format
+#   sensor type -> probability
+MESSAGE_TYPES = {
+    'various': .40,
+    'movement': .30,
+    'door': .15,
+    'meteo': .10,
+    'system': .03,
+    'feedback': .02,
+}
+
+
+def sensor_payload(rng, sensor, hour):
+    # fields common to the zigbee devices
+    device = {
+        'linkquality': int(rng.integers(20, 160)),
+        'battery': int(rng.integers(40, 101)),
+        'voltage': int(rng.integers(2900, 3100))
+    }
+
+    if sensor == 'various':
+        return {'device': 'temperature', 'temperature': round(19 + 2.5 * np.sin((hour - 9) / 24 * 2 * np.pi) + rng.normal(0, .8), 2),
+                'humidity': round(55 + rng.normal(0, 6), 2), 'pressure': round(1013 + rng.normal(0, 4), 1), **device}
+    if sensor == 'movement':
+        payload = {'device': 'movement',
+                   'illuminance': int(rng.integers(0, 600)), **device}
+        # some motion messages only report the illuminance
+        if rng.random() < .8:
+            payload['occupancy'] = bool(rng.random() < .3 + .5 * (7 <= hour <= 23))
+        return payload
+    if sensor == 'door':
+        return {'device': 'door', 'contact': bool(rng.random() < .6), **device}
+    if sensor == 'meteo':
+        payload = {'description': 'clear sky', 'temperature': round(13 + rng.normal(0, 5), 2), 'humidity': round(72 + rng.normal(0, 8), 1),
+                   'pressure': int(1015 + rng.normal(0, 5)), 'windspeed': round(rng.uniform(0, 12), 1), 'precipitation': round(max(rng.normal(0, .5), 0), 1)}
+        if rng.random() < .9:
+            payload['winddirection'] = str(rng.choice(['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']))
+        return payload
+    if sensor == 'system':
+        return {'device': str(rng.choice(['feedback', 'status'])), 'state': str(rng.choice(['on', 'off', 'away']))}
+    return {'device': 'feedback', 'feedback': str(rng.choice(['hot', 'cold', 'comfortable']))}
+
+
+def write_synthetic_dataset(path, days=30, entries_per_day=500, seed=0, start='2019-03-01', files=DEFAULT_FILES, resent=0):
+    os.makedirs(path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    for fi in files:
+        # timestamps spread over the whole period, in increasing order
+        n = days * entries_per_day
+        seconds = np.sort(rng.integers(0, days * 24 * 60 * 60, n))
+        dates = pd.Timestamp(start) + pd.to_timedelta(seconds, unit='s')
+
+        sensors = rng.choice(list(MESSAGE_TYPES), n,
+                             p=list(MESSAGE_TYPES.values()))
+        info = [json.dumps(sensor_payload(rng, sensor, date.hour))
+                for sensor, date in zip(sensors, dates)]
+
+        # share of the entries re-sent by the device, with the same payload,
+        # up to 2 seconds later
+        if resent:
+            copies = np.flatnonzero(rng.random(n) < resent)
+            seconds = np.r_[seconds, seconds[copies] + rng.integers(0, 3, len(copies))]
+            info = np.r_[np.asarray(info, dtype=object), np.asarray(info, dtype=object)[copies]]
+            order = np.argsort(seconds, kind='stable')
+            seconds, info = seconds[order], info[order]
+            dates = pd.Timestamp(start) + pd.to_timedelta(seconds, unit='s')
+
+        pd.DataFrame({
+            'date': dates.strftime('%Y-%m-%d %H:%M:%S'),
+            'info': info
+        }).to_csv(os.path.join(path, fi), index=False)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Create a synthetic dataset with the format of the Smart Green Homes files.')
+    parser.add_argument(
+        'dataset_path',
+        metavar='DATASET PATH',
+        help='directory where the dataset files will be created',
+        type=str
+    )
+    parser.add_argument('--days', type=int, default=30,
+                        help='number of days of data per file (default: 30)')
+    parser.add_argument('--entries-per-day', type=int, default=500,
+                        help='number of entries per day in each file (default: 500)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random generator (default: 0)')
+    parser.add_argument('--resent', type=float, default=0,
+                        help='share of the entries re-sent by the devices, up to 2 seconds later (default: 0)')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    write_synthetic_dataset(args.dataset_path, args.days,
+                            args.entries_per_day, args.seed, resent=args.resent)
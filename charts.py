@@ -0,0 +1,1517 @@
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+import locale
+import seaborn as sns
+
+from sklearn.metrics.pairwise import manhattan_distances, additive_chi2_kernel
+
+
+from matplotlib.lines import Line2D
+from matplotlib.patches import Patch
+from matplotlib.ticker import FormatStrFormatter
+
+import matplotlib.dates as mdates
+
+import data_processing
+from data_processing import is_various, is_movement, downsample, to_dates, pooled_buckets, variable_buckets, bucket_mean, bucket_std, bucket_sem, rolling_buckets, occupancy_by_hour, merged_histograms, histogram_quantiles
+from gaps import GAP_THRESHOLD, detect_gaps, stream_coverage
+from doors import door_sessions, door_openings_by_hour_week, door_open_time_by_day
+from meteo import METEO_TOLERANCE, indoor_outdoor_temperature
+from comfort import COMFORT_BANDS
+from health import BATTERY_DEPLETED, daily_device_health
+
+from matplotlib import rcParams
+rcParams.update({'figure.autolayout': True})
+rcParams.update({'axes.titlesize': 15})
+rcParams.update({'axes.titleweight': 'bold'})
+rcParams.update({'axes.labelweight': 'bold'})
+rcParams.update({'axes.linewidth': 0.8})
+rcParams.update({'axes.grid': False})
+
+BLUE = '#3299e3'
+BLACK = 'black'
+RED = 'red'
+PURPLE = '#be78e3'
+
+# quantiles of the readings drawn by the 'with_quantiles' charts
+QUANTILE_RANGE = (.1, .9)
+
+# confidence level (and its z-score) of the intervals drawn when the charts
+# are made from a sample of the entries (see data_processing.SAMPLE_FRACTION)
+CONFIDENCE_LEVEL = .95
+CONFIDENCE_Z = 1.96
+
+# ways of drawing the heatmaps comparing the tenants: 'vector' draws one shape
+# per pair of tenants, 'raster' a single image (for large numbers of tenants)
+HEATMAP_RENDERERS = ['vector', 'raster']
+
+# windows of the rolling charts, in the format
+#   window -> (label, colour)
+ROLLING_WINDOWS = {
+    '24h': ('24 hours', RED),
+    '7d': ('7 days', BLUE),
+    '30d': ('30 days', BLACK),
+}
+
+# window whose standard deviation range is drawn by the rolling charts
+ROLLING_STD_WINDOW = '7d'
+
+# signals of the raw signal charts, in the format
+#   column -> (function selecting the entries, label, colour)
+RAW_SIGNALS = {
+    'temperature': (is_various, 'Temperature (ºC)', RED),
+    'humidity': (is_various, 'Humidity (%)', BLUE),
+    'illuminance': (is_movement, 'Illuminance (lx)', PURPLE),
+    'occupancy': (is_movement, 'Occupancy', BLACK),
+}
+
+DAYS = {0: 'Monday', 1: 'Tuesday', 2: 'Wednesday',
+        3: 'Thursday', 4: 'Friday', 5: 'Saturday', 6: 'Sunday'}
+
+# every hour of the week, in the format (day of the week, hour), so that the
+# weekly charts keep their positions when some hours have no readings
+WEEK_HOURS = pd.MultiIndex.from_product([range(7), range(24)])
+
+# data behind the last chart drawn (see keep_aggregate)
+last_aggregate = None
+
+
+def keep_aggregate(aggregate, index=None):
+    # keep the data behind the chart being drawn, so that it can be exported
+    global last_aggregate
+    last_aggregate = aggregate.rename_axis(index) if index else aggregate
+
+
+def grouped_sem(stats, keys):
+    # standard error of the mean of the bucket means of each group
+    sem = bucket_sem(stats)
+    return np.sqrt((sem ** 2).groupby(keys).sum()) / sem.groupby(keys).count()
+
+
+def confidence_interval(x, center, error, bars=False):
+    # draw the confidence interval of values estimated from a sample of the
+    # entries, given their standard errors (nothing is drawn without a sample)
+    fraction = data_processing.SAMPLE_FRACTION
+    if not fraction:
+        return []
+
+    # half width of the interval, corrected for sampling without replacement
+    half = CONFIDENCE_Z * np.asarray(error, dtype=float) * np.sqrt(1 - fraction)
+    center = np.asarray(center, dtype=float)
+    label = f'{CONFIDENCE_LEVEL:.0%} confidence interval ({fraction:.0%} sample)'
+    if bars:
+        plt.errorbar(x, center, yerr=half, fmt='none', ecolor=BLACK,
+                     elinewidth=1, capsize=3, label=label)
+    else:
+        plt.fill_between(x, center - half, center + half,
+                         alpha=.25, color='gray', label=label)
+    return [Patch(facecolor='gray', alpha=.25, label=label)]
+
+
+################################################################
+#                       CREATE CHARTS                          #
+################################################################
+# - relative_amount_data_by_month                              #
+# - average_temperature_by_month                               #
+# - average_humidity_by_month                                  #
+# - average_temperature_by_week                                #
+# - average_humidity_by_week                                   #
+# - relative_occupancy_by_hour                                 #
+# - relative_occupancy_by_hour_week                            #
+# - average_temperature_by_hour (w/wo std)                     #
+# - average_temperature_by_hour_with_occupancy (w/wo std)      #
+# - average_temperature_by_hour_week (w/wo std)                #
+# - average_temperature_by_hour_week_with_occupancy (w/wo std) #
+################################################################
+
+def relative_amount_data_by_month():
+    # number of entries per day, counting the days without entries
+    data_count_day = pooled_buckets('d', 'entries')['count'].resample('d').sum()
+
+    # get average of number of regists per day in each month
+    avg_data_month = data_count_day.resample('m', label='right').mean()
+
+    # get highest value
+    max_avg_data_month = max(avg_data_month)
+
+    # calculate data missing in relation to the highest value
+    missing = 1 - avg_data_month/max_avg_data_month
+    keep_aggregate(missing.rename('missing'), ['month'])
+
+    # standard error of the entries counted in each month (as a Poisson count)
+    month_data = data_count_day.resample('m', label='right').agg(['sum', 'count'])
+    missing_sem = np.sqrt(month_data['sum']) / month_data['count'] / max_avg_data_month
+
+    # create plot and assign labels
+    ax = missing.plot.bar(
+        label='relative amount of missing data',
+        xlabel='Months',
+        ylabel='Relative Data Missing',
+        title='Relative Data Missing by Month' if data_processing.SET_TITLES else '',
+        linewidth=2,
+        width=0.7,
+        edgecolor='black',
+        color=BLUE
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    locale.setlocale(locale.LC_ALL, 'en_GB')
+    x_labels = missing.index.strftime('%b %y')
+    locale.resetlocale()
+    ax.set_xticklabels(x_labels)
+    ax.set_axisbelow(True)
+    confidence_interval(range(len(missing)), missing, missing_sem, bars=True)
+    ax.legend()
+    plt.grid(True, which='both', axis='y', color='gray', linestyle='-.')
+    return ax
+
+
+def average_temperature_by_month():
+    # average the temperature values of each month
+    month_stats = pooled_buckets('m', 'temperature')
+    res_month = bucket_mean(month_stats).to_frame('temperature')
+
+    # label each month as resample('m', label='left') does
+    res_month.index = res_month.index - pd.offsets.MonthEnd(1)
+
+    # plot the temperature values, calculating the mean for each month
+    avg_month = res_month.groupby(res_month.index.month).mean()
+    avg_month_sem = grouped_sem(month_stats, res_month.index.month)
+    keep_aggregate(avg_month, ['month'])
+    ax = avg_month['temperature'].plot(
+        xticks=avg_month.index,
+        label='temperature value',
+        ylabel='Temperature (ºC)',
+        xlabel='Months',
+        title='Average Temperature by Month' if data_processing.SET_TITLES else '',
+        marker='o',
+        markersize=7,
+        markeredgecolor=BLACK,
+        markeredgewidth=2,
+        linestyle='--',
+        markerfacecolor=RED,
+        color='black',
+        linewidth=2
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    x_labels = pd.to_datetime(
+        avg_month.index, format='%m').month_name().str.slice(stop=3)
+    ax.set_xticklabels(x_labels)
+    confidence_interval(avg_month.index, avg_month.iloc[:, 0], avg_month_sem)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def average_humidity_by_month():
+    # average the humidity values of each month
+    month_stats = pooled_buckets('m', 'humidity')
+    res_month = bucket_mean(month_stats).to_frame('humidity')
+
+    # label each month as resample('m', label='left') does
+    res_month.index = res_month.index - pd.offsets.MonthEnd(1)
+
+    # plot the humidity values, calculating the mean for each month
+    avg_month = res_month.groupby(res_month.index.month).mean()
+    avg_month_sem = grouped_sem(month_stats, res_month.index.month)
+    keep_aggregate(avg_month, ['month'])
+    ax = avg_month['humidity'].plot(
+        xticks=avg_month.index,
+        label='humidity value',
+        ylabel='Relative Humidity (%)',
+        xlabel='Months',
+        title='Average Humidity by Month' if data_processing.SET_TITLES else '',
+        marker='o',
+        markersize=7,
+        markeredgecolor=BLACK,
+        markeredgewidth=2,
+        linestyle='--',
+        markerfacecolor=BLUE,
+        color='black',
+        linewidth=2
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    x_labels = pd.to_datetime(
+        avg_month.index, format='%m').month_name().str.slice(stop=3)
+    ax.set_xticklabels(x_labels)
+    confidence_interval(avg_month.index, avg_month.iloc[:, 0], avg_month_sem)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def average_temperature_by_week():
+    # resample the daily buckets by week, averaging the temperature values
+    week_stats = pooled_buckets('d', 'temperature').resample(
+        'w', label='left')[['count', 'sum', 'sumsq']].sum()
+    res_week = bucket_mean(week_stats).to_frame('temperature')
+
+    # plot the temperature values, joining the weeks calculating their mean
+    weeks = pd.Index(res_week.index.isocalendar().week, dtype=np.int64)
+    avg_week = res_week.groupby(weeks).mean()
+    avg_week_sem = grouped_sem(week_stats, weeks)
+    keep_aggregate(avg_week, ['week'])
+    ax = avg_week['temperature'].plot(
+        label='temperature value',
+        xticks=avg_week.index[::5],
+        ylabel='Temperature (ºC)',
+        xlabel='Weeks',
+        title='Average Temperature by Week' if data_processing.SET_TITLES else '',
+        marker='o',
+        markersize=7,
+        markeredgecolor='black',
+        markeredgewidth=2,
+        linestyle='--',
+        markerfacecolor=RED,
+        color=BLACK,
+        linewidth=2
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    confidence_interval(avg_week.index, avg_week['temperature'], avg_week_sem)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def average_humidity_by_week():
+    # resample the daily buckets by week, averaging the humidity values
+    week_stats = pooled_buckets('d', 'humidity').resample(
+        'w', label='left')[['count', 'sum', 'sumsq']].sum()
+    res_week = bucket_mean(week_stats).to_frame('humidity')
+
+    # plot the humidity values, joining the weeks calculating their mean
+    weeks = pd.Index(res_week.index.isocalendar().week, dtype=np.int64)
+    avg_week = res_week.groupby(weeks).mean()
+    avg_week_sem = grouped_sem(week_stats, weeks)
+    keep_aggregate(avg_week, ['week'])
+    ax = avg_week['humidity'].plot(
+        label='humidity value',
+        xticks=avg_week.index[::5],
+        ylabel='Relative Humidity (%)',
+        xlabel='Weeks',
+        title='Average Humidity by Week' if data_processing.SET_TITLES else '',
+        marker='o',
+        markersize=7,
+        markeredgecolor=BLACK,
+        markeredgewidth=2,
+        linestyle='--',
+        markerfacecolor=BLUE,
+        color=BLACK,
+        linewidth=2
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    confidence_interval(avg_week.index, avg_week['humidity'], avg_week_sem)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def relative_occupancy_by_hour(source=None):
+    # get number of different tenants at home per hour (movement detected or occupied intervals)
+    mov_sum = occupancy_by_hour(source)
+
+    # sum those values per hour
+    people_home_per_hour = mov_sum.groupby(mov_sum.index.hour).sum()
+
+    # divide the obtained values by the maximum number found
+    people_home_hour_perc = people_home_per_hour/max(people_home_per_hour)
+    keep_aggregate(people_home_hour_perc.rename('relative occupancy'), ['hour'])
+
+    # standard error of the relative values (as Poisson counts)
+    people_home_hour_sem = np.sqrt(people_home_per_hour)/max(people_home_per_hour)
+
+    # create plot
+    ax = people_home_hour_perc.plot(
+        label='relative number of occupancy entries',
+        xticks=people_home_per_hour.index[::2],
+        title='Relative Occupancy by Hour' if data_processing.SET_TITLES else '',
+        ylabel='Relative Presence',
+        xlabel='Hours',
+        marker='o',
+        markersize=7,
+        markeredgecolor=BLACK,
+        markeredgewidth=2,
+        linestyle='--',
+        markerfacecolor=PURPLE,
+        color=BLACK,
+        linewidth=2,
+        figsize=(7, 4)
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    x_labels = [f'{h:02d}:00' for h in people_home_per_hour.index[::2]]
+    ax.set_xticklabels(x_labels)
+    confidence_interval(people_home_hour_perc.index,
+                        people_home_hour_perc, people_home_hour_sem)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def relative_occupancy_by_hour_week(source=None):
+
+    # get number of different tenants at home per hour (movement detected or occupied intervals)
+    mov_sum = occupancy_by_hour(source)
+
+    # group data by day of the week and hour in the respective day
+    presenca_hour_week = mov_sum.groupby(
+        [mov_sum.index.dayofweek, mov_sum.index.hour]).sum().reindex(WEEK_HOURS, fill_value=0)
+
+    # normalize values, with their standard error (as Poisson counts)
+    presenca_hour_week_sem = np.sqrt(presenca_hour_week) / max(presenca_hour_week)
+    presenca_hour_week = presenca_hour_week / max(presenca_hour_week)
+    keep_aggregate(presenca_hour_week.rename('relative occupancy'), ['day', 'hour'])
+
+    # plot the marks with the colour correspondent to the occupance/presence
+    ax = presenca_hour_week.plot(
+        label='relative number of occupancy entries',
+        ylabel='Relative Occupancy',
+        xlabel='Days of the Week, Hours',
+        marker='o',
+        xticks=range(len(WEEK_HOURS)+1)[::12],
+        markersize=5,
+        markeredgecolor=BLACK,
+        markeredgewidth=1,
+        linestyle='-',
+        markerfacecolor=PURPLE,
+        color=BLACK,
+        linewidth=2,
+        figsize=(9, 4)
+    )
+    plt.title('Average Occupancy by Hours in a Week' if data_processing.SET_TITLES else '')
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    xlabels = [DAYS[wday][:3] + ', \n' +
+               f'{hour:02d}' + ':00' for (wday, hour) in WEEK_HOURS[::12]]
+    xlabels.append(xlabels[0])
+    ax.xaxis.set_ticklabels(xlabels)
+    confidence_interval(range(len(presenca_hour_week)),
+                        presenca_hour_week, presenca_hour_week_sem)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def average_temperature_by_hour(with_std=False, with_quantiles=False):
+    # average the temperature values of each hour
+    hour_stats = pooled_buckets('h', 'temperature')
+    df_var = bucket_mean(hour_stats).to_frame('temperature')
+
+    # group values by their mean and standard deviation per hour
+    df_var_group_by_hour_day = df_var.groupby(
+        df_var.index.hour).agg(['mean', 'std'])
+    temp_sem = grouped_sem(hour_stats, df_var.index.hour)
+    keep_aggregate(df_var_group_by_hour_day['temperature'], ['hour'])
+
+    # plot the temperature values
+    temp_mean = df_var_group_by_hour_day['temperature']['mean']
+    ax = temp_mean.plot(
+        label='temperature value',
+        xticks=df_var_group_by_hour_day.index[::2],
+        ylabel='Temperature (ºC)',
+        xlabel='Hours',
+        title='Average Temperature by Hour' if data_processing.SET_TITLES else '',
+        marker='o',
+        markersize=7,
+        markeredgecolor=BLACK,
+        markeredgewidth=2,
+        linestyle='--',
+        markerfacecolor=RED,
+        color=BLACK,
+        linewidth=2,
+        figsize=(7, 4)
+    )
+
+    # take care of axis labels and legend
+    x_labels = [f'{h:02d}:00' for h in df_var_group_by_hour_day.index[::2]]
+    ax.set_xticklabels(x_labels)
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    confidence_interval(temp_mean.index, temp_mean, temp_sem)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+
+    if with_quantiles:
+        # --- show the range between the quantiles of the readings ---
+        # quantiles of the readings of each hour of the day, from the merged histograms
+        low, high = QUANTILE_RANGE
+        temp_quantiles = histogram_quantiles(
+            merged_histograms('temperature', ['hour']), 'temperature', QUANTILE_RANGE)
+        keep_aggregate(pd.concat([df_var_group_by_hour_day['temperature'], temp_quantiles.rename(
+            columns=lambda q: f'p{q * 100:.0f}')], axis=1), ['hour'])
+
+        ax.fill_between(
+            label=f'percentile range ({low:.0%}-{high:.0%})',
+            x=temp_quantiles.index,
+            y1=temp_quantiles[low],
+            y2=temp_quantiles[high],
+            alpha=.15,
+            color=PURPLE
+        )
+        plt.title('Average Temperature by Hour with Percentile Range' if data_processing.SET_TITLES else '',
+                  fontdict={'fontsize': 11})
+        ax.legend()
+
+    if (not with_std):
+        return ax
+
+    # --- show the standard deviation range shadow ---
+    # saving the averages and the standard deviation data
+    temp_std = df_var_group_by_hour_day['temperature']['std']
+
+    # add standar deviation range shadow and update legend and title
+    ax.fill_between(
+        label='standard deviation range',
+        x=range(0, 24),
+        y1=temp_mean-temp_std,
+        y2=temp_mean+temp_std,
+        alpha=.15,
+        color=BLUE
+    )
+    plt.title('Average Temperature by Hour with Standard Deviation Range' if data_processing.SET_TITLES else '',
+              fontdict={'fontsize': 11})
+    ax.legend()
+    return ax
+
+
+def average_temperature_by_hour_with_occupancy(with_std=False, source=None):
+    # ---- deal with occupance data ----
+    # get number of different tenants at home per hour (movement detected or occupied intervals)
+    mov_sum = occupancy_by_hour(source)
+
+    # sum those values per hour
+    people_home_per_hour = mov_sum.groupby(mov_sum.index.hour).sum()
+
+    # divide the obtained values by the maximum number found
+    people_home_hour_perc = people_home_per_hour/max(people_home_per_hour)
+
+    # create list with percentage values
+    perc_values = people_home_hour_perc.values
+
+    # ---- deal with temperature data ----
+    # average the temperature values of each hour
+    hour_stats = pooled_buckets('h', 'temperature')
+    df_var = bucket_mean(hour_stats).to_frame('temperature')
+
+    # group values by their mean and standard deviation per hour
+    df_var_group_by_hour_day = df_var.groupby(
+        df_var.index.hour).agg(['mean', 'std'])
+    temp_sem = grouped_sem(hour_stats, df_var.index.hour)
+
+    temp_means = df_var_group_by_hour_day['temperature']['mean']
+    keep_aggregate(pd.concat([df_var_group_by_hour_day['temperature'],
+                   people_home_hour_perc.rename('relative occupancy')], axis=1), ['hour'])
+
+    # plot the temperature values - only a line
+    ax = temp_means.plot(
+        xticks=df_var_group_by_hour_day.index[::2],
+        ylabel='Temperature (ºC)',
+        xlabel='Hours',
+        linestyle='--',
+        color=BLACK,
+        linewidth=2,
+        zorder=1,
+        figsize=(9, 4)
+    )
+
+    # plot the marks with the colour correspondent to the occupance/presence
+    ax1 = plt.scatter(
+        x=temp_means.index,
+        y=temp_means,
+        c=perc_values,
+        cmap='YlGnBu',
+        s=70,
+        marker='s',
+        edgecolors='black',
+        linewidths=1,
+        zorder=2
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    x_labels = [f'{h:02d}:00' for h in df_var_group_by_hour_day.index[::2]]
+    ax.set_xticklabels(x_labels)
+    legend_elements = [
+        Line2D(
+            [0],
+            [0],
+            label='temperature value with occupancy information',
+            lw=2,
+            color=BLACK,
+            marker='s',
+            markeredgecolor=BLACK,
+            markerfacecolor=BLUE,
+            markersize=8.3,
+            markeredgewidth=1
+        )]
+    legend_elements += confidence_interval(temp_means.index, temp_means, temp_sem)
+    ax.legend(handles=legend_elements)
+
+    # take care of the colour legend for the presence
+    plt.colorbar(ax1, ax=ax, label='Relative Presence Scale')
+
+    plt.title('Average Temperature by Hour with Occupancy Information' if data_processing.SET_TITLES else '',
+              fontdict={'fontsize': 11})
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+
+    if not with_std:
+        return ax
+
+    # --- show the standard deviation range shadow ---
+    # save standard deviation data
+    temp_std = df_var_group_by_hour_day['temperature']['std']
+
+    # add standard deviation range shadow and update legend and title
+    plt.fill_between(x=range(0, 24), y1=temp_means-temp_std,
+                     y2=temp_means+temp_std, alpha=.1, color=BLUE)
+    plt.title('Average Temperature by Hour with Occupancy Information and Standard Deviation Range' if data_processing.SET_TITLES else '',
+              fontdict={'fontsize': 9})
+    legend_elements += [Patch(facecolor=BLUE,
+                              label='standard deviation range', alpha=.15)]
+    ax.legend(handles=legend_elements)
+    return ax
+
+
+def average_temperature_by_hour_week(with_std=False, with_quantiles=False):
+    # average the temperature values of each hour
+    hour_stats = pooled_buckets('h', 'temperature')
+    df_var = bucket_mean(hour_stats).to_frame('temperature')
+
+    # group data by week and hour of the day
+    df_var_group = df_var.groupby(
+        [df_var.index.dayofweek, df_var.index.hour]).agg(['mean', 'std']).reindex(WEEK_HOURS)
+    temp_sem = grouped_sem(hour_stats, [df_var.index.dayofweek, df_var.index.hour]).reindex(WEEK_HOURS)
+    keep_aggregate(df_var_group['temperature'], ['day', 'hour'])
+
+    # plot the temperature values
+    temp_mean = df_var_group['temperature']['mean']
+    ax = temp_mean.plot(
+        label='temperature value',
+        ylabel='Temperature (ºC)',
+        xlabel='Days of the Week, Hours',
+        marker='o',
+        markersize=5,
+        markeredgecolor=BLACK,
+        markeredgewidth=1,
+        linestyle='-',
+        markerfacecolor=RED,
+        color=BLACK,
+        linewidth=2,
+        figsize=(9, 4)
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    plt.title('Average Temperature by Hours in a Week')
+    ax.set_xticks(range(len(df_var_group.index)+1)[::12])
+    xlabels = [DAYS[wday][:3] + ', \n' +
+               f'{hour:02d}:00' for (wday, hour) in df_var_group.index[::12]]
+    xlabels += [xlabels[0]]
+    ax.set_xticklabels(xlabels)
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    confidence_interval(range(len(temp_mean)), temp_mean, temp_sem)
+    ax.legend()
+
+    if with_quantiles:
+        # --- show the range between the quantiles of the readings ---
+        # quantiles of the readings of each hour of each day of the week, from the merged histograms
+        low, high = QUANTILE_RANGE
+        temp_quantiles = histogram_quantiles(merged_histograms(
+            'temperature', ['dayofweek', 'hour']), 'temperature', QUANTILE_RANGE)
+        temp_quantiles = temp_quantiles.reindex(temp_mean.index)
+        keep_aggregate(pd.concat([df_var_group['temperature'], temp_quantiles.rename(
+            columns=lambda q: f'p{q * 100:.0f}')], axis=1), ['day', 'hour'])
+
+        plt.fill_between(label=f'percentile range ({low:.0%}-{high:.0%})', x=range(len(
+            temp_mean)), y1=temp_quantiles[low], y2=temp_quantiles[high], alpha=.15, color=PURPLE)
+        plt.title('Average Temperature by Hours in a Week with Percentile Range' if data_processing.SET_TITLES else '',
+                  fontdict={'fontsize': 10})
+        ax.legend()
+
+    if (not with_std):
+        return ax
+
+    # --- show the standard deviation range shadow ---
+    # save standard deviation data
+    temp_std = df_var_group['temperature']['std']
+
+    # add standar deviation range shadow and update legend and title
+    plt.fill_between(label='standard deviation range', x=range(len(
+        temp_mean)), y1=temp_mean-temp_std, y2=temp_mean+temp_std, alpha=.15, color=BLUE)
+    plt.title('Average Temperature by Hours in a Week with Standard Deviation Range',
+              fontdict={'fontsize': 10})
+    ax.legend()
+    return ax
+
+
+def average_temperature_by_hour_week_with_occupancy(with_std=False, source=None):
+    # ---- deal with occupance data ----
+    # get number of different tenants at home per hour (movement detected or occupied intervals)
+    mov_sum = occupancy_by_hour(source)
+
+    # group data by day of the week and hour in the respective day and sum
+    presenca_hour_week = mov_sum.groupby(
+        [mov_sum.index.dayofweek, mov_sum.index.hour]).sum().reindex(WEEK_HOURS, fill_value=0)
+
+    # divide the obtained values by the maximum number found
+    presenca_hour_week = presenca_hour_week / max(presenca_hour_week)
+
+    # create list with percentage values
+    perc_values = presenca_hour_week.values
+
+    # ---- deal with temperature data ----
+    # average the temperature values of each hour
+    hour_stats = pooled_buckets('h', 'temperature')
+    df_var = bucket_mean(hour_stats).to_frame('temperature')
+
+    # group values by their mean and standard deviation per hour
+    df_var_group = df_var.groupby(
+        [df_var.index.dayofweek, df_var.index.hour]).agg(['mean', 'std']).reindex(WEEK_HOURS)
+    temp_sem = grouped_sem(hour_stats, [df_var.index.dayofweek, df_var.index.hour]).reindex(WEEK_HOURS)
+
+    # save average temperature data
+    temp_means = df_var_group['temperature']['mean']
+    keep_aggregate(pd.concat([df_var_group['temperature'],
+                   presenca_hour_week.rename('relative occupancy')], axis=1), ['day', 'hour'])
+
+    # plot the temperature values - only a line
+    ax = temp_means.plot(
+        ylabel='Temperature (ºC)',
+        xlabel='Days of the Week, Hours',
+        xticks=range(len(WEEK_HOURS)+1)[::12],
+        linestyle='--',
+        color=BLACK,
+        linewidth=2,
+        zorder=1,
+        figsize=(10, 4)
+    )
+
+    # plot the marks with the colour correspondent to the occupance/presence
+    ax1 = plt.scatter(
+        x=range(len(temp_means)),
+        y=temp_means,
+        c=perc_values,
+        cmap='YlGnBu',
+        s=70,
+        marker='s',
+        edgecolors=BLACK,
+        linewidths=1,
+        zorder=2
+    )
+
+    # take care of axis labels and legend
+    xlabels = [DAYS[wday][:3] + ', \n' +
+               f'{hour:02d}' + ':00' for (wday, hour) in WEEK_HOURS[::12]]
+    xlabels.append(xlabels[0])
+    ax.xaxis.set_ticklabels(xlabels)
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    plt.title('Average Temperature by Hours in a Week with Occupancy Information' if data_processing.SET_TITLES else '',
+              fontdict={'fontsize': 11})
+    legend_elements = [
+        Line2D(
+            [0],
+            [0],
+            label='Temperature Value',
+            lw=2,
+            color=BLACK,
+            marker='s',
+            markeredgecolor=BLACK,
+            markerfacecolor=BLUE,
+            markersize=8.3,
+            markeredgewidth=1
+        )]
+    legend_elements += confidence_interval(range(len(temp_means)), temp_means, temp_sem)
+    ax.legend(handles=legend_elements)
+
+    # take care of the colour legend for the presence
+    plt.colorbar(ax1, ax=ax, label='Relative Presence Scale')
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+
+    if not with_std:
+        return ax
+
+    # --- show the standard deviation range shadow ---
+    # save standard deviation data
+    temp_std = df_var_group['temperature']['std']
+
+    # add standard deviation range shadow and update legend and title
+    plt.fill_between(x=range(len(temp_means)), y1=temp_means -
+                     temp_std, y2=temp_means+temp_std, alpha=.1)
+    plt.title(
+        'Average Temperature by Hours in a Week with Occupancy Information and Standard Deviation Range' if data_processing.SET_TITLES else '',
+        fontdict={'fontsize': 10}
+    )
+    legend_elements += [Patch(facecolor=BLUE,
+                              label='Standard Deviation Range', alpha=.15)]
+    ax.legend(handles=legend_elements)
+    return ax
+
+
+################################################################
+#                      CREATE CHARTS 2                         #
+################################################################
+# - correlation_temperature                                    #
+# - correlation humidity                                       #
+# - correlation_pressure                                       #
+# - correlation_occupancy                                      #
+# - tenant_heatmap                                             #
+################################################################
+
+
+def correlation_temperature(renderer='vector', cluster=False):
+    temp_tenant_day = data_processing.df[is_various].groupby('tenant').resample(
+        'd', label='left')[['temperature']].mean().reset_index()
+
+    temp_tenant_day = temp_tenant_day.pivot(
+        index='date', columns='tenant', values='temperature')
+
+    temperature_corr = temp_tenant_day.corr()
+    keep_aggregate(temperature_corr)
+
+    plt.title(
+        'Correlation Between the Temperature Values of Different Tenants' if data_processing.SET_TITLES else '',
+        fontdict={'fontsize': 10}
+    )
+    ax = tenant_heatmap(temperature_corr, renderer, cluster)
+    return ax
+
+
+def correlation_humidity(renderer='vector', cluster=False):
+    humid_tenant_day = data_processing.df[is_various].groupby('tenant').resample(
+        'd', label='left')[['humidity']].mean().reset_index()
+
+    humid_tenant_day = humid_tenant_day.pivot(
+        index='date', columns='tenant', values='humidity')
+
+    humidity_corr = humid_tenant_day.corr()
+    keep_aggregate(humidity_corr)
+
+    plt.title(
+        'Correlation Between the Humidity Values of Different Tenants' if data_processing.SET_TITLES else '',
+        fontdict={'fontsize': 10}
+    )
+    ax = tenant_heatmap(humidity_corr, renderer, cluster)
+    return ax
+
+
+def correlation_pressure(renderer='vector', cluster=False):
+    pressure_tenant_day = data_processing.df[is_various].groupby('tenant').resample(
+        'd', label='left')[['pressure']].mean().reset_index()
+
+    pressure_tenant_day = pressure_tenant_day.pivot(
+        index='date', columns='tenant', values='pressure')
+
+    temperature_corr = pressure_tenant_day.corr()
+    keep_aggregate(temperature_corr)
+
+    plt.title(
+        'Correlation Between the Pressure Values of Different Tenants' if data_processing.SET_TITLES else '',
+        fontdict={'fontsize': 10}
+    )
+    ax = tenant_heatmap(temperature_corr, renderer, cluster)
+    return ax
+
+
+def correlation_occupancy(renderer='vector', cluster=False):
+    df = data_processing.df
+
+    # get all the entries with movement detected resampled per hour
+    df_mov = df[df['occupancy'] == True].groupby('tenant').resample(
+        'h')[['tenant']].nunique().add_suffix('_count').reset_index()
+    df_mov = df_mov.pivot(index='date', columns='tenant',
+                          values='tenant_count')
+
+    # for each tenant, shows in how many days movement was detected for each hour
+    people_home_per_hour = df_mov.groupby(df_mov.index.hour).sum().transpose()
+
+    norm_people_home_per_hour = people_home_per_hour/people_home_per_hour.sum()
+
+    dist = additive_chi2_kernel(
+        norm_people_home_per_hour, norm_people_home_per_hour)
+    keep_aggregate(pd.DataFrame(dist, index=norm_people_home_per_hour.index,
+                                columns=norm_people_home_per_hour.index))
+    plt.title(
+        'Correlation Between the Occupancy Values of Different Tenants' if data_processing.SET_TITLES else '',
+        fontdict={'fontsize': 10}
+    )
+    ax = tenant_heatmap(dist, renderer, cluster)
+    return ax
+
+
+def cluster_order(matrix):
+    # only imported when the tenants are reordered (scipy comes with scikit-learn)
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    # the matrix holds similarities (the higher, the more alike), so the
+    # distance between two tenants is how far they are from the highest one;
+    # pairs without a value are as far apart as possible
+    similarities = matrix.to_numpy(dtype=float)
+    distances = np.nanmax(similarities) - similarities
+    distances = np.nan_to_num(distances, nan=np.nanmax(distances))
+    distances = (distances + distances.T) / 2
+    np.fill_diagonal(distances, 0)
+
+    # similar tenants are placed next to each other
+    return leaves_list(linkage(squareform(distances, checks=False), method='average'))
+
+
+def tenant_heatmap(matrix, renderer='vector', cluster=False):
+    matrix = pd.DataFrame(matrix)
+    if cluster and len(matrix) > 2:
+        order = cluster_order(matrix)
+        matrix = matrix.iloc[order, order]
+
+    if renderer == 'vector':
+        # one shape per pair of tenants
+        return sns.heatmap(
+            matrix,
+            annot=False,
+            yticklabels=False,
+            xticklabels=False,
+            linewidths=.8,
+            cmap="YlGnBu"
+        )
+    if renderer != 'raster':
+        raise ValueError(f"unknown heatmap renderer \'{renderer}\' (use one of {HEATMAP_RENDERERS})")
+
+    # a single image, resampled to the resolution of the output,
+    # so its size does not depend on the number of tenants
+    ax = plt.gca()
+    image = ax.imshow(
+        np.ma.masked_invalid(matrix.to_numpy(dtype=float)),
+        cmap="YlGnBu",
+        interpolation='antialiased',
+        rasterized=True
+    )
+    plt.colorbar(image, ax=ax)
+    ax.set_xticks([])
+    ax.set_yticks([])
+    return ax
+
+
+################################################################
+#                      CREATE CHARTS 3                         #
+################################################################
+# - coverage_timeline                                          #
+################################################################
+
+
+def coverage_timeline(threshold=GAP_THRESHOLD):
+    keys = ['tenant', 'sensor']
+    streams = stream_coverage(threshold, keys)
+    gaps = detect_gaps(threshold, keys)
+    keep_aggregate(streams)
+    gaps_by_stream = dict(tuple(gaps.groupby(keys)))
+    causes = {'tenant offline': RED, 'sensor silent': PURPLE}
+
+    fig, ax = plt.subplots(figsize=(10, max(4, len(streams) * .2)))
+    for y, stream in streams.iterrows():
+        stream_gaps = gaps_by_stream.get(
+            (stream['tenant'], stream['sensor']), gaps.iloc[:0])
+
+        # periods with data: from the first entry to the last, without the gaps
+        starts = mdates.date2num(
+            [stream['first']] + list(stream_gaps['end']))
+        ends = mdates.date2num(
+            list(stream_gaps['start']) + [stream['last']])
+        ax.broken_barh(list(zip(starts, ends - starts)),
+                       (y - .4, .8), color=BLUE)
+
+        # gaps coloured by their cause
+        for cause, colour in causes.items():
+            cause_gaps = stream_gaps[stream_gaps['cause'] == cause]
+            gap_starts = mdates.date2num(list(cause_gaps['start']))
+            gap_ends = mdates.date2num(list(cause_gaps['end']))
+            ax.broken_barh(list(zip(gap_starts, gap_ends - gap_starts)),
+                           (y - .4, .8), color=colour)
+
+    # take care of axis labels and legend
+    ax.set_yticks(range(len(streams)))
+    ax.set_yticklabels([f"{tenant.split('.')[0][3:]}, {sensor}" for tenant, sensor in zip(
+        streams['tenant'], streams['sensor'])], fontdict={'fontsize': 6})
+    ax.set_ylim(-1, len(streams))
+    ax.invert_yaxis()
+    ax.xaxis_date()
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Tenant, Sensor')
+    plt.title(f'Data Coverage by Tenant and Sensor (gaps longer than {threshold})' if data_processing.SET_TITLES else '',
+              fontdict={'fontsize': 11})
+    ax.legend(handles=[
+        Patch(facecolor=BLUE, label='data received'),
+        Patch(facecolor=RED, label='gap: tenant offline'),
+        Patch(facecolor=PURPLE, label='gap: sensor silent')
+    ], loc='upper right', fontsize=7)
+    plt.grid(True, which='both', axis='x', color='gray', linestyle='-.')
+    return ax
+
+
+################################################################
+#                      CREATE CHARTS 4                         #
+################################################################
+# - door_open_duration_distribution                            #
+# - relative_door_openings_by_hour                             #
+# - relative_door_openings_by_hour_week                        #
+# - average_door_open_time_by_day                              #
+################################################################
+
+
+def door_open_duration_distribution():
+    minutes = door_sessions()['duration'].dt.total_seconds() / 60
+
+    # logarithmic bins, from a few seconds to the longest session
+    bins = np.logspace(np.log10(max(minutes.min(), 1 / 60)),
+                       np.log10(minutes.max()), 40)
+    counts, _ = np.histogram(minutes, bins)
+    keep_aggregate(pd.DataFrame(
+        {'from (minutes)': bins[:-1], 'to (minutes)': bins[1:], 'openings': counts}))
+    ax = minutes.plot.hist(
+        bins=bins,
+        label='number of door openings',
+        title='Distribution of the Duration of the Door Openings' if data_processing.SET_TITLES else '',
+        edgecolor=BLACK,
+        linewidth=1,
+        color=BLUE,
+        logx=True,
+        figsize=(7, 4)
+    )
+
+    # take care of axis labels and legend
+    ax.set_xlabel('Duration (minutes)')
+    ax.set_ylabel('Number of Openings')
+    ax.set_axisbelow(True)
+    ax.legend()
+    plt.grid(True, which='major', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def relative_door_openings_by_hour():
+    # number of openings per hour, divided by the maximum number found
+    openings = door_openings_by_hour_week().groupby(level='hour').sum()
+    openings_sem = np.sqrt(openings) / max(openings)
+    openings = openings / max(openings)
+    keep_aggregate(openings.rename('relative openings'))
+
+    ax = openings.plot(
+        label='relative number of door openings',
+        xticks=openings.index[::2],
+        title='Relative Door Openings by Hour' if data_processing.SET_TITLES else '',
+        ylabel='Relative Door Openings',
+        xlabel='Hours',
+        marker='o',
+        markersize=7,
+        markeredgecolor=BLACK,
+        markeredgewidth=2,
+        linestyle='--',
+        markerfacecolor=BLUE,
+        color=BLACK,
+        linewidth=2,
+        figsize=(7, 4)
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    x_labels = [f'{h:02d}:00' for h in openings.index[::2]]
+    ax.set_xticklabels(x_labels)
+    confidence_interval(openings.index, openings, openings_sem)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def relative_door_openings_by_hour_week():
+    # number of openings per day of the week and hour, divided by the maximum number found
+    openings = door_openings_by_hour_week()
+    openings_sem = np.sqrt(openings) / max(openings)
+    openings = openings / max(openings)
+    keep_aggregate(openings.rename('relative openings'))
+
+    ax = openings.plot(
+        label='relative number of door openings',
+        ylabel='Relative Door Openings',
+        xlabel='Days of the Week, Hours',
+        marker='o',
+        xticks=range(len(openings.index)+1)[::12],
+        markersize=5,
+        markeredgecolor=BLACK,
+        markeredgewidth=1,
+        linestyle='-',
+        markerfacecolor=BLUE,
+        color=BLACK,
+        linewidth=2,
+        figsize=(9, 4)
+    )
+    plt.title('Relative Door Openings by Hours in a Week' if data_processing.SET_TITLES else '')
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    xlabels = [DAYS[wday][:3] + ', \n' +
+               f'{hour:02d}' + ':00' for (wday, hour) in openings.index[::12]]
+    xlabels.append(xlabels[0])
+    ax.xaxis.set_ticklabels(xlabels)
+    confidence_interval(range(len(openings)), openings, openings_sem)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def average_door_open_time_by_day():
+    # hours the doors of each tenant were open per day (0 when never opened),
+    # averaged over the tenants
+    open_time = door_open_time_by_day().unstack('tenant', fill_value=0)
+    open_time = open_time.asfreq('d', fill_value=0)
+    open_time_sem = open_time.sem(axis=1)
+    open_time = open_time.mean(axis=1)
+    keep_aggregate(open_time.rename('hours'))
+
+    ax = open_time.plot(
+        label='time with doors open',
+        ylabel='Time with Doors Open (hours)',
+        xlabel='Date',
+        title='Average Time with Doors Open by Day' if data_processing.SET_TITLES else '',
+        linestyle='-',
+        color=BLUE,
+        linewidth=1.5,
+        figsize=(9, 4)
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    confidence_interval(ax.get_lines()[0].get_xdata(), open_time, open_time_sem)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+################################################################
+#                      CREATE CHARTS 5                         #
+################################################################
+# - indoor_outdoor_temperature_by_hour                         #
+# - indoor_outdoor_temperature_by_hour_week                    #
+################################################################
+
+
+def indoor_outdoor_temperature_by_hour(tolerance=METEO_TOLERANCE):
+    # average indoor and outdoor temperature of each hour, grouped by hour of the day
+    temperatures = indoor_outdoor_temperature(tolerance)
+    temperatures = temperatures.groupby(temperatures.index.hour).mean()
+    keep_aggregate(temperatures, ['hour'])
+
+    ax = temperatures['indoor'].plot(
+        label='indoor temperature',
+        xticks=temperatures.index[::2],
+        ylabel='Temperature (ºC)',
+        title='Indoor and Outdoor Temperature by Hour' if data_processing.SET_TITLES else '',
+        marker='o',
+        markersize=7,
+        markeredgecolor=BLACK,
+        markeredgewidth=2,
+        linestyle='--',
+        markerfacecolor=RED,
+        color=BLACK,
+        linewidth=2,
+        figsize=(7, 4)
+    )
+    temperatures['outdoor'].plot(
+        ax=ax,
+        label='outdoor temperature',
+        marker='o',
+        markersize=7,
+        markeredgecolor=BLACK,
+        markeredgewidth=2,
+        linestyle='--',
+        markerfacecolor=BLUE,
+        color=BLACK,
+        linewidth=2
+    )
+
+    # take care of axis labels and legend
+    ax.set_xlabel('Hours')
+    x_labels = [f'{h:02d}:00' for h in temperatures.index[::2]]
+    ax.set_xticklabels(x_labels)
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def indoor_outdoor_temperature_by_hour_week(tolerance=METEO_TOLERANCE):
+    # average indoor and outdoor temperature of each hour, grouped by day of the week and hour
+    temperatures = indoor_outdoor_temperature(tolerance)
+    temperatures = temperatures.groupby(
+        [temperatures.index.dayofweek, temperatures.index.hour]).mean()
+
+    # every hour of the week, even those without meteorology entries (e.g. in a sample)
+    temperatures = temperatures.reindex(
+        pd.MultiIndex.from_product([range(7), range(24)]))
+    keep_aggregate(temperatures, ['day', 'hour'])
+
+    ax = temperatures['indoor'].plot(
+        label='indoor temperature',
+        ylabel='Temperature (ºC)',
+        xlabel='Days of the Week, Hours',
+        marker='o',
+        xticks=range(len(temperatures.index)+1)[::12],
+        markersize=5,
+        markeredgecolor=BLACK,
+        markeredgewidth=1,
+        linestyle='-',
+        markerfacecolor=RED,
+        color=BLACK,
+        linewidth=2,
+        figsize=(9, 4)
+    )
+    ax.plot(
+        range(len(temperatures.index)),
+        temperatures['outdoor'].to_numpy(),
+        label='outdoor temperature',
+        marker='o',
+        markersize=5,
+        markeredgecolor=BLACK,
+        markeredgewidth=1,
+        linestyle='-',
+        markerfacecolor=BLUE,
+        color=BLACK,
+        linewidth=2
+    )
+    plt.title('Indoor and Outdoor Temperature by Hours in a Week' if data_processing.SET_TITLES else '')
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    xlabels = [DAYS[wday][:3] + ', \n' +
+               f'{hour:02d}' + ':00' for (wday, hour) in temperatures.index[::12]]
+    xlabels.append(xlabels[0])
+    ax.xaxis.set_ticklabels(xlabels)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+################################################################
+#                      CREATE CHARTS 6                         #
+################################################################
+# - comfort_by_month                                           #
+# - comfort_by_hour                                            #
+# - degree_hours_by_month                                      #
+################################################################
+
+
+def comfort_by_month():
+    # share of the time inside the comfort band in each month
+    comfort = pd.DataFrame({
+        f'{variable} ({low}-{high})': bucket_mean(pooled_buckets('m', f'{variable} comfort'))
+        for variable, (low, high) in COMFORT_BANDS.items()
+    })
+    keep_aggregate(comfort, ['month'])
+
+    ax = comfort.plot.bar(
+        ax=plt.gca(),
+        xlabel='Months',
+        ylabel='Share of Time in the Comfort Band',
+        title='Time in the Comfort Band by Month' if data_processing.SET_TITLES else '',
+        linewidth=2,
+        width=0.7,
+        edgecolor='black',
+        color=[BLUE, PURPLE],
+        figsize=(6.4, 4.8)
+    )
+
+    # take care of axis labels and legend
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    locale.setlocale(locale.LC_ALL, 'en_GB')
+    x_labels = comfort.index.strftime('%b %y')
+    locale.resetlocale()
+    ax.set_xticklabels(x_labels)
+    ax.set_ylim(0, 1)
+    ax.set_axisbelow(True)
+    ax.legend(loc='lower right')
+    plt.grid(True, which='both', axis='y', color='gray', linestyle='-.')
+    return ax
+
+
+def comfort_by_hour():
+    # share of the time inside the comfort band in each hour of the day,
+    # weighting every hour by the time covered by readings
+    comfort = {}
+    for variable, (low, high) in COMFORT_BANDS.items():
+        stats = pooled_buckets('h', f'{variable} comfort')
+        stats = stats.groupby(stats.index.hour)[['count', 'sum']].sum()
+        comfort[f'{variable} ({low}-{high})'] = bucket_mean(stats)
+    comfort = pd.DataFrame(comfort)
+    keep_aggregate(comfort, ['hour'])
+
+    ax = comfort.plot(
+        ax=plt.gca(),
+        xticks=comfort.index[::2],
+        ylabel='Share of Time in the Comfort Band',
+        xlabel='Hours',
+        title='Time in the Comfort Band by Hour' if data_processing.SET_TITLES else '',
+        marker='o',
+        markersize=7,
+        markeredgecolor=BLACK,
+        markeredgewidth=2,
+        linestyle='--',
+        color=BLACK,
+        linewidth=2,
+        figsize=(7, 4)
+    )
+    for line, color in zip(ax.get_lines(), [BLUE, PURPLE]):
+        line.set_markerfacecolor(color)
+
+    # take care of axis labels and legend
+    x_labels = [f'{h:02d}:00' for h in comfort.index[::2]]
+    ax.set_xticklabels(x_labels)
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def degree_hours_by_month():
+    # degree-hours above and below the temperature comfort band in each month,
+    # averaged over the tenants
+    degree_hours = pd.DataFrame({
+        f'{side} {bound}ºC': variable_buckets('m', f'temperature {side}')['sum'].groupby(level='date').mean()
+        for side, bound in zip(['above', 'below'], COMFORT_BANDS['temperature'][::-1])
+    })
+    keep_aggregate(degree_hours, ['month'])
+
+    ax = degree_hours.plot.bar(
+        ax=plt.gca(),
+        xlabel='Months',
+        ylabel='Degree-Hours (ºC·h)',
+        title='Degree-Hours Outside the Comfort Band' if data_processing.SET_TITLES else '',
+        linewidth=2,
+        width=0.7,
+        edgecolor='black',
+        color=[RED, BLUE],
+        figsize=(6.4, 4.8)
+    )
+
+    # take care of axis labels and legend
+    locale.setlocale(locale.LC_ALL, 'en_GB')
+    x_labels = degree_hours.index.strftime('%b %y')
+    locale.resetlocale()
+    ax.set_xticklabels(x_labels)
+    ax.set_axisbelow(True)
+    ax.legend()
+    plt.grid(True, which='both', axis='y', color='gray', linestyle='-.')
+    return ax
+
+
+################################################################
+#                      CREATE CHARTS 7                         #
+################################################################
+# - rolling_average (temperature / humidity, w/wo std)         #
+# - rolling_temperature_by_tenant                              #
+################################################################
+
+
+def rolling_average(variable, ylabel, with_std=False):
+    # statistics of every tenant in each hour, accumulated over each window
+    stats = pooled_buckets('h', variable)
+
+    ax = plt.gca()
+    aggregate = {}
+    for window, (label, color) in ROLLING_WINDOWS.items():
+        # windows starting before the first hour with data are left out
+        rolling = rolling_buckets(stats, window)
+        rolling = rolling[rolling.index >= rolling.index[0] +
+                          pd.Timedelta(window) - pd.Timedelta('1h')]
+        if rolling.empty:
+            # windows longer than the data are not drawn
+            continue
+        rolling_mean = bucket_mean(rolling)
+        aggregate[f'{window} mean'] = rolling_mean
+        aggregate[f'{window} std'] = bucket_std(rolling)
+        rolling_mean.plot(
+            ax=ax,
+            label=f'{label} mean',
+            linestyle='-',
+            color=color,
+            linewidth=1.5,
+            figsize=(9, 4)
+        )
+
+        if with_std and window == ROLLING_STD_WINDOW:
+            # standard deviation of the readings inside the window
+            rolling_std = bucket_std(rolling)
+            ax.fill_between(
+                label=f'{label} standard deviation range',
+                x=rolling_mean.index,
+                y1=rolling_mean-rolling_std,
+                y2=rolling_mean+rolling_std,
+                alpha=.1,
+                color=color
+            )
+
+    keep_aggregate(pd.DataFrame(aggregate))
+
+    # take care of axis labels and legend
+    ax.set_xlabel('Date')
+    ax.set_ylabel(ylabel)
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+def rolling_average_temperature(with_std=False):
+    ax = rolling_average('temperature', 'Temperature (ºC)', with_std)
+    plt.title(('Rolling Average Temperature with Standard Deviation Range' if with_std else 'Rolling Average Temperature')
+              if data_processing.SET_TITLES else '')
+    return ax
+
+
+def rolling_average_humidity(with_std=False):
+    ax = rolling_average('humidity', 'Humidity (%)', with_std)
+    plt.title(('Rolling Average Humidity with Standard Deviation Range' if with_std else 'Rolling Average Humidity')
+              if data_processing.SET_TITLES else '')
+    return ax
+
+
+def rolling_temperature_by_tenant(window='7d'):
+    label, _ = ROLLING_WINDOWS[window]
+
+    # rolling mean of each tenant, computed for all tenants at once
+    rolling_mean = bucket_mean(rolling_buckets(
+        variable_buckets('h', 'temperature'), window))
+    keep_aggregate(rolling_mean.droplevel('variable').rename(f'{window} mean'))
+
+    ax = plt.gca()
+    for tenant, tenant_mean in rolling_mean.groupby(level='tenant'):
+        # windows starting before the first hour with data of the tenant are left out
+        tenant_mean = tenant_mean.droplevel(['tenant', 'variable'])
+        tenant_mean = tenant_mean[tenant_mean.index >= tenant_mean.index[0] +
+                                  pd.Timedelta(window) - pd.Timedelta('1h')]
+        tenant_mean.plot(
+            ax=ax,
+            linestyle='-',
+            color=BLUE,
+            alpha=.4,
+            linewidth=1,
+            figsize=(9, 4)
+        )
+
+    # mean of the tenants together, on top
+    pooled_mean = bucket_mean(rolling_buckets(pooled_buckets('h', 'temperature'), window))
+    pooled_mean = pooled_mean[pooled_mean.index >= pooled_mean.index[0] +
+                              pd.Timedelta(window) - pd.Timedelta('1h')]
+    pooled_mean.plot(
+        ax=ax,
+        linestyle='-',
+        color=BLACK,
+        linewidth=2
+    )
+
+    # take care of axis labels and legend
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Temperature (ºC)')
+    plt.title(f'Rolling Average Temperature ({label}) by Tenant' if data_processing.SET_TITLES else '')
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+    ax.legend(handles=[Line2D([0], [0], color=BLUE, alpha=.4, label='tenant mean'),
+                       Line2D([0], [0], color=BLACK, linewidth=2, label='all tenants')])
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
+
+
+################################################################
+#                      CREATE CHARTS 8                         #
+################################################################
+# - raw_signals                                                #
+################################################################
+
+
+def raw_signals(tenant):
+    # only the columns of the signals (and the ones the selections need) are copied
+    df = data_processing.df
+    readings = df.loc[df['tenant'] == tenant, ['description'] + list(RAW_SIGNALS)]
+
+    # one chart per signal, sharing the time axis
+    fig = plt.gcf()
+    fig.set_size_inches(9, 8)
+    axes = fig.subplots(len(RAW_SIGNALS), 1, sharex=True)
+
+    # at most two points per pixel of the width of the chart
+    buckets = int(fig.get_figwidth() * fig.dpi)
+
+    for ax, (column, (selector, label, color)) in zip(axes, RAW_SIGNALS.items()):
+        entries = readings[selector]
+        order = np.argsort(entries.index.asi8, kind='stable')
+        times, values = downsample(entries.index.asi8[order],
+                                   entries[column].to_numpy(dtype=float)[order], buckets)
+
+        ax.plot(
+            to_dates(times, readings.index.tz),
+            values,
+            color=color,
+            linewidth=.8,
+            drawstyle='steps-post' if column == 'occupancy' else 'default'
+        )
+        ax.set_ylabel(label, fontdict={'fontsize': 9})
+        ax.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+
+    # take care of axis labels
+    axes[-1].set_xlabel('Date')
+    axes[-1].set_yticks([0, 1])
+    axes[-1].set_yticklabels(['no', 'yes'])
+    fig.autofmt_xdate()
+    if data_processing.SET_TITLES:
+        fig.suptitle(f'Raw Signals of {tenant.split(".")[0]}', fontsize=15, fontweight='bold')
+    return axes[-1]
+
+
+################################################################
+#                      CREATE CHARTS 9                         #
+################################################################
+# - device_battery_by_day                                      #
+################################################################
+
+
+def device_battery_by_day(health=None):
+    # distribution, across the devices, of the latest battery reading of each day
+    health = daily_device_health() if health is None else health
+    battery = health['battery last'].dropna()
+    low, high = QUANTILE_RANGE
+    fleet = battery.groupby(level='date').quantile([low, .5, high]).unstack()
+    fleet['devices'] = battery.groupby(level='date').size()
+    fleet['depleted'] = (battery <= BATTERY_DEPLETED).groupby(level='date').sum()
+    keep_aggregate(fleet.rename(columns=lambda q: f'p{q * 100:.0f}' if isinstance(q, float) else q))
+
+    ax = fleet[.5].plot(
+        label='median battery',
+        ylabel='Battery (%)',
+        xlabel='Date',
+        title='Battery of the Devices by Day' if data_processing.SET_TITLES else '',
+        linestyle='-',
+        color=BLACK,
+        linewidth=2,
+        figsize=(9, 4)
+    )
+    plt.fill_between(
+        ax.get_lines()[0].get_xdata(),
+        fleet[low],
+        fleet[high],
+        label=f'devices between the percentiles {low:.0%}-{high:.0%}',
+        alpha=.25,
+        color=BLUE
+    )
+    ax.axhline(BATTERY_DEPLETED, color=RED, linestyle='--', linewidth=1.5,
+               label=f'depleted ({BATTERY_DEPLETED}%)')
+
+    # take care of axis labels and legend
+    ax.set_ylim(0, 100)
+    ax.legend()
+    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
+    return ax
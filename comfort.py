@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from data_processing import is_various, sorted_streams, split_intervals, to_dates
+
+# comfort bands of the indoor readings, in the format
+#   variable -> (lowest comfortable value, highest comfortable value)
+COMFORT_BANDS = {
+    'temperature': (18, 24),
+    'humidity': (40, 60),
+}
+
+# longest time a reading is assumed to hold when no newer reading follows it
+COMFORT_HOLD = '1h'
+
+
+################################################################
+#                      COMFORT METRICS                         #
+################################################################
+# - reading_durations                                          #
+# - comfort_buckets                                            #
+################################################################
+
+def reading_durations(readings, hold, end=None):
+    # readings of each tenant sorted by time
+    order, times, _, run_ends, _ = sorted_streams(readings, ['tenant'])
+
+    # each reading holds until the next reading of the tenant, for at most 'hold'
+    ends = times + pd.Timedelta(hold).value
+    following = np.r_[times[1:], 0]
+    last = np.zeros(len(times), dtype=bool)
+    last[run_ends - 1] = True
+    ends = np.where(last, ends, np.minimum(ends, following))
+
+    # nor after the end of the entries given (e.g. the end of the month of a
+    # partition), where the readings of the next ones take over
+    if end is not None:
+        ends = np.minimum(ends, pd.Timestamp(end).value)
+    return order, times, ends
+
+
+def comfort_buckets(dataframe, bands=COMFORT_BANDS, hold=COMFORT_HOLD, end=None):
+    readings = dataframe[is_various]
+    order, starts, ends = reading_durations(readings, hold, end)
+
+    # split the time each reading held at the hours, weighting every
+    # part of the reading by the hours it lasted inside each hour
+    piece, bucket, duration = split_intervals(starts, ends, 'h')
+    weight = duration / pd.Timedelta('1h').value
+    tenant = np.asarray(readings['tenant'], dtype=object)[order][piece]
+    date = to_dates(bucket, readings.index.tz)
+
+    # per variable: share of time inside the band and degrees (or points)
+    # above and below it, kept as time-weighted statistics with the hours
+    # in 'count', so that the mean of a bucket is the share or the average
+    # distance to the band and 'sum' holds the hours (or degree-hours)
+    stats_list = []
+    for variable, (low, high) in bands.items():
+        value = readings[variable].to_numpy(dtype=float)[order][piece]
+        held = ~np.isnan(value)
+        metrics = {
+            'comfort': ((value >= low) & (value <= high)).astype(float),
+            'above': np.maximum(value - high, 0),
+            'below': np.maximum(low - value, 0),
+        }
+        for metric, metric_value in metrics.items():
+            stats_list.append(pd.DataFrame({
+                'tenant': tenant[held],
+                'variable': f'{variable} {metric}',
+                'date': date[held],
+                'value': metric_value[held],
+                'weight': weight[held]
+            }))
+    stats = pd.concat(stats_list, ignore_index=True)
+    stats['sum'] = stats['value'] * stats['weight']
+    stats['sumsq'] = stats['sum'] * stats['value']
+
+    # hourly statistics per tenant and variable, in the layout of the pyramid
+    return stats.groupby(['tenant', 'variable', 'date']).agg(
+        count=('weight', 'sum'),
+        sum=('sum', 'sum'),
+        sumsq=('sumsq', 'sum'),
+        min=('value', 'min'),
+        max=('value', 'max')
+    )
@@ -1,5 +1,10 @@
 import argparse, os
+import data_processing
 from data_processing import *
+from gaps import GAP_THRESHOLD, stream_coverage
+from doors import door_session_statistics
+from health import RISK_HORIZON, devices_at_risk
+from events import state_durations
 
 def dir_path(path):
     if os.path.isdir(path):
@@ -8,20 +13,66 @@ def dir_path(path):
         raise argparse.ArgumentTypeError(f"\'{path}\' is not a valid path")
 
 def parse_arguments():
-    parser = argparse.ArgumentParser(description='Process command line arguments.')
+    parser = argparse.ArgumentParser(description='Process command line arguments.', fromfile_prefix_chars='@')
     parser.add_argument( 
         'dataset_path', 
         metavar='DATASET PATH', 
         help='path to where the dataset files are', 
         type=dir_path
     )
+    parser.add_argument(
+        '--engine',
+        choices=CSV_ENGINES,
+        default='c',
+        help='engine used to parse the dataset files (default: c)'
+    )
+    parser.add_argument(
+        '--duplicate-tolerance',
+        help='longest delay between two entries with the same payload for the second one to be '
+             'removed as a copy re-sent by the device, e.g. 2s (default: only copies with the same date)'
+    )
+    parser.add_argument(
+        '--keep-duplicates',
+        dest='deduplicate',
+        action='store_false',
+        help='keep the copies of the entries re-sent by the devices'
+    )
+    parser.add_argument(
+        '--tenants',
+        nargs='+',
+        metavar='TENANT',
+        help='only load these tenants, given by file name or pattern, e.g. sgh0201a8c87da4 or \'sgh0201a*\' '
+             '(@FILE reads them from a file, one per line)'
+    )
+    parser.add_argument(
+        '--exclude',
+        nargs='+',
+        metavar='TENANT',
+        help='do not load these tenants, given by file name or pattern'
+    )
+    parser.add_argument(
+        '--write-manifest',
+        action='store_true',
+        help=f'write the rows, time range and size of each dataset file to \'{TENANT_MANIFEST}\' '
+             'in the dataset directory, used to plan the loading of the files'
+    )
 
     return parser.parse_args()
 
 def main():
     args = parse_arguments()
     
-    setup( args.dataset_path )
+    if args.write_manifest:
+        print( "--> DATASET FILES:")
+        print_tenant_manifest( write_tenant_manifest(args.dataset_path) )
+        print()
+
+    setup( args.dataset_path, engine=args.engine, deduplicate=args.deduplicate, duplicate_tolerance=args.duplicate_tolerance,
+           tenants=args.tenants, exclude=args.exclude )
+
+    print( "--> DUPLICATED ENTRIES REMOVED BY TENANT:")
+    print_duplicate_information()
+    print()
 
     print_general_data_information()
     print()
@@ -34,6 +85,10 @@ def main():
     print_information_feedback_message()
     print()
 
+    print( "--> TIME IN EACH STATE BY TENANT AND DEVICE (HOURS):")
+    print_state_duration_information()
+    print()
+
     print( "--> TEMPERATURE, HUMIDITY AND PRESSURE INFORMATION MESSAGE:")
     print_information_temp_humid_press_message()
     print()
@@ -42,12 +97,24 @@ def main():
     print_information_door_message()
     print()
 
+    print( "--> DOOR SESSIONS (OPEN TO CLOSED) BY TENANT:")
+    print_door_session_information()
+    print()
+
     print( "--> MOVEMENT INFORMATION MESSAGE:")
     print_information_movement_message()
     print()
 
     print( "--> METEOROLOGY INFORMATION MESSAGE:")
     print_information_meteorology_message()
+    print()
+
+    print( f"--> GAPS LONGER THAN {GAP_THRESHOLD} BY TENANT AND SENSOR:")
+    print_gap_information()
+    print()
+
+    print( f"--> DEVICES AT RISK (BATTERY DEPLETED WITHIN {RISK_HORIZON} OR WEAK LINK):")
+    print_devices_at_risk()
 
 
 def print_general_data_information():
@@ -64,6 +131,25 @@ def print_general_data_information():
             f"{'|':14}{elem['rate hours with at least one log']:>9.0f}%"
         )
 
+def print_tenant_manifest(manifest):
+    heading= f" {'   tenant':17}{'|':3}{'rows':>10}{'|':3}{'first date':^19}{'|':3}{'last date':^19}{'|':3}{'size (MB)':>10} "
+    print(heading)
+    print('-'*len(heading))
+    for tenant, elem in manifest.items():
+        print( f" {tenant.split('.')[0][3:]:17}|  {elem['rows']:>10}"
+               f"{'|':3}{str(elem['first'])[:19]:19}{'|':3}{str(elem['last'])[:19]:19}"
+               f"{'|':3}{elem['size'] / 2**20:>10.1f}")
+
+def print_duplicate_information():
+    info = data_processing.removed_duplicates
+
+    heading= f" {'   tenant':17}{'|':3}{'removed entries':>16} "
+    print(heading)
+    print('-'*len(heading))
+    for tenant, removed in info.items():
+        print( f" {tenant.split('.')[0][3:]:17}|  {removed:>16}")
+    print( f" {'total':17}|  {info.sum():>16}")
+
 def print_information_state_message():
     info = information_state_message()
     
@@ -82,6 +168,18 @@ def print_information_feedback_message():
     for k in info:
         print( f" {k:10}|  {list( info[k] ) }")
 
+def print_state_duration_information():
+    info = state_durations()
+
+    heading= f" {'   tenant':17}{'|':3}{' device':14}" + ''.join(f"{'|':2}{state:>9} " for state in info.columns)
+    print(heading)
+    print('-'*len(heading))
+    for (tenant, device), row in info.iterrows():
+        print(
+            f" {tenant.split('.')[0][3:]:17}|  {device:14}" +
+            ''.join(f"|{duration.total_seconds()/3600:>10.1f} " for duration in row)
+        )
+
 def print_information_temp_humid_press_message():
     info = information_temp_humid_press_message()
     
@@ -121,6 +219,18 @@ def print_information_door_message():
 
         print( f" {variable:14}|{datatype:>9} |{hasnull:>10} |{minvalue:11} |{maxvalue:10}")
 
+def print_door_session_information():
+    info = door_session_statistics()
+
+    heading= f" {'   tenant':17}{'|':3}{'sessions':>9} {'|':2}{'median (min)':>13} {'|':2}{'p90 (min)':>10} {'|':2}{'max (min)':>10} {'|':2}{'open h/day':>11} "
+    print(heading)
+    print('-'*len(heading))
+    for tenant, row in info.iterrows():
+        print(
+            f" {tenant.split('.')[0][3:]:17}|  {row['sessions']:>9.0f} |{row['median']:>14.1f} |"
+            f"{row['p90']:>11.1f} |{row['max']:>11.1f} |{row['open hours per day']:>12.1f}"
+        )
+
 def print_information_movement_message():
     info = information_movement_message()
 
@@ -168,6 +278,31 @@ def print_information_meteorology_message():
 
         print( f" {variable:14}|{datatype:>9} |{hasnull:>10} |{minvalue:11} |{maxvalue:10}")
 
+def print_gap_information():
+    info = stream_coverage(keys=['tenant', 'sensor'])
+
+    heading= f" {'   tenant':17}{'|':3}{' sensor':11}{'|':3}{'gaps':>6} {'|':2}{'silent hours':>13} {'|':2}{'coverage':>9} "
+    print(heading)
+    print('-'*len(heading))
+    for _, row in info.iterrows():
+        print(
+            f" {row['tenant'].split('.')[0][3:]:17}|  {row['sensor']:11}|  "
+            f"{row['gaps']:>6} |{row['silent'].total_seconds()/3600:>14.1f} |{row['coverage']*100:>9.1f}%"
+        )
+
+def print_devices_at_risk():
+    info = devices_at_risk()
+
+    heading= f" {'   tenant':17}{'|':3}{' device':11}{'|':3}{'battery':>8} {'|':2}{'%/day':>7} {'|':2}{'depletion':>11} {'|':2}{'link':>5} {'|':2}{'risk':17}"
+    print(heading)
+    print('-'*len(heading))
+    for _, row in info.iterrows():
+        depletion = row['depletion'].strftime('%Y-%m-%d') if pd.notna(row['depletion']) else '-'
+        print(
+            f" {row['tenant'].split('.')[0][3:]:17}|  {row['device']:11}|  "
+            f"{row['battery']:>8.0f} |{row['slope (%/day)']:>8.2f} |{depletion:>12} |{row['linkquality']:>6.0f} |  {row['risk']:17}"
+        )
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
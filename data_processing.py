@@ -1,41 +1,45 @@
 import pandas as pd
 import numpy as np
 import json
-import matplotlib.pyplot as plt
 import os
-import locale
 import math
-import seaborn as sns
-
-from sklearn.metrics.pairwise import manhattan_distances, additive_chi2_kernel
+import io
+import gzip
+import lzma
+import queue
+import threading
+import fnmatch
+import heapq
+from concurrent.futures import ThreadPoolExecutor
 
+SET_TITLES = True
+df = None
 
-from matplotlib.lines import Line2D
-from matplotlib.patches import Patch
-from matplotlib.ticker import FormatStrFormatter
+# fraction of the entries loaded by setup() (None when all the entries are loaded)
+SAMPLE_FRACTION = None
 
-from matplotlib import rcParams
-rcParams.update({'figure.autolayout': True})
-rcParams.update({'axes.titlesize': 15})
-rcParams.update({'axes.titleweight': 'bold'})
-rcParams.update({'axes.labelweight': 'bold'})
-rcParams.update({'axes.linewidth': 0.8})
-rcParams.update({'axes.grid': False})
+# entries removed by setup() as duplicates, per tenant
+removed_duplicates = None
 
-BLUE = '#3299e3'
-BLACK = 'black'
-RED = 'red'
-PURPLE = '#be78e3'
+# size (bytes) of each dataset file when setup() read it, where the
+# rows appended afterwards start (see watch.py)
+loaded_sizes = {}
 
-SET_TITLES = True
-DAYS = {0: 'Monday', 1: 'Tuesday', 2: 'Wednesday',
-        3: 'Thursday', 4: 'Friday', 5: 'Saturday', 6: 'Sunday'}
-df = None
+# last raw entries (date, info and tenant) read by setup(), the only ones
+# the rows appended afterwards may repeat (see recent_entries)
+last_entries = None
 
 # list with files to consider
 FILES = ['sgh0201a8c87da4.csv', 'sgh0201a17a7a16.csv', 'sgh0201b9b7d045.csv', 'sgh0201e9248493.csv', 'sgh0201f6cb55ed.csv', 'sgh02015d5c61cc.csv',
          'sgh02018fe9be2c.csv', 'sgh02019d93db3f.csv', 'sgh020102d29c86.csv', 'sgh020114a6a800.csv', 'sgh020125bce03a.csv', 'sgh020149c615c5.csv', 'sgh020177a7a91d.csv']
 
+# files of the published dataset (setup() replaces the list above, in place,
+# with the files found in the dataset directory and selected)
+DEFAULT_FILES = list(FILES)
+
+# threads reading the dataset files in setup()
+LOADING_WORKERS = min(8, os.cpu_count() or 1)
+
 #######################
 # AUXILIARY FUNCTIONS #
 #######################
@@ -74,722 +78,801 @@ def get_type(x):
 # READING FILES & SETUP #
 #########################
 
-def setup(datasetdir, title=True):
-    global df, SET_TITLES
-    SET_TITLES = title
+# engines that can be used to parse the dataset files
+CSV_ENGINES = ['c', 'pyarrow']
+
+# format of the 'date' column used by the 'pyarrow' engine
+# (None uses Arrow's ISO 8601 parser)
+DATE_FORMAT = None
+
+
+def open_zstd(file_path):
+    # only imported when needed, since it is an optional dependency
+    import zstandard
+    return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+
+
+# compressed variants of the dataset files, in the format
+#   extension -> function opening the file as a decompressed binary stream
+COMPRESSIONS = {
+    '.gz': gzip.open,
+    '.zst': open_zstd,
+    '.xz': lzma.open,
+}
+
+
+class PrefetchReader(io.RawIOBase):
+    # reads a stream in a background thread, so that the decompression
+    # of the next chunks happens while the previous ones are being parsed
+
+    def __init__(self, stream, chunk_size=1 << 20, max_chunks=8):
+        self.chunks = queue.Queue(max_chunks)
+        self.chunk = memoryview(b'')
+        self.finished = False
+        self.stopped = False
+        self.thread = threading.Thread(
+            target=self.fill, args=(stream, chunk_size), daemon=True)
+        self.thread.start()
+
+    def fill(self, stream, chunk_size):
+        try:
+            with stream:
+                while not self.stopped:
+                    chunk = stream.read(chunk_size)
+                    self.chunks.put(chunk)
+                    if not chunk:
+                        break
+        except Exception as e:
+            # errors are raised when the parser reaches them
+            self.chunks.put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.chunk and not self.finished:
+            chunk = self.chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            self.finished = not chunk
+            self.chunk = memoryview(chunk)
+
+        n = min(len(b), len(self.chunk))
+        b[:n] = self.chunk[:n]
+        self.chunk = self.chunk[n:]
+        return n
+
+    def close(self):
+        # stop the background thread, unblocking it if the queue is full
+        self.stopped = True
+        while self.thread.is_alive():
+            try:
+                self.chunks.get_nowait()
+            except queue.Empty:
+                self.thread.join(0.01)
+        super().close()
+
+
+def dataset_file_path(datasetdir, fi):
+    # the file may be kept as is or compressed, e.g. 'sgh<id>.csv.gz'
+    for extension in [''] + list(COMPRESSIONS):
+        file_path = os.path.join(datasetdir, fi + extension)
+        if os.path.exists(file_path):
+            return file_path
+    return None
+
+
+def read_dataset_file(file_path, engine='c'):
+    # compressed files are decompressed as a stream while being parsed
+    for extension, open_compressed in COMPRESSIONS.items():
+        if file_path.endswith(extension):
+            with io.BufferedReader(PrefetchReader(open_compressed(file_path))) as source:
+                return parse_dataset_file(source, engine)
+    return parse_dataset_file(file_path, engine)
+
+
+def parse_dataset_file(source, engine='c'):
+    if engine == 'c':
+        return pd.read_csv(source, parse_dates=['date'])
+
+    if engine == 'pyarrow':
+        # only imported when requested, since it is an optional dependency
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+
+        # explicit column types and timestamp format (no inference),
+        # with the blocks of the file decoded by several threads
+        table = pa_csv.read_csv(
+            source,
+            read_options=pa_csv.ReadOptions(use_threads=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={'date': pa.timestamp('ns'), 'info': pa.string()},
+                timestamp_parsers=[DATE_FORMAT or pa_csv.ISO8601]
+            )
+        )
+        return table.to_pandas()
+
+    raise ValueError(
+        "Unknown engine \'{0}\', expected one of {1}.".format(engine, CSV_ENGINES))
 
-    # appending data from all files
-    df_list = []
-    for fi in FILES:
-        file_path = os.path.join(datasetdir, fi)
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(
-                "Path \'{0}\' does not contain the dataset files.".format(datasetdir))
-
-        dff = pd.read_csv(file_path, parse_dates=['date'])
-        dff['tenant'] = fi
-        df_list.append(dff)
-    df = pd.concat(df_list, verify_integrity=True, ignore_index=True)
-
-    # transforming strings in JSON objects
-    df['info'] = df['info'].apply(lambda x: json.loads(x))
 
-    # removing column 'tenant' and place its values in the info JSON object
-    t = df.pop('tenant')
-    for i in range(len(df)):
-        df['info'][i]['tenant'] = t[i]
+################################################################
+#                    TENANT DISCOVERY                          #
+################################################################
+# - file_metadata                                              #
+# - write_tenant_manifest                                      #
+# - file_order                                                 #
+# - discover_tenants                                           #
+# - select_tenants                                             #
+# - loading_plan                                               #
+################################################################
 
-    # transforming JSON object into various columns
-    df = pd.concat([df.drop(['info'], axis=1),
-                   pd.json_normalize(df['info'])], axis=1)
+# pattern of the names of the dataset files (kept as is or compressed)
+TENANT_PATTERN = 'sgh*.csv'
 
-    # set index to date
-    df.set_index('date', inplace=True)
+# file of a dataset directory with the metadata of each dataset file
+TENANT_MANIFEST = 'tenants.json'
 
-    # only values after 3rd January 2019 were considered
-    df = df[df.index > '2019-03-01']
 
-    # adding a new column with the type of sensor for each entry
-    df['sensor'] = df.apply(lambda x: get_type(x), axis=1)
+def file_metadata(file_path):
+    # rows, dates of the first and last rows and size of a dataset file,
+    # counting its lines block by block instead of parsing it
+    opener = next((open_compressed for extension, open_compressed in COMPRESSIONS.items()
+                   if file_path.endswith(extension)), lambda path: open(path, 'rb'))
+    head, tail, lines = b'', b'', 0
+    with opener(file_path) as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            head = head if len(head) >= 1 << 16 else head + block
+            tail = (tail + block)[-(1 << 16):]
+            lines += block.count(b'\n')
 
+    # the header is not a row, while a last row without a line break is
+    rows = [line for line in head.split(b'\n', 2)[1:2] + tail.rsplit(b'\n', 2)[-2:] if line.strip()]
+    def row_date(line): return pd.Timestamp(line.split(b',', 1)[0].decode().strip('"')).isoformat()
+    return {
+        'rows': lines - 1 + (not tail.endswith(b'\n')) if rows else 0,
+        'first': row_date(rows[0]) if rows else None,
+        'last': row_date(rows[-1]) if rows else None,
+        'size': os.path.getsize(file_path)
+    }
 
-################################################################
-#                       CREATE CHARTS                          #
-################################################################
-# - relative_amount_data_by_month                              #
-# - average_temperature_by_month                               #
-# - average_humidity_by_month                                  #
-# - average_temperature_by_week                                #
-# - average_humidity_by_week                                   #
-# - relative_occupancy_by_hour                                 #
-# - relative_occupancy_by_hour_week                            #
-# - average_temperature_by_hour (w/wo std)                     #
-# - average_temperature_by_hour_with_occupancy (w/wo std)      #
-# - average_temperature_by_hour_week (w/wo std)                #
-# - average_temperature_by_hour_week_with_occupancy (w/wo std) #
-################################################################
 
-def relative_amount_data_by_month():
-    # resample data by day, counting the number of entries
-    data_count_day = df.resample('d', label='left')['sensor'].count()
-
-    # get average of number of regists per day in each month
-    avg_data_month = data_count_day.resample('m', label='right').mean()
-
-    # get highest value
-    max_avg_data_month = max(avg_data_month)
-
-    # calculate data missing in relation to the highest value
-    missing = 1 - avg_data_month/max_avg_data_month
-
-    # create plot and assign labels
-    ax = missing.plot.bar(
-        label='relative amount of missing data',
-        xlabel='Months',
-        ylabel='Relative Data Missing',
-        title='Relative Data Missing by Month' if SET_TITLES else '',
-        linewidth=2,
-        width=0.7,
-        edgecolor='black',
-        color=BLUE
+def write_tenant_manifest(datasetdir):
+    # metadata of every dataset file of the directory, so that later runs
+    # plan their loading without reading the files
+    manifest = {fi: file_metadata(file_path) for fi, file_path in discover_tenants(datasetdir, manifest=False).items()}
+    with open(os.path.join(datasetdir, TENANT_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def file_order(fi):
+    # the files of the default list first, in its order, and then the others
+    return DEFAULT_FILES.index(fi) if fi in DEFAULT_FILES else len(DEFAULT_FILES)
+
+
+def discover_tenants(datasetdir, manifest=True):
+    # dataset files of the directory (one per tenant), named after the tenant
+    # without the extension of its compression, in the format
+    #   tenant file -> path of the file
+    manifest_path = os.path.join(datasetdir, TENANT_MANIFEST)
+    if manifest and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            names = list(json.load(f))
+    else:
+        names = sorted({name[:-len(extension)] if extension and name.endswith(extension) else name
+                        for name in os.listdir(datasetdir)
+                        for extension in [''] + list(COMPRESSIONS)
+                        if fnmatch.fnmatch(name, TENANT_PATTERN + extension)})
+
+    names.sort(key=file_order)
+    tenants = {fi: dataset_file_path(datasetdir, fi) for fi in names}
+    return {fi: file_path for fi, file_path in tenants.items() if file_path is not None}
+
+
+def select_tenants(tenants, include=None, exclude=None):
+    # tenant files matching any of the included patterns (all when not given)
+    # and none of the excluded ones; a pattern matches the name of the
+    # file with or without its '.csv' extension, e.g. 'sgh0201a8c87da4' or 'sgh0201a*'
+    def matches(fi, patterns):
+        return any(fnmatch.fnmatch(fi, pattern) or fnmatch.fnmatch(fi[:-len('.csv')], pattern)
+                   for pattern in patterns)
+
+    for patterns in [include or [], exclude or []]:
+        unmatched = [pattern for pattern in patterns if not any(matches(fi, [pattern]) for fi in tenants)]
+        if unmatched:
+            raise ValueError("No tenant matches {0}, expected some of {1}.".format(
+                ', '.join(repr(pattern) for pattern in unmatched), ', '.join(tenants)))
+    return [fi for fi in tenants if (include is None or matches(fi, include)) and not matches(fi, exclude or [])]
+
+
+def loading_plan(costs, workers):
+    # files read by each worker, so that every worker does about the same work:
+    # the largest files first, each one to the worker with the least work so far
+    loads = [(0, worker) for worker in range(workers)]
+    plan = [[] for _ in range(workers)]
+    for fi in sorted(costs, key=costs.get, reverse=True):
+        load, worker = heapq.heappop(loads)
+        plan[worker].append(fi)
+        heapq.heappush(loads, (load + costs[fi], worker))
+    return [files for files in plan if files]
+
+
+# patterns of the keys of the raw JSON text of each type of sensor,
+# checked in the same order as get_type
+RAW_SENSOR_KEYS = [
+    ('system', r'"state"\s*:'),
+    ('meteo', r'"windspeed"\s*:'),
+    ('various', r'"temperature"\s*:'),
+    ('door', r'"contact"\s*:'),
+    ('movement', r'"illuminance"\s*:'),
+    ('feedback', r'"feedback"\s*:'),
+]
+
+# seed of the random choice of the sampled entries
+SAMPLE_SEED = 0
+
+
+def sample_entries(raw, fraction, seed=SAMPLE_SEED):
+    # type of sensor of each entry, from its raw JSON text (without decoding it)
+    sensor = np.select(
+        [raw['info'].str.contains(pattern) for _, pattern in RAW_SENSOR_KEYS],
+        [sensor for sensor, _ in RAW_SENSOR_KEYS],
+        'other'
     )
+    month = raw['date'].dt.year * 12 + raw['date'].dt.month
 
-    # take care of axis labels and legend
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    locale.setlocale(locale.LC_ALL, 'en_GB')
-    x_labels = missing.index.strftime('%b %y')
-    locale.resetlocale()
-    ax.set_xticklabels(x_labels)
-    ax.set_axisbelow(True)
-    ax.legend()
-    plt.grid(True, which='both', axis='y', color='gray', linestyle='-.')
-    return ax
-
-
-def average_temperature_by_month():
-    # resample data by month, averaging the temperature values
-    res_month = df[is_various].resample('m', label='left')[
-        ['temperature']].mean()
-
-    # plot the temperature values, calculating the mean for each month
-    avg_month = res_month.groupby(res_month.index.month).mean()
-    ax = avg_month['temperature'].plot(
-        xticks=avg_month.index,
-        label='temperature value',
-        ylabel='Temperature (ºC)',
-        xlabel='Months',
-        title='Average Temperature by Month' if SET_TITLES else '',
-        marker='o',
-        markersize=7,
-        markeredgecolor=BLACK,
-        markeredgewidth=2,
-        linestyle='--',
-        markerfacecolor=RED,
-        color='black',
-        linewidth=2
-    )
+    # stratum (tenant, type of sensor and month) of each entry
+    strata = raw.groupby([raw['tenant'], sensor, month],
+                         sort=False).ngroup().to_numpy()
+    sizes = np.bincount(strata)
 
-    # take care of axis labels and legend
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    x_labels = pd.to_datetime(
-        avg_month.index, format='%m').month_name().str.slice(stop=3)
-    ax.set_xticklabels(x_labels)
-    ax.legend()
-    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
-    return ax
-
-
-def average_humidity_by_month():
-    # resample data by month, averaging the humidity values
-    res_month = df[is_various].resample('m', label='left')[['humidity']].mean()
-
-    # plot the humidity values, calculating the mean for each month
-    avg_month = res_month.groupby(res_month.index.month).mean()
-    ax = avg_month['humidity'].plot(
-        xticks=avg_month.index,
-        label='humidity value',
-        ylabel='Relative Humidity (%)',
-        xlabel='Months',
-        title='Average Humidity by Month' if SET_TITLES else '',
-        marker='o',
-        markersize=7,
-        markeredgecolor=BLACK,
-        markeredgewidth=2,
-        linestyle='--',
-        markerfacecolor=BLUE,
-        color='black',
-        linewidth=2
-    )
+    # entries of each stratum in random order: the first ones (the fraction
+    # of the stratum, at least one) are kept
+    order = np.lexsort((np.random.default_rng(seed).random(len(raw)), strata))
+    position = np.empty(len(raw), dtype=np.int64)
+    position[order] = np.arange(len(raw)) - \
+        (np.cumsum(sizes) - sizes)[strata[order]]
+    return position < np.ceil(sizes * fraction)[strata]
 
-    # take care of axis labels and legend
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    x_labels = pd.to_datetime(
-        avg_month.index, format='%m').month_name().str.slice(stop=3)
-    ax.set_xticklabels(x_labels)
-    ax.legend()
-    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
-    return ax
-
-
-def average_temperature_by_week():
-    # resample data by week, averaging the temperature values
-    res_week = df[is_various].resample('w', label='left')[
-        ['temperature']].mean()
-
-    # plot the temperature values, joining the weeks calculating their mean
-    avg_week = res_week.groupby(
-        pd.Index(res_week.index.isocalendar().week, dtype=np.int64)).mean()
-    ax = avg_week['temperature'].plot(
-        label='temperature value',
-        xticks=avg_week.index[::5],
-        ylabel='Temperature (ºC)',
-        xlabel='Weeks',
-        title='Average Temperature by Week' if SET_TITLES else '',
-        marker='o',
-        markersize=7,
-        markeredgecolor='black',
-        markeredgewidth=2,
-        linestyle='--',
-        markerfacecolor=RED,
-        color=BLACK,
-        linewidth=2
-    )
 
-    # take care of axis labels and legend
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    ax.legend()
-    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
-    return ax
-
-
-def average_humidity_by_week():
-    # resample data by week, averaging the temperature and humidity values
-    res_week = df[is_various].resample('w', label='left')[['humidity']].mean()
-
-    # plot the humidity values, joining the weeks calculating their mean
-    avg_week = res_week.groupby(
-        pd.Index(res_week.index.isocalendar().week, dtype=np.int64)).mean()
-    ax = avg_week['humidity'].plot(
-        label='humidity value',
-        xticks=avg_week.index[::5],
-        ylabel='Relative Humidity (%)',
-        xlabel='Weeks',
-        title='Average Humidity by Week' if SET_TITLES else '',
-        marker='o',
-        markersize=7,
-        markeredgecolor=BLACK,
-        markeredgewidth=2,
-        linestyle='--',
-        markerfacecolor=BLUE,
-        color=BLACK,
-        linewidth=2
-    )
+# longest delay between two entries of a tenant with the same raw JSON text
+# (device and payload) for the second one to be taken as a copy re-sent by the
+# device; None only takes as copies the entries with the same date as well
+DUPLICATE_TOLERANCE = None
 
-    # take care of axis labels and legend
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    ax.legend()
-    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
-    return ax
-
-
-def relative_occupancy_by_hour():
-    # get all the entries with movement detected resampled per hour
-    df_mov = df[df['occupancy'] == True].resample('h')
-
-    # get number of different tenants where movement was detected per hour
-    mov_sum = df_mov['tenant'].nunique()
-
-    # sum those values per hour
-    people_home_per_hour = mov_sum.groupby(mov_sum.index.hour).sum()
-
-    # divide the obtained values by the maximum number found
-    people_home_hour_perc = people_home_per_hour/max(people_home_per_hour)
-
-    # create plot
-    ax = people_home_hour_perc.plot(
-        label='relative number of occupancy entries',
-        xticks=people_home_per_hour.index[::2],
-        title='Relative Occupancy by Hour' if SET_TITLES else '',
-        ylabel='Relative Presence',
-        xlabel='Hours',
-        marker='o',
-        markersize=7,
-        markeredgecolor=BLACK,
-        markeredgewidth=2,
-        linestyle='--',
-        markerfacecolor=PURPLE,
-        color=BLACK,
-        linewidth=2,
-        figsize=(7, 4)
-    )
 
-    # take care of axis labels and legend
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    x_labels = [f'{h:02d}:00' for h in people_home_per_hour.index[::2]]
-    ax.set_xticklabels(x_labels)
-    ax.legend()
-    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
-    return ax
-
-
-def relative_occupancy_by_hour_week():
-
-    # get all the entries with movement detected resampled per hour
-    df_mov = df[df['occupancy'] == True].resample('h')
-
-    # get number of different tenants where movement was detected per hour
-    mov_sum = df_mov['tenant'].nunique()
-
-    # group data by day of the week and hour in the respective day
-    presenca_hour_week = mov_sum.groupby(
-        [mov_sum.index.dayofweek, mov_sum.index.hour]).sum()
-
-    # normalize values
-    presenca_hour_week = presenca_hour_week / max(presenca_hour_week)
-
-    # plot the marks with the colour correspondent to the occupance/presence
-    ax = presenca_hour_week.plot(
-        label='relative number of occupancy entries',
-        ylabel='Relative Occupancy',
-        xlabel='Days of the Week, Hours',
-        marker='o',
-        xticks=range(len(presenca_hour_week.index)+1)[::12],
-        markersize=5,
-        markeredgecolor=BLACK,
-        markeredgewidth=1,
-        linestyle='-',
-        markerfacecolor=PURPLE,
-        color=BLACK,
-        linewidth=2,
-        figsize=(9, 4)
-    )
-    plt.title('Average Occupancy by Hours in a Week' if SET_TITLES else '')
-
-    # take care of axis labels and legend
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    xlabels = [DAYS[wday][:3] + ', \n' +
-               f'{hour:02d}' + ':00' for (wday, hour) in presenca_hour_week.index[::12]]
-    xlabels.append(xlabels[0])
-    ax.xaxis.set_ticklabels(xlabels)
-    ax.legend()
-    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
-    return ax
-
-
-def average_temperature_by_hour(with_std=False):
-    # resample data by hour, averaging the values
-    df_var = df[is_various].resample('h').mean()
-
-    # group values by their mean and standard deviation per hour
-    df_var_group_by_hour_day = df_var.groupby(
-        df_var.index.hour).agg(['mean', 'std'])
-
-    # plot the temperature values
-    temp_mean = df_var_group_by_hour_day['temperature']['mean']
-    ax = temp_mean.plot(
-        label='temperature value',
-        xticks=df_var_group_by_hour_day.index[::2],
-        ylabel='Temperature (ºC)',
-        xlabel='Hours',
-        title='Average Temperature by Hour' if SET_TITLES else '',
-        marker='o',
-        markersize=7,
-        markeredgecolor=BLACK,
-        markeredgewidth=2,
-        linestyle='--',
-        markerfacecolor=RED,
-        color=BLACK,
-        linewidth=2,
-        figsize=(7, 4)
-    )
+def duplicate_entries(raw, tolerance=DUPLICATE_TOLERANCE):
+    # hash of the tenant and the raw JSON text of each entry
+    keys = pd.util.hash_pandas_object(raw[['tenant', 'info']], index=False).to_numpy()
+    dates = raw['date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
 
-    # take care of axis labels and legend
-    x_labels = [f'{h:02d}:00' for h in df_var_group_by_hour_day.index[::2]]
-    ax.set_xticklabels(x_labels)
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    ax.legend()
-    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
-
-    if (not with_std):
-        return ax
-
-    # --- show the standard deviation range shadow ---
-    # saving the averages and the standard deviation data
-    temp_std = df_var_group_by_hour_day['temperature']['std']
-
-    # add standar deviation range shadow and update legend and title
-    ax.fill_between(
-        label='standard deviation range',
-        x=range(0, 24),
-        y1=temp_mean-temp_std,
-        y2=temp_mean+temp_std,
-        alpha=.15,
-        color=BLUE
-    )
-    plt.title('Average Temperature by Hour with Standard Deviation Range' if SET_TITLES else '',
-              fontdict={'fontsize': 11})
-    ax.legend()
-    return ax
+    # entries sorted by hash and date (the order of the file among equal ones):
+    # an entry repeats the previous one when both have the same hash and
+    # the same date, or a date at most 'tolerance' later
+    order = np.lexsort((dates, keys))
+    keys, dates = keys[order], dates[order]
+    window = 0 if tolerance is None else pd.Timedelta(tolerance).value
+    repeated = np.r_[False, (keys[1:] == keys[:-1]) & (dates[1:] - dates[:-1] <= window)]
+
+    # the (few) repeats are confirmed by their text, since different entries may share a hash
+    candidates = np.flatnonzero(repeated)
+    for column in ['tenant', 'info']:
+        values = raw[column].to_numpy(dtype=object)
+        repeated[candidates] &= values[order[candidates]] == values[order[candidates - 1]]
+
+    duplicated = np.zeros(len(raw), dtype=bool)
+    duplicated[order] = repeated
+    return duplicated
 
 
-def average_temperature_by_hour_with_occupancy(with_std=False):
-    # ---- deal with occupance data ----
-    # get all the entries with movement detected resampled per hour
-    df_mov = df[df['occupancy'] == True].resample('h')
+def recent_entries(raw, tolerance=DUPLICATE_TOLERANCE):
+    # entries at most 'tolerance' before the last entry of their tenant (the
+    # copies among them included): an entry appended later can only repeat these
+    dates = raw['date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    last = pd.Series(dates).groupby(raw['tenant'].to_numpy(dtype=object)).transform('max').to_numpy()
+    window = 0 if tolerance is None else pd.Timedelta(tolerance).value
+    return raw.loc[dates >= last - window, ['date', 'info', 'tenant']].reset_index(drop=True)
 
-    # get number of different tenants where movement was detected per hour
-    mov_sum = df_mov['tenant'].nunique()
 
-    # sum those values per hour
-    people_home_per_hour = mov_sum.groupby(mov_sum.index.hour).sum()
+def decode_entries(raw):
+    # decode the raw JSON text of the entries (numbered from 0, with their tenant)
+    # into a column per field, indexed by date and with the type of sensor of each entry
 
-    # divide the obtained values by the maximum number found
-    people_home_hour_perc = people_home_per_hour/max(people_home_per_hour)
+    # transforming strings in JSON objects
+    df = raw.assign(info=raw['info'].apply(lambda x: json.loads(x)))
 
-    # create list with percentage values
-    perc_values = people_home_hour_perc.values
+    # removing column 'tenant' and place its values in the info JSON object
+    t = df.pop('tenant')
+    for i in range(len(df)):
+        df['info'][i]['tenant'] = t[i]
 
-    # ---- deal with temperature data ----
-    # resample data by hour, averaging the values
-    df_var = df[is_various].resample('h').mean()
+    # transforming JSON object into various columns
+    df = pd.concat([df.drop(['info'], axis=1),
+                   pd.json_normalize(df['info'])], axis=1)
 
-    # group values by their mean and standard deviation per hour
-    df_var_group_by_hour_day = df_var.groupby(
-        df_var.index.hour).agg(['mean', 'std'])
+    # set index to date
+    df.set_index('date', inplace=True)
 
-    temp_means = df_var_group_by_hour_day['temperature']['mean']
+    # only values after 3rd January 2019 were considered
+    df = df[df.index > '2019-03-01']
 
-    # plot the temperature values - only a line
-    ax = temp_means.plot(
-        xticks=df_var_group_by_hour_day.index[::2],
-        ylabel='Temperature (ºC)',
-        xlabel='Hours',
-        linestyle='--',
-        color=BLACK,
-        linewidth=2,
-        zorder=1,
-        figsize=(9, 4)
-    )
+    # adding a new column with the type of sensor for each entry
+    df['sensor'] = df.apply(lambda x: get_type(x), axis=1)
+    return df
 
-    # plot the marks with the colour correspondent to the occupance/presence
-    ax1 = plt.scatter(
-        x=temp_means.index,
-        y=temp_means,
-        c=perc_values,
-        cmap='YlGnBu',
-        s=70,
-        marker='s',
-        edgecolors='black',
-        linewidths=1,
-        zorder=2
-    )
 
-    # take care of axis labels and legend
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    x_labels = [f'{h:02d}:00' for h in df_var_group_by_hour_day.index[::2]]
-    ax.set_xticklabels(x_labels)
-    legend_elements = [
-        Line2D(
-            [0],
-            [0],
-            label='temperature value with occupancy information',
-            lw=2,
-            color=BLACK,
-            marker='s',
-            markeredgecolor=BLACK,
-            markerfacecolor=BLUE,
-            markersize=8.3,
-            markeredgewidth=1
-        )]
-    ax.legend(handles=legend_elements)
-
-    # take care of the colour legend for the presence
-    plt.colorbar(ax1, ax=ax, label='Relative Presence Scale')
-
-    plt.title('Average Temperature by Hour with Occupancy Information' if SET_TITLES else '',
-              fontdict={'fontsize': 11})
-    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
-
-    if not with_std:
-        return ax
-
-    # --- show the standard deviation range shadow ---
-    # save standard deviation data
-    temp_std = df_var_group_by_hour_day['temperature']['std']
-
-    # add standard deviation range shadow and update legend and title
-    plt.fill_between(x=range(0, 24), y1=temp_means-temp_std,
-                     y2=temp_means+temp_std, alpha=.1, color=BLUE)
-    plt.title('Average Temperature by Hour with Occupancy Information and Standard Deviation Range' if SET_TITLES else '',
-              fontdict={'fontsize': 9})
-    legend_elements += [Patch(facecolor=BLUE,
-                              label='standard deviation range', alpha=.15)]
-    ax.legend(handles=legend_elements)
-    return ax
-
-
-def average_temperature_by_hour_week(with_std=False):
-    # resample data by hour, averaging the values
-    df_var = df[is_various].resample('h').mean()
-
-    # group data by week and hour of the day
-    df_var_group = df_var.groupby(
-        [df_var.index.dayofweek, df_var.index.hour]).agg(['mean', 'std'])
-
-    # plot the temperature values
-    temp_mean = df_var_group['temperature']['mean']
-    ax = temp_mean.plot(
-        label='temperature value',
-        ylabel='Temperature (ºC)',
-        xlabel='Days of the Week, Hours',
-        marker='o',
-        markersize=5,
-        markeredgecolor=BLACK,
-        markeredgewidth=1,
-        linestyle='-',
-        markerfacecolor=RED,
-        color=BLACK,
-        linewidth=2,
-        figsize=(9, 4)
-    )
+def setup(datasetdir, title=True, engine='c', sample=None, deduplicate=True, duplicate_tolerance=DUPLICATE_TOLERANCE,
+          tenants=None, exclude=None, workers=LOADING_WORKERS):
+    global df, pyramid, event_index, SET_TITLES, SAMPLE_FRACTION, removed_duplicates, loaded_sizes, last_entries
+    SET_TITLES = title
+    SAMPLE_FRACTION = sample
+
+    # only the files of the selected tenants are opened
+    found = discover_tenants(datasetdir) if os.path.isdir(datasetdir) else {}
+    if not found:
+        raise FileNotFoundError(
+            "Path \'{0}\' does not contain the dataset files.".format(datasetdir))
+    FILES[:] = select_tenants(found, tenants, exclude)
+
+    # the files are split among the workers by their number of rows (from the
+    # manifest, when there is one) or their size
+    manifest_path = os.path.join(datasetdir, TENANT_MANIFEST)
+    metadata = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            metadata = json.load(f)
+    costs = {fi: metadata[fi]['rows'] if fi in metadata else os.path.getsize(found[fi]) for fi in FILES}
+
+    # the size of each file is taken as soon as it was read, so that the
+    # rows appended later (e.g. while the charts are saved) are not missed
+    def read_files(files):
+        read = {}
+        for fi in files:
+            read[fi] = (read_dataset_file(found[fi], engine).assign(tenant=fi), os.path.getsize(found[fi]))
+        return read
+
+    # appending data from all files (in the order of FILES)
+    frames = {}
+    loaded_sizes = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for files in executor.map(read_files, loading_plan(costs, max(1, workers))):
+            for fi, (frame, size) in files.items():
+                frames[fi] = frame
+                loaded_sizes[fi] = size
+    df_list = [frames[fi] for fi in FILES]
+    df = pd.concat(df_list, verify_integrity=True, ignore_index=True)
 
-    # take care of axis labels and legend
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    plt.title('Average Temperature by Hours in a Week')
-    ax.set_xticks(range(len(df_var_group.index)+1)[::12])
-    xlabels = [DAYS[wday][:3] + ', \n' +
-               f'{hour:02d}:00' for (wday, hour) in df_var_group.index[::12]]
-    xlabels += [xlabels[0]]
-    ax.set_xticklabels(xlabels)
-    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
-    ax.legend()
-
-    if (not with_std):
-        return ax
-
-    # --- show the standard deviation range shadow ---
-    # save standard deviation data
-    temp_std = df_var_group['temperature']['std']
-
-    # add standar deviation range shadow and update legend and title
-    plt.fill_between(label='standard deviation range', x=range(len(
-        temp_mean)), y1=temp_mean-temp_std, y2=temp_mean+temp_std, alpha=.15, color=BLUE)
-    plt.title('Average Temperature by Hours in a Week with Standard Deviation Range',
-              fontdict={'fontsize': 10})
-    ax.legend()
-    return ax
-
-
-def average_temperature_by_hour_week_with_occupancy(with_std=False):
-    # ---- deal with occupance data ----
-    # get all the entries with movement detected resampled per hour
-    df_mov = df[df['occupancy'] == True].resample('h')
-
-    # get number of different tenants where movement was detected per hour
-    mov_sum = df_mov['tenant'].nunique()
-
-    # group data by day of the week and hour in the respective day and sum
-    presenca_hour_week = mov_sum.groupby(
-        [mov_sum.index.dayofweek, mov_sum.index.hour]).sum()
-
-    # divide the obtained values by the maximum number found
-    presenca_hour_week = presenca_hour_week / max(presenca_hour_week)
-
-    # create list with percentage values
-    perc_values = presenca_hour_week.values
-
-    # ---- deal with temperature data ----
-    # resample data by hour, averaging the values
-    df_var = df[is_various].resample('h').mean()
-
-    # group values by their mean and standard deviation per hour
-    df_var_group = df_var.groupby(
-        [df_var.index.dayofweek, df_var.index.hour]).agg(['mean', 'std'])
-
-    # save average temperature data
-    temp_means = df_var_group['temperature']['mean']
-
-    # plot the temperature values - only a line
-    ax = temp_means.plot(
-        ylabel='Temperature (ºC)',
-        xlabel='Days of the Week, Hours',
-        xticks=range(len(presenca_hour_week.index)+1)[::12],
-        linestyle='--',
-        color=BLACK,
-        linewidth=2,
-        zorder=1,
-        figsize=(10, 4)
-    )
+    # removing the copies of the entries re-sent by the devices, keeping the first one
+    duplicated = duplicate_entries(df, duplicate_tolerance) if deduplicate else np.zeros(len(df), dtype=bool)
+    removed_duplicates = df['tenant'][duplicated].value_counts().reindex(FILES, fill_value=0)
+    last_entries = recent_entries(df, duplicate_tolerance)
+    df = df[~duplicated].reset_index(drop=True)
 
-    # plot the marks with the colour correspondent to the occupance/presence
-    ax1 = plt.scatter(
-        x=range(len(temp_means)),
-        y=temp_means,
-        c=perc_values,
-        cmap='YlGnBu',
-        s=70,
-        marker='s',
-        edgecolors=BLACK,
-        linewidths=1,
-        zorder=2
-    )
+    # keeping a sample of the entries, stratified by tenant, type of
+    # sensor and month, before the (slow) decoding of the JSON objects
+    if sample is not None:
+        df = df[sample_entries(df, sample)].reset_index(drop=True)
 
-    # take care of axis labels and legend
-    xlabels = [DAYS[wday][:3] + ', \n' +
-               f'{hour:02d}' + ':00' for (wday, hour) in presenca_hour_week.index[::12]]
-    xlabels.append(xlabels[0])
-    ax.xaxis.set_ticklabels(xlabels)
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
-    plt.title('Average Temperature by Hours in a Week with Occupancy Information' if SET_TITLES else '',
-              fontdict={'fontsize': 11})
-    legend_elements = [
-        Line2D(
-            [0],
-            [0],
-            label='Temperature Value',
-            lw=2,
-            color=BLACK,
-            marker='s',
-            markeredgecolor=BLACK,
-            markerfacecolor=BLUE,
-            markersize=8.3,
-            markeredgewidth=1
-        )]
-    ax.legend(handles=legend_elements)
-
-    # take care of the colour legend for the presence
-    plt.colorbar(ax1, ax=ax, label='Relative Presence Scale')
-    plt.grid(True, which='both', axis='both', color='gray', linestyle='-.')
-
-    if not with_std:
-        return ax
-
-    # --- show the standard deviation range shadow ---
-    # save standard deviation data
-    temp_std = df_var_group['temperature']['std']
-
-    # add standard deviation range shadow and update legend and title
-    plt.fill_between(x=range(len(temp_means)), y1=temp_means -
-                     temp_std, y2=temp_means+temp_std, alpha=.1)
-    plt.title(
-        'Average Temperature by Hours in a Week with Occupancy Information and Standard Deviation Range' if SET_TITLES else '',
-        fontdict={'fontsize': 10}
-    )
-    legend_elements += [Patch(facecolor=BLUE,
-                              label='Standard Deviation Range', alpha=.15)]
-    ax.legend(handles=legend_elements)
-    return ax
+    df = decode_entries(df)
+
+    # the pyramid and the event index of the previous dataset (if any) are no longer valid
+    pyramid = None
+    event_index = None
 
 
 ################################################################
-#                      CREATE CHARTS 2                         #
+#                    SHARED DATASET                            #
 ################################################################
-# - correlation_temperature                                    #
-# - correlation humidity                                       #
-# - correlation_pressure                                       #
-# - correlation_occupancy                                      #
+# - publish_dataset                                            #
+# - attach_dataset                                             #
 ################################################################
 
+# file describing the columns of a published dataset
+SHARED_MANIFEST = 'manifest.json'
 
-def correlation_temperature():
-    temp_tenant_day = df[is_various].groupby('tenant').resample(
-        'd', label='left')[['temperature']].mean().reset_index()
-
-    temp_tenant_day = temp_tenant_day.pivot(
-        index='date', columns='tenant', values='temperature')
 
-    temperature_corr = temp_tenant_day.corr()
-
-    plt.title(
-        'Correlation Between the Temperature Values of Different Tenants' if SET_TITLES else '',
-        fontdict={'fontsize': 10}
-    )
-    ax = sns.heatmap(
-        temperature_corr,
-        annot=False,
-        yticklabels=False,
-        xticklabels=False,
-        linewidths=.8,
-        cmap="YlGnBu"
-    )
-    return ax
+def publish_dataset(path, dataframe=None):
+    dataframe = df if dataframe is None else dataframe
+    os.makedirs(path, exist_ok=True)
 
+    # the dates are kept as nanoseconds since the epoch (UTC)
+    index = dataframe.index
+    np.save(os.path.join(path, 'date.npy'), index.asi8)
+    manifest = {
+        'rows': len(dataframe),
+        'timezone': str(index.tz) if index.tz is not None else None,
+        'columns': []
+    }
 
-def correlation_humidity():
-    humid_tenant_day = df[is_various].groupby('tenant').resample(
-        'd', label='left')[['humidity']].mean().reset_index()
+    # numeric columns are stored as they are, while the remaining ones
+    # (strings and booleans with missing values) are stored as the
+    # integer codes of a categorical, along with their categories
+    for i, (name, column) in enumerate(dataframe.items()):
+        file_name = f'{i}.npy'
+        if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_categorical_dtype(column):
+            np.save(os.path.join(path, file_name), column.to_numpy())
+            categories = None
+        else:
+            categorical = pd.Categorical(column)
+            np.save(os.path.join(path, file_name), categorical.codes)
+            categories = categorical.categories.tolist()
+        manifest['columns'].append(
+            {'name': name, 'file': file_name, 'categories': categories})
+
+    # the manifest is written last, so that workers never attach to a partial dataset
+    with open(os.path.join(path, SHARED_MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+
+
+def attach_dataset(path, title=True):
+    global df, pyramid, event_index, SET_TITLES
+    SET_TITLES = title
 
-    humid_tenant_day = humid_tenant_day.pivot(
-        index='date', columns='tenant', values='humidity')
+    with open(os.path.join(path, SHARED_MANIFEST)) as f:
+        manifest = json.load(f)
 
-    humidity_corr = humid_tenant_day.corr()
+    # every column is memory-mapped read-only, so the pages are shared by all
+    # the processes attached to the same files instead of copied into each one
+    def load(file_name): return np.load(
+        os.path.join(path, file_name), mmap_mode='r')
 
-    plt.title(
-        'Correlation Between the Humidity Values of Different Tenants' if SET_TITLES else '',
-        fontdict={'fontsize': 10}
-    )
-    ax = sns.heatmap(
-        humidity_corr,
-        annot=False,
-        yticklabels=False,
-        xticklabels=False,
-        linewidths=.8,
-        cmap="YlGnBu"
-    )
-    return ax
+    # the index is copied, since some pandas routines (e.g. floor) do not
+    # accept read-only buffers; it takes 8 bytes per entry
+    index = pd.DatetimeIndex(np.array(load('date.npy')).view('M8[ns]'), name='date')
+    if manifest['timezone'] is not None:
+        index = index.tz_localize('UTC').tz_convert(manifest['timezone'])
 
+    columns = {}
+    for column in manifest['columns']:
+        values = load(column['file'])
+        if column['categories'] is not None:
+            values = pd.Categorical.from_codes(values, column['categories'])
+        columns[column['name']] = pd.Series(values, index=index, copy=False)
 
-def correlation_pressure():
-    pressure_tenant_day = df[is_various].groupby('tenant').resample(
-        'd', label='left')[['pressure']].mean().reset_index()
+    # copy=False keeps one block per column, pointing to the mapped files
+    df = pd.DataFrame(columns, copy=False)
+    pyramid = None
+    event_index = None
+    return df
 
-    pressure_tenant_day = pressure_tenant_day.pivot(
-        index='date', columns='tenant', values='pressure')
 
-    temperature_corr = pressure_tenant_day.corr()
+################################################################
+#                         STREAMS                              #
+################################################################
+# - to_dates / wall_times                                      #
+# - sorted_streams                                             #
+# - split_intervals                                            #
+# - downsample                                                 #
+################################################################
 
-    plt.title(
-        'Correlation Between the Pressure Values of Different Tenants' if SET_TITLES else '',
-        fontdict={'fontsize': 10}
-    )
-    ax = sns.heatmap(
-        temperature_corr,
-        annot=False,
-        yticklabels=False,
-        xticklabels=False,
-        linewidths=.8,
-        cmap="YlGnBu"
-    )
-    return ax
+def to_dates(values, tz):
+    # convert nanoseconds since the epoch (UTC) into dates in the timezone of the dataset
+    dates = pd.to_datetime(values)
+    return dates.tz_localize('UTC').tz_convert(tz) if tz is not None else dates
+
+
+def sorted_streams(dataframe, keys):
+    # integer code of the stream of each entry, combining the codes of its
+    # keys; a missing key (e.g. the device of the meteo entries) has a code
+    # of its own, also in categorical columns (where groupby gives it -1)
+    codes = np.zeros(len(dataframe), dtype=np.int64)
+    for key in keys:
+        key_codes, uniques = pd.factorize(np.asarray(dataframe[key], dtype=object))
+        key_codes[key_codes < 0] = len(uniques)
+        codes = codes * (len(uniques) + 1) + key_codes
+    codes = pd.factorize(codes)[0]
+    times = dataframe.index.asi8
+
+    # entries sorted by stream and, inside each stream, by time
+    order = np.lexsort((times, codes))
+    codes, times = codes[order], times[order]
+
+    # run-length encoding of the sorted codes: each run is a stream
+    run_starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    run_ends = np.r_[run_starts[1:], len(codes)]
+
+    # values of the keys for each stream
+    streams = dataframe[keys].iloc[order[run_starts]].reset_index(drop=True)
+    return order, times, run_starts, run_ends, streams
+
+
+def wall_times(dates):
+    # nanoseconds of the local (wall clock) time of each date
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.to_numpy(dtype='datetime64[ns]').view('i8')
+
+
+def split_intervals(starts, ends, freq):
+    # split each interval [start, end) (in nanoseconds) at the boundaries
+    # of the buckets of the frequency, without looping over the intervals
+    size = pd.tseries.frequencies.to_offset(freq).nanos
+    first = starts // size
+    pieces = np.maximum((ends - 1) // size - first + 1, 0)
+
+    # interval of each piece and position of the piece inside the interval
+    interval = np.repeat(np.arange(len(starts)), pieces)
+    position = np.arange(len(interval)) - \
+        np.repeat(np.cumsum(pieces) - pieces, pieces)
+
+    # bucket of each piece and how long the interval lasts inside it
+    bucket = (first[interval] + position) * size
+    duration = np.minimum(ends[interval], bucket + size) - \
+        np.maximum(starts[interval], bucket)
+    return interval, bucket, duration
+
+
+def downsample(times, values, buckets):
+    # keep, in each of the (pixel) buckets spanning the times, only the entries
+    # with the lowest and the highest value, so that a line through the kept
+    # entries looks like the line through all of them; times must be sorted
+    valid = ~np.isnan(values)
+    times, values = times[valid], values[valid]
+    if len(times) <= 2 * buckets:
+        return times, values
+    span = times[-1] - times[0] + 1
+    bucket = ((times - times[0]) / span * buckets).astype(np.int64)
+
+    # entries sorted by bucket and value: the first and last of each run
+    order = np.lexsort((values, bucket))
+    sorted_buckets = bucket[order]
+    starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+    kept = np.unique(np.r_[order[starts], order[ends - 1]])
+    return times[kept], values[kept]
 
 
-def correlation_occupancy():
-    # get all the entries with movement detected resampled per hour
-    df_mov = df[df['occupancy'] == True].groupby('tenant').resample(
-        'h')[['tenant']].nunique().add_suffix('_count').reset_index()
-    df_mov = df_mov.pivot(index='date', columns='tenant',
-                          values='tenant_count')
+################################################################
+#                PRE-AGGREGATED PYRAMID                        #
+################################################################
+# - build_pyramid                                              #
+# - roll_up                                                    #
+# - get_pyramid                                                #
+# - variable_buckets / pooled_buckets                          #
+# - split_pyramid / merge_pyramids                             #
+# - bucket_mean / bucket_std / bucket_sem                      #
+# - rolling_buckets                                            #
+# - merged_histograms / histogram_quantiles                    #
+# - occupancy_by_hour                                          #
+################################################################
 
-    # for each tenant, shows in how many days movement was detected for each hour
-    people_home_per_hour = df_mov.groupby(df_mov.index.hour).sum().transpose()
+# variables kept in the pyramid, in the format
+#   name -> (function selecting the entries, column with the values)
+# when the column is None, each entry counts as a value of 1
+PYRAMID_VARIABLES = {
+    'entries': (None, None),
+    'temperature': (is_various, 'temperature'),
+    'humidity': (is_various, 'humidity'),
+    'pressure': (is_various, 'pressure'),
+    'occupancy': (None, 'occupancy'),
+}
+# besides these, the pyramid keeps the comfort variables of comfort.py
+# ('<variable> comfort', '<variable> above' and '<variable> below') and the
+# occupancy inferred by occupancy.py ('presence', only with the 'intervals'
+# OCCUPANCY_SOURCE), whose statistics are weighted by the hours each reading
+# or interval held
+
+# how the statistics of finer buckets are combined into coarser ones
+PYRAMID_REDUCERS = {'count': 'sum', 'sum': 'sum',
+                    'sumsq': 'sum', 'min': 'min', 'max': 'max'}
+
+# width of the bins of the hourly histograms kept for the quantiles, per variable
+SKETCH_BIN_WIDTHS = {'temperature': .1, 'humidity': .5, 'pressure': .5}
+
+# sources of the occupancy of the charts: the hours with movement detected
+# ('movement') or the occupied intervals inferred from the movement, door and
+# illuminance events ('intervals', see occupancy.py), and the one used by default
+OCCUPANCY_SOURCES = ['movement', 'intervals']
+OCCUPANCY_SOURCE = 'movement'
+
+# pyramid levels ('h', 'd', 'm') and hourly histograms ('hist'),
+# created from the dataframe on first use
+pyramid = None
+
+# index of the state and feedback events (see events.py), created on first use
+event_index = None
+
+
+def month_start(dates):
+    return dates.floor('d') - pd.to_timedelta(dates.day - 1, unit='d')
+
+
+def roll_up(level, freq):
+    # bucket of each entry in the coarser level
+    dates = level.index.get_level_values('date')
+    buckets = month_start(dates) if freq == 'm' else dates.floor(freq)
+
+    # combine the statistics of the buckets that fall in the same coarser bucket
+    coarser = level.groupby([
+        level.index.get_level_values('tenant'),
+        level.index.get_level_values('variable'),
+        buckets
+    ]).agg(PYRAMID_REDUCERS)
+    return coarser.rename_axis(['tenant', 'variable', 'date'])
+
+
+def build_pyramid(dataframe=None, end=None):
+    dataframe = df if dataframe is None else dataframe
+
+    # gather the values of every variable in a single long table
+    values_list = []
+    for variable, (selector, column) in PYRAMID_VARIABLES.items():
+        entries = dataframe[selector] if selector else dataframe
+        values = entries[column].astype(float) if column else np.ones(len(entries))
+        values_list.append(pd.DataFrame({
+            'tenant': np.asarray(entries['tenant'], dtype=object),
+            'variable': variable,
+            'date': entries.index.floor('h'),
+            'value': values
+        }).dropna(subset=['value']))
+    values = pd.concat(values_list, ignore_index=True)
+    values['square'] = values['value'] ** 2
+
+    # hourly statistics per tenant and variable, computed in one pass
+    hourly = values.groupby(['tenant', 'variable', 'date']).agg(
+        count=('value', 'count'),
+        sum=('value', 'sum'),
+        sumsq=('square', 'sum'),
+        min=('value', 'min'),
+        max=('value', 'max')
+    )
 
-    norm_people_home_per_hour = people_home_per_hour/people_home_per_hour.sum()
+    # time-weighted comfort statistics of the indoor readings (see comfort.py)
+    # and, when the charts draw it, occupied share of each hour (see
+    # occupancy.py); with an end (e.g. of the month of a partition), no
+    # reading or event holds past it
+    from comfort import comfort_buckets
+    hourly_list = [hourly, comfort_buckets(dataframe, end=end)]
+    if OCCUPANCY_SOURCE == 'intervals':
+        from occupancy import presence_buckets
+        hourly_list.append(presence_buckets(dataframe, end=end))
+    hourly = pd.concat(hourly_list).sort_index()
+
+    # the coarser levels are derived from the finer ones
+    daily = roll_up(hourly, 'd')
+    monthly = roll_up(daily, 'm')
+
+    # hourly histograms with fixed bins, which merge by adding their counts
+    # (across hours and tenants), so that any group of buckets has quantiles
+    sketched = values[values['variable'].isin(list(SKETCH_BIN_WIDTHS))]
+    widths = sketched['variable'].map(SKETCH_BIN_WIDTHS)
+    sketched = sketched.assign(
+        bin=np.floor(sketched['value'] / widths).astype(np.int64))
+    histograms = sketched.groupby(
+        ['tenant', 'variable', 'date', 'bin']).size().to_frame('count')
+    return {'h': hourly, 'd': daily, 'm': monthly, 'hist': histograms}
+
+
+def get_pyramid():
+    global pyramid
+    if pyramid is None:
+        pyramid = build_pyramid()
+    return pyramid
+
+
+def variable_buckets(level, variable):
+    # statistics of the variable in each bucket of the level, per tenant
+    stats = get_pyramid()[level]
+    return stats[stats.index.get_level_values('variable') == variable]
+
+
+def pooled_buckets(level, variable):
+    # combine the statistics of every tenant in each bucket of the level
+    stats = variable_buckets(level, variable)
+    return stats.groupby(level='date').agg(PYRAMID_REDUCERS)
+
+
+def split_pyramid():
+    # pyramid of each tenant, splitting every level in a single pass
+    tenants = {}
+    for level, stats in get_pyramid().items():
+        for tenant, tenant_stats in stats.groupby(level='tenant'):
+            tenants.setdefault(tenant, {})[level] = tenant_stats
+    return tenants
+
+
+def merge_pyramids(stats, update):
+    # combine two pyramids (e.g. of the entries loaded before and of new
+    # entries) into one, since the statistics of every bucket are mergeable
+    merged = {}
+    for level, level_stats in stats.items():
+        combined = pd.concat([level_stats, update[level]])
+        merged[level] = combined.groupby(level=list(combined.index.names)).agg(
+            'sum' if level == 'hist' else PYRAMID_REDUCERS)
+    return merged
+
+
+def bucket_mean(stats): return stats['sum'] / stats['count']
+
+
+def bucket_std(stats): return np.sqrt(
+    (stats['sumsq'] - stats['sum'] ** 2 / stats['count']) / (stats['count'] - 1))
+
+
+def bucket_sem(stats): return bucket_std(stats) / np.sqrt(stats['count'])
+
+
+def rolling_buckets(stats, window):
+    # statistics of the hourly buckets inside the window ending at each bucket,
+    # per tenant (or pooled), from cumulative sums instead of scanning each window
+    if not stats.index.is_monotonic_increasing:
+        stats = stats.sort_index()
+    dates = stats.index.get_level_values('date')
+    hour = pd.Timedelta('1h').value
+    hours = (dates.asi8 - dates.asi8.min()) // hour
+    window_hours = pd.Timedelta(window).value // hour
+
+    # buckets of the same tenant (and variable) are consecutive; offsetting the
+    # hours of each group keeps the windows from reaching the previous group
+    changes = np.zeros(len(stats), dtype=bool)
+    for name, codes in zip(stats.index.names, getattr(stats.index, 'codes', [])):
+        if name != 'date':
+            changes[1:] |= codes[1:] != codes[:-1]
+    groups = np.cumsum(changes)
+    keys = groups * (hours.max() + window_hours + 1) + hours
+
+    # first bucket inside the window (keys - window, keys] of each bucket
+    first = np.searchsorted(keys, keys - window_hours, side='right')
+    cumulative = np.zeros((len(stats) + 1, 3))
+    np.cumsum(stats[['count', 'sum', 'sumsq']].to_numpy(dtype=float),
+              axis=0, out=cumulative[1:])
+    return pd.DataFrame(cumulative[1:] - cumulative[first],
+                        index=stats.index, columns=['count', 'sum', 'sumsq'])
+
+
+def merged_histograms(variable, by):
+    # merge the hourly histograms of every tenant by the attributes of
+    # their dates (e.g. ['hour'] or ['dayofweek', 'hour'])
+    histograms = variable_buckets('hist', variable)['count']
+    dates = histograms.index.get_level_values('date')
+    keys = [getattr(dates, attribute).rename(attribute) for attribute in by]
+    return histograms.groupby(keys + [histograms.index.get_level_values('bin')]).sum()
+
+
+def histogram_quantiles(histograms, variable, quantiles):
+    width = SKETCH_BIN_WIDTHS[variable]
+    counts = histograms.to_numpy(dtype=float)
+    bins = histograms.index.get_level_values('bin').to_numpy()
+
+    # histograms are sorted by group and bin, each group is a run of entries
+    groups = histograms.index.droplevel('bin')
+    starts = np.flatnonzero(~groups.duplicated())
+    ends = np.r_[starts[1:], len(counts)]
+    cumulative = np.cumsum(counts)
+    before = cumulative[starts] - counts[starts]
+    totals = cumulative[ends - 1] - before
+
+    # bin holding each quantile of each group, found in a single search,
+    # with the values assumed to be spread evenly inside the bin
+    result = {}
+    for quantile in quantiles:
+        target = before + quantile * totals
+        found = np.clip(np.searchsorted(cumulative, target), starts, ends - 1)
+        inside = (target - cumulative[found] + counts[found]) / counts[found]
+        result[quantile] = (bins[found] + np.clip(inside, 0, 1)) * width
+    return pd.DataFrame(result, index=groups[starts])
+
+
+def occupancy_by_hour(source=None):
+    source = source or OCCUPANCY_SOURCE
+    if source == 'intervals':
+        # hours every tenant was at home (occupied intervals) in each hour,
+        # only kept in the pyramids built while this source is selected
+        stats = variable_buckets('h', 'presence')
+        if stats.empty:
+            raise ValueError("the pyramid has no occupied intervals: set OCCUPANCY_SOURCE to 'intervals' before it is built")
+        return stats['sum'].groupby(level='date').sum().resample('h').sum()
+    if source != 'movement':
+        raise ValueError(f"unknown occupancy source '{source}' (use one of {OCCUPANCY_SOURCES})")
+
+    # hours in which movement was detected, per tenant
+    stats = variable_buckets('h', 'occupancy')
+    occupied = stats[stats['sum'] > 0]
+
+    # number of different tenants where movement was detected per hour
+    return occupied.groupby(level='date').size().resample('h').sum()
 
-    dist = additive_chi2_kernel(
-        norm_people_home_per_hour, norm_people_home_per_hour)
-    plt.title(
-        'Correlation Between the Occupancy Values of Different Tenants' if SET_TITLES else '',
-        fontdict={'fontsize': 10}
-    )
-    ax = sns.heatmap(
-        dist,
-        annot=False,
-        yticklabels=False,
-        xticklabels=False,
-        linewidths=.8,
-        cmap="YlGnBu"
-    )
-    return ax
 
 ################################
 # PART 2 - AUXILIARY FUNCTIONS #
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+import data_processing
+from data_processing import is_door, sorted_streams, split_intervals, to_dates, wall_times
+
+# columns identifying each door
+DOOR_KEYS = ['tenant', 'device']
+
+
+################################################################
+#                      DOOR SESSIONS                           #
+################################################################
+# - door_sessions                                              #
+# - door_session_statistics                                    #
+# - door_openings_by_hour_week                                 #
+# - door_open_time_by_day                                      #
+################################################################
+
+def door_sessions(dataframe=None):
+    dataframe = data_processing.df if dataframe is None else dataframe
+    doors = dataframe[is_door]
+    tz = doors.index.tz
+
+    order, times, run_starts, _, streams = sorted_streams(doors, DOOR_KEYS)
+
+    # the contact sensor reports True while the door is closed
+    closed = np.asarray(doors['contact'], dtype=bool)[order]
+
+    # door (stream) of each entry
+    stream = np.zeros(len(times), dtype=np.int64)
+    stream[run_starts[1:]] = 1
+    stream = np.cumsum(stream)
+
+    # entries where a door changes state; repeated messages with the same state are ignored
+    changes = np.flatnonzero(np.r_[True, (closed[1:] != closed[:-1]) | (
+        stream[1:] != stream[:-1])])
+
+    # a session starts when a door is opened and ends on its next change (the closing);
+    # doors already open in their first entry or never closed again are left out
+    openings = np.flatnonzero(~closed[changes])
+    closings = openings + 1
+    valid = closings < len(changes)
+    openings, closings = openings[valid], closings[valid]
+    valid = (stream[changes[closings]] == stream[changes[openings]]) & (
+        changes[openings] != run_starts[stream[changes[openings]]])
+    openings, closings = changes[openings[valid]], changes[closings[valid]]
+
+    sessions = streams.iloc[stream[openings]].reset_index(drop=True)
+    sessions['opened'] = to_dates(times[openings], tz)
+    sessions['closed'] = to_dates(times[closings], tz)
+    sessions['duration'] = sessions['closed'] - sessions['opened']
+    return sessions
+
+
+def door_session_statistics(sessions=None):
+    sessions = door_sessions() if sessions is None else sessions
+    minutes = sessions['duration'].dt.total_seconds() / 60
+
+    # distribution of the durations of the sessions, per tenant
+    grouped = minutes.groupby(np.asarray(sessions['tenant'], dtype=object))
+    statistics = grouped.agg(['count', 'median', 'mean', 'max'])
+    statistics['p90'] = grouped.quantile(.9)
+
+    # average time the doors of the tenant are open per day,
+    # counting the days between the first and the last session
+    open_time = door_open_time_by_day(sessions).reset_index().groupby('tenant').agg(
+        hours=('hours', 'sum'), first=('date', 'min'), last=('date', 'max'))
+    days = (open_time['last'] - open_time['first']).dt.days + 1
+    statistics['open hours per day'] = open_time['hours'] / days
+    return statistics.rename(columns={'count': 'sessions'})
+
+
+def door_openings_by_hour_week(sessions=None):
+    sessions = door_sessions() if sessions is None else sessions
+
+    # number of openings in each hour of each day of the week
+    opened = sessions['opened']
+    openings = opened.groupby(
+        [opened.dt.dayofweek.rename('day'), opened.dt.hour.rename('hour')]).size()
+    return openings.reindex(pd.MultiIndex.from_product(
+        [range(7), range(24)], names=['day', 'hour']), fill_value=0)
+
+
+def door_open_time_by_day(sessions=None):
+    sessions = door_sessions() if sessions is None else sessions
+
+    # split the sessions at midnight (local time), so that each
+    # day only counts the part of the session inside it
+    interval, day, duration = split_intervals(
+        wall_times(sessions['opened']), wall_times(sessions['closed']), 'd')
+    open_time = pd.DataFrame({
+        'tenant': np.asarray(sessions['tenant'], dtype=object)[interval],
+        'date': pd.to_datetime(day),
+        'hours': duration / pd.Timedelta('1h').value
+    })
+
+    # total time the doors of each tenant were open, per day
+    return open_time.groupby(['tenant', 'date'])['hours'].sum()
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+import data_processing
+from data_processing import is_feedback, is_state, sorted_streams, to_dates
+
+# kinds of events indexed, in the format
+#   kind -> (function selecting the entries, column with the value)
+EVENT_KINDS = {
+    'state': (is_state, 'state'),
+    'feedback': (is_feedback, 'feedback'),
+}
+
+# columns identifying each stream of events
+EVENT_KEYS = ['tenant', 'kind', 'device']
+
+
+################################################################
+#                      EVENT INDEX                             #
+################################################################
+# - build_event_index                                          #
+# - get_event_index                                            #
+# - window_bounds                                              #
+# - state_durations                                            #
+# - time_in_state                                              #
+# - state_transitions                                          #
+# - events_by_hour                                             #
+################################################################
+
+def build_event_index(dataframe=None):
+    dataframe = data_processing.df if dataframe is None else dataframe
+    tz = dataframe.index.tz
+
+    # every state and feedback message in a single table
+    events_list = []
+    for kind, (selector, column) in EVENT_KINDS.items():
+        entries = dataframe[selector]
+        events_list.append(pd.DataFrame({
+            'tenant': np.asarray(entries['tenant'], dtype=object),
+            'kind': kind,
+            'device': np.asarray(entries['device'], dtype=object),
+            'value': np.asarray(entries[column], dtype=object)
+        }, index=entries.index))
+    events = pd.concat(events_list)
+
+    # values kept as small integer codes, sorted by stream and time
+    values = pd.Categorical(events['value'])
+    order, times, run_starts, run_ends, streams = sorted_streams(events, EVENT_KEYS)
+    codes = values.codes[order]
+    stream = np.repeat(np.arange(len(streams), dtype=np.int32), run_ends - run_starts)
+
+    # a stream stays in a state from the message changing to it until the next
+    # change; the last state lasts until the last entry (of any sensor) of the tenant
+    changes = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (stream[1:] != stream[:-1])])
+    first = np.r_[True, stream[changes[1:]] != stream[changes[:-1]]]
+    followed = np.r_[~first[1:], False]
+    tenant_ends = pd.Series(dataframe.index.asi8).groupby(
+        np.asarray(dataframe['tenant'], dtype=object)).max()
+    stream_ends = tenant_ends.reindex(np.asarray(streams['tenant'], dtype=object)).to_numpy()
+    intervals = pd.DataFrame({
+        'stream': stream[changes],
+        'code': codes[changes],
+        'previous': np.where(first, -1, np.r_[-1, codes[changes[:-1]]]).astype(codes.dtype),
+        'start': times[changes],
+        'end': np.where(followed, np.r_[times[changes[1:]], 0], stream_ends[stream[changes]])
+    })
+
+    # intervals sorted by state and start, so that a query only reads the
+    # intervals of its state starting before the end of its period
+    intervals = intervals.sort_values(['code', 'start'], kind='stable').reset_index(drop=True)
+
+    # number of messages of each stream and value in each hour
+    hourly = pd.DataFrame({
+        'stream': stream,
+        'code': codes,
+        'date': to_dates(times, tz).floor('h')
+    }).groupby(['stream', 'code', 'date']).size().to_frame('count')
+
+    return {
+        'values': values.categories,
+        'streams': streams,
+        'intervals': intervals,
+        'hourly': hourly,
+        'timezone': tz
+    }
+
+
+def get_event_index():
+    if data_processing.event_index is None:
+        data_processing.event_index = build_event_index()
+    return data_processing.event_index
+
+
+def window_bounds(start, end, tz):
+    # nanoseconds since the epoch of the limits of a period (open when not given)
+    def bound(date, default):
+        if date is None:
+            return default
+        date = pd.Timestamp(date)
+        if date.tz is None and tz is not None:
+            date = date.tz_localize(tz)
+        return date.value
+    return bound(start, np.iinfo(np.int64).min), bound(end, np.iinfo(np.int64).max)
+
+
+def state_durations(start=None, end=None, kind='state'):
+    # time each stream of the kind spent in each value inside the period
+    index = get_event_index()
+    start, end = window_bounds(start, end, index['timezone'])
+    intervals = index['intervals']
+    streams = index['streams']
+
+    duration = np.minimum(intervals['end'].to_numpy(), end) - \
+        np.maximum(intervals['start'].to_numpy(), start)
+    cell = intervals['stream'].to_numpy(dtype=np.int64) * len(index['values']) + intervals['code'].to_numpy()
+    totals = np.bincount(cell, weights=np.maximum(duration, 0),
+                         minlength=len(streams) * len(index['values']))
+    totals = pd.DataFrame(
+        totals.reshape(len(streams), len(index['values'])).astype(np.int64).view('m8[ns]'),
+        index=pd.MultiIndex.from_frame(streams),
+        columns=index['values']
+    )
+    totals = totals[totals.index.get_level_values('kind') == kind].droplevel('kind')
+    return totals.loc[:, (totals > pd.Timedelta(0)).any()]
+
+
+def time_in_state(value, start=None, end=None, kind='state'):
+    # time each stream of the kind spent in the value inside the period,
+    # e.g. time_in_state('away', '2019-03-01', '2019-04-01')
+    index = get_event_index()
+    start, end = window_bounds(start, end, index['timezone'])
+    streams = index['streams']
+    selected = (streams['kind'] == kind).to_numpy()
+    result = pd.Series(pd.Timedelta(0), index=pd.MultiIndex.from_frame(
+        streams[selected].drop(columns='kind')), name=value)
+    if value not in index['values']:
+        return result
+
+    # intervals of the value starting before the end of the period
+    intervals = index['intervals']
+    code = index['values'].get_loc(value)
+    codes = intervals['code'].to_numpy()
+    first = np.searchsorted(codes, code, side='left')
+    last = first + np.searchsorted(intervals['start'].to_numpy()[first:np.searchsorted(
+        codes, code, side='right')], end, side='left')
+    intervals = intervals.iloc[first:last]
+
+    # part of each interval inside the period, summed by stream
+    duration = np.minimum(intervals['end'].to_numpy(), end) - \
+        np.maximum(intervals['start'].to_numpy(), start)
+    totals = np.bincount(intervals['stream'], weights=np.maximum(duration, 0), minlength=len(streams))
+    result[:] = pd.to_timedelta(totals[selected].astype(np.int64))
+    return result
+
+
+def state_transitions(start=None, end=None, kind='state'):
+    # number of changes from one value to another of each stream of the
+    # kind inside the period, with the time spent in the value changed to
+    index = get_event_index()
+    start, end = window_bounds(start, end, index['timezone'])
+    intervals = index['intervals']
+    intervals = intervals[(intervals['start'] >= start) & (intervals['start'] < end) &
+                          (intervals['previous'] >= 0)]
+    streams = index['streams'].iloc[intervals['stream']].reset_index(drop=True)
+
+    transitions = streams.assign(
+        **{'from': index['values'][intervals['previous']],
+           'to': index['values'][intervals['code']],
+           'duration': pd.to_timedelta(intervals['end'].to_numpy() - intervals['start'].to_numpy())})
+    transitions = transitions[transitions['kind'] == kind].drop(columns='kind')
+    return transitions.groupby(['tenant', 'device', 'from', 'to']).agg(
+        count=('duration', 'size'), median=('duration', 'median'), total=('duration', 'sum'))
+
+
+def events_by_hour(value=None, kind='state'):
+    # number of messages of the kind (with the value, if given) in each hour of the day, per tenant
+    index = get_event_index()
+    hourly = index['hourly']
+    streams = index['streams']
+    stream = hourly.index.get_level_values('stream')
+    selected = (streams['kind'].to_numpy()[stream] == kind)
+    if value is not None:
+        selected &= hourly.index.get_level_values('code') == index['values'].get_indexer([value])[0]
+    hourly = hourly[selected]
+    return hourly['count'].groupby([
+        np.asarray(streams['tenant'], dtype=object)[hourly.index.get_level_values('stream')],
+        hourly.index.get_level_values('date').hour.rename('hour')
+    ]).sum().unstack(fill_value=0).reindex(columns=range(24), fill_value=0)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+import data_processing
+from data_processing import sorted_streams, to_dates
+
+# silences longer than this are considered gaps
+GAP_THRESHOLD = '1h'
+
+# columns identifying each stream of data
+STREAM_KEYS = ['tenant', 'sensor', 'device']
+
+
+################################################################
+#                      GAP DETECTION                           #
+################################################################
+# - find_gaps                                                  #
+# - detect_gaps                                                #
+# - stream_coverage                                            #
+################################################################
+
+def find_gaps(dataframe, keys, threshold):
+    _, times, run_starts, run_ends, streams = sorted_streams(dataframe, keys)
+    threshold = pd.Timedelta(threshold).value
+
+    # consecutive entries of the same stream further apart than the threshold
+    same_stream = np.ones(len(times), dtype=bool)
+    same_stream[run_starts] = False
+    silent = np.flatnonzero(same_stream[1:] & (np.diff(times) > threshold))
+
+    # stream (run) where each gap happened
+    gap_runs = np.searchsorted(run_starts, silent + 1, side='right') - 1
+
+    gaps = streams.iloc[gap_runs].reset_index(drop=True)
+    gaps['start'] = times[silent]
+    gaps['end'] = times[silent + 1]
+
+    streams['first'] = times[run_starts]
+    streams['last'] = times[run_ends - 1]
+    streams['gaps'] = np.bincount(gap_runs, minlength=len(streams))
+    streams['silent'] = np.bincount(
+        gap_runs, weights=gaps['end'] - gaps['start'], minlength=len(streams))
+    return gaps, streams
+
+
+def detect_gaps(threshold=GAP_THRESHOLD, keys=STREAM_KEYS, dataframe=None):
+    dataframe = data_processing.df if dataframe is None else dataframe
+    tz = dataframe.index.tz
+
+    gaps, _ = find_gaps(dataframe, keys, threshold)
+
+    # silences of the whole home (no entries from any sensor of the tenant)
+    outages, _ = find_gaps(dataframe, ['tenant'], threshold)
+
+    # a gap is explained by an outage of the home if they overlap, otherwise
+    # the sensor itself stopped reporting; the outages of a tenant do not
+    # overlap, so only the last one starting before the end of the gap can
+    gaps['tenant'] = np.asarray(gaps['tenant'], dtype=object)
+    outages['tenant'] = np.asarray(outages['tenant'], dtype=object)
+    gaps = gaps.sort_values('end', kind='mergesort')
+    matched = pd.merge_asof(
+        gaps,
+        outages.sort_values('start').rename(
+            columns={'start': 'outage start', 'end': 'outage end'}),
+        left_on='end',
+        right_on='outage start',
+        by='tenant',
+        direction='backward',
+        allow_exact_matches=False
+    )
+    home_offline = (matched['outage end'] > matched['start']).to_numpy()
+    gaps['cause'] = np.where(home_offline, 'tenant offline', 'sensor silent')
+
+    # sort by stream and convert the timestamps into dates
+    gaps = gaps.sort_values(keys + ['start']).reset_index(drop=True)
+    gaps['duration'] = pd.to_timedelta(gaps['end'] - gaps['start'])
+    gaps['start'] = to_dates(gaps['start'], tz)
+    gaps['end'] = to_dates(gaps['end'], tz)
+    return gaps
+
+
+def stream_coverage(threshold=GAP_THRESHOLD, keys=STREAM_KEYS, dataframe=None):
+    dataframe = data_processing.df if dataframe is None else dataframe
+    tz = dataframe.index.tz
+
+    _, streams = find_gaps(dataframe, keys, threshold)
+
+    # share of the time between the first and the last entry without gaps
+    span = streams['last'] - streams['first']
+    streams['coverage'] = np.where(
+        span > 0, 1 - streams['silent'] / span.where(span > 0, 1), 1)
+    streams['silent'] = pd.to_timedelta(streams['silent'])
+    streams['first'] = to_dates(streams['first'], tz)
+    streams['last'] = to_dates(streams['last'], tz)
+    return streams.sort_values(keys).reset_index(drop=True)
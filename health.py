@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+import data_processing
+
+# columns identifying each device
+DEVICE_KEYS = ['tenant', 'device']
+
+# quantiles of the link quality of each device and day
+LINKQUALITY_QUANTILES = [.1, .5, .9]
+
+# battery level (%) at which a device is taken as depleted
+BATTERY_DEPLETED = 10
+
+# days of battery readings (the latest ones of each device) used to project
+# its depletion, and fewest days with readings needed to project it
+BATTERY_FIT_DAYS = 30
+BATTERY_FIT_MIN_DAYS = 7
+
+# devices projected to be depleted within this time are at risk
+RISK_HORIZON = '30d'
+
+# median link quality of the last day below which the link of a device is weak
+LINKQUALITY_WEAK = 30
+
+
+def has_health(x): return pd.notna(x['battery']) | pd.notna(x['linkquality'])
+
+
+################################################################
+#                      DEVICE HEALTH                           #
+################################################################
+# - grouped_quantiles                                          #
+# - daily_device_health                                        #
+# - battery_depletion                                          #
+# - devices_at_risk                                            #
+################################################################
+
+def grouped_quantiles(groups, values, quantiles, size):
+    # quantiles (interpolated as in pandas) of the values of each group,
+    # sorting every value once instead of grouping once per quantile
+    valid = ~np.isnan(values)
+    groups, values = groups[valid], values[valid]
+    values = values[np.lexsort((values, groups))]
+
+    counts = np.bincount(groups, minlength=size)
+    starts = np.cumsum(counts) - counts
+    found = counts > 0
+    result = np.full((size, len(quantiles)), np.nan)
+    for i, quantile in enumerate(quantiles):
+        position = starts[found] + quantile * (counts[found] - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, starts[found] + counts[found] - 1)
+        result[found, i] = values[low] + (values[high] - values[low]) * (position - low)
+    return result
+
+
+def daily_device_health(dataframe=None):
+    dataframe = data_processing.df if dataframe is None else dataframe
+    readings = dataframe[has_health]
+
+    # group (device and day) of each reading, numbered in the order of the keys,
+    # computed once for all the statistics
+    day = readings.index.floor('d')
+    groups = readings.groupby([readings[key] for key in DEVICE_KEYS] + [day],
+                              dropna=False).ngroup().to_numpy()
+    size = groups.max() + 1
+    first = np.unique(groups, return_index=True)[1]
+    health = pd.DataFrame(index=pd.MultiIndex.from_arrays(
+        [np.asarray(readings[key], dtype=object)[first] for key in DEVICE_KEYS] + [day[first]],
+        names=DEVICE_KEYS + ['date']))
+    health['readings'] = np.bincount(groups, minlength=size)
+
+    # battery readings sorted by group and, inside each group, by time
+    # (a stable sort of the groups is enough when the entries are in time order)
+    battery = readings['battery'].to_numpy(dtype=float)
+    valid = ~np.isnan(battery)
+    if readings.index.is_monotonic_increasing:
+        order = np.argsort(groups[valid], kind='stable')
+    else:
+        order = np.lexsort((readings.index.asi8[valid], groups[valid]))
+    battery = battery[valid][order]
+
+    # latest, lowest and average battery reading of each group
+    counts = np.bincount(groups[valid], minlength=size)
+    found = counts > 0
+    starts = (np.cumsum(counts) - counts)[found]
+    for column in ['battery last', 'battery min', 'battery mean']:
+        health[column] = np.nan
+    health.loc[found, 'battery last'] = battery[starts + counts[found] - 1]
+    health.loc[found, 'battery min'] = np.minimum.reduceat(battery, starts)
+    health.loc[found, 'battery mean'] = np.add.reduceat(battery, starts) / counts[found]
+
+    # distribution of the link quality of each group
+    linkquality = grouped_quantiles(
+        groups, readings['linkquality'].to_numpy(dtype=float), LINKQUALITY_QUANTILES, size)
+    for i, quantile in enumerate(LINKQUALITY_QUANTILES):
+        health[f'linkquality p{quantile * 100:.0f}'] = linkquality[:, i]
+    return health
+
+
+def battery_depletion(health=None, days=BATTERY_FIT_DAYS):
+    health = daily_device_health() if health is None else health
+    daily = health[health['battery mean'].notna()]
+
+    # device of each day (the rows of each device are together, sorted by date)
+    devices = daily.index.droplevel('date')
+    device = daily.groupby(level=DEVICE_KEYS, sort=False).ngroup().to_numpy()
+    size = device.max() + 1
+    last_rows = np.cumsum(np.bincount(device, minlength=size)) - 1
+
+    # days before the last day of each device, keeping the days inside the window
+    dates = daily.index.get_level_values('date')
+    x = (dates.asi8 - dates.asi8[last_rows][device]) / pd.Timedelta('1d').value
+    y = daily['battery mean'].to_numpy()
+    fitted = x > -days
+
+    # least squares line of every device at once, from its sums
+    def sums(values): return np.bincount(device[fitted], weights=values[fitted], minlength=size)
+    n = sums(np.ones(len(x)))
+    sx, sy, sxx, sxy = sums(x), sums(y), sums(x * x), sums(x * y)
+    denominator = n * sxx - sx ** 2
+    enough = (n >= BATTERY_FIT_MIN_DAYS) & (denominator > 0)
+    slope = np.where(enough, (n * sxy - sx * sy) / np.where(enough, denominator, 1), np.nan)
+    level = np.where(enough, (sy - slope * sx) / np.where(n > 0, n, 1), np.nan)
+
+    # date the fitted line reaches the depleted level (only for draining batteries)
+    draining = slope < 0
+    days_left = np.where(draining, (BATTERY_DEPLETED - level) / np.where(draining, slope, 1), np.nan)
+    last = dates[last_rows]
+
+    depletion = devices[last_rows].to_frame(index=False)
+    depletion['last day'] = last
+    depletion['battery'] = daily['battery last'].to_numpy()[last_rows]
+    depletion['fitted days'] = n.astype(np.int64)
+    depletion['slope (%/day)'] = slope
+    depletion['days left'] = np.maximum(days_left, 0)
+    depletion['depletion'] = (last + pd.to_timedelta(np.maximum(days_left, 0), unit='d')).floor('d')
+    return depletion
+
+
+def devices_at_risk(horizon=RISK_HORIZON, health=None):
+    health = daily_device_health() if health is None else health
+    depletion = battery_depletion(health)
+    horizon = pd.Timedelta(horizon) / pd.Timedelta('1d')
+
+    # link quality of the last day of each device with link quality readings
+    linkquality = health['linkquality p50'].dropna().groupby(level=DEVICE_KEYS).last()
+    depletion['linkquality'] = linkquality.reindex(
+        pd.MultiIndex.from_frame(depletion[DEVICE_KEYS])).to_numpy()
+
+    # reasons a device needs a visit, the most urgent first
+    reasons = np.select(
+        [depletion['battery'] <= BATTERY_DEPLETED,
+         depletion['days left'] <= horizon,
+         depletion['linkquality'] < LINKQUALITY_WEAK],
+        ['battery depleted', 'battery draining', 'weak link'],
+        ''
+    )
+    at_risk = depletion.assign(risk=reasons)[reasons != '']
+    return at_risk.sort_values(['days left', 'battery']).reset_index(drop=True)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+import data_processing
+from data_processing import is_meteo, is_various, sorted_streams
+
+# meteorology entries older than this are not attached to the indoor readings
+METEO_TOLERANCE = '1h'
+
+# meteorology values attached to each indoor reading
+METEO_COLUMNS = ['temperature', 'humidity', 'windspeed', 'precipitation']
+
+# indoor values kept next to the meteorology ones
+INDOOR_COLUMNS = ['temperature', 'humidity', 'pressure']
+
+
+################################################################
+#                  INDOOR AND OUTDOOR DATA                     #
+################################################################
+# - latest_meteo_entries                                       #
+# - indoor_with_meteo                                          #
+# - indoor_outdoor_temperature                                 #
+################################################################
+
+def latest_meteo_entries(indoor, meteo, tolerance):
+    # both sides sorted by tenant and, inside each tenant, by time
+    indoor_order, indoor_times, indoor_starts, indoor_ends, indoor_tenants = sorted_streams(
+        indoor, ['tenant'])
+    meteo_order, meteo_times, meteo_starts, meteo_ends, meteo_tenants = sorted_streams(
+        meteo, ['tenant'])
+
+    # meteorology stream of the tenant of each indoor stream (-1 when there is none)
+    runs = pd.Index(np.asarray(meteo_tenants['tenant'], dtype=object)).get_indexer(
+        np.asarray(indoor_tenants['tenant'], dtype=object))
+
+    # the stream of each entry, and keys ordered by stream and then by time
+    # (the times are replaced by their ranks, so that the keys fit in 64 bits),
+    # as in rolling_buckets: one search over all the tenants finds the latest
+    # meteorology entry at or before each indoor entry; ranking the times is a
+    # sort, O(n log n) like sorted_streams(), while offsetting the raw times
+    # instead would overflow with a few hundred tenants over a year
+    indoor_runs = np.repeat(runs, indoor_ends - indoor_starts)
+    meteo_runs = np.repeat(np.arange(len(meteo_starts)), meteo_ends - meteo_starts)
+    ranks = np.unique(np.r_[meteo_times, indoor_times], return_inverse=True)[1]
+    size = len(ranks) + 1
+    meteo_keys = meteo_runs * size + ranks[:len(meteo_times)]
+    indoor_keys = indoor_runs * size + ranks[len(meteo_times):]
+    found = np.searchsorted(meteo_keys, indoor_keys, side='right') - 1
+
+    # position (in the meteo frame) of the entry found when it is of the same
+    # tenant and recent enough, -1 otherwise
+    latest = np.maximum(found, 0)
+    recent = (found >= 0) & (indoor_runs >= 0) & (meteo_runs[latest] == indoor_runs) & (
+        indoor_times - meteo_times[latest] <= tolerance)
+    matches = np.where(recent, meteo_order[latest], -1)
+    return indoor_order, matches
+
+
+def indoor_with_meteo(tolerance=METEO_TOLERANCE, dataframe=None):
+    dataframe = data_processing.df if dataframe is None else dataframe
+    indoor = dataframe[is_various]
+    meteo = dataframe[is_meteo]
+
+    order, matches = latest_meteo_entries(
+        indoor, meteo, pd.Timedelta(tolerance).value)
+
+    # indoor readings (by tenant and time) with the outdoor values next to them;
+    # only the needed columns are copied
+    joined = indoor[['tenant'] + INDOOR_COLUMNS].iloc[order]
+    found = matches >= 0
+    for column in METEO_COLUMNS:
+        values = np.full(len(matches), np.nan)
+        values[found] = meteo[column].to_numpy(dtype=float)[matches[found]]
+        joined[f'outdoor {column}'] = values
+    return joined
+
+
+def indoor_outdoor_temperature(tolerance=METEO_TOLERANCE, dataframe=None):
+    joined = indoor_with_meteo(tolerance, dataframe)
+    joined = joined[joined['outdoor temperature'].notna()]
+
+    # average indoor and outdoor temperature of each hour
+    temperatures = joined[['temperature', 'outdoor temperature']].rename(
+        columns={'temperature': 'indoor', 'outdoor temperature': 'outdoor'})
+    return temperatures.groupby(temperatures.index.floor('h')).mean()
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from data_processing import sorted_streams, split_intervals, to_dates
+
+# time a tenant is taken as present after each kind of event, in the format
+#   kind of event -> hold time
+# movement: a motion sensor detected someone; door: a door was opened or
+# closed; illuminance: the light of a room changed by ILLUMINANCE_CHANGE or more
+OCCUPANCY_HOLDS = {
+    'movement': '30min',
+    'door': '15min',
+    'illuminance': '10min',
+}
+
+# smallest change (lux) between two readings of a sensor taken as a light
+# being switched on or off
+ILLUMINANCE_CHANGE = 50
+
+# columns of the readings the occupancy is inferred from
+OCCUPANCY_COLUMNS = ['device', 'occupancy', 'contact', 'illuminance']
+
+
+################################################################
+#                    OCCUPANCY INTERVALS                       #
+################################################################
+# - occupancy_events                                           #
+# - merge_intervals                                            #
+# - occupancy_intervals                                        #
+# - presence_buckets                                           #
+################################################################
+
+def occupancy_events(dataframe, holds=OCCUPANCY_HOLDS):
+    # events showing someone is at home, in the format
+    #   (code of the tenant, time, hold time) of each event
+    tenants = dataframe.groupby('tenant', sort=False).ngroup().to_numpy()
+    times = dataframe.index.asi8
+
+    # movement detected by the motion sensors
+    movement = np.asarray(dataframe['occupancy'].eq(True).fillna(False), dtype=bool)
+    events = [(tenants[movement], times[movement], pd.Timedelta(holds['movement']).value)]
+
+    # the door and illuminance readings of every sensor sorted by time in a
+    # single grouped pass; an event is a reading that changed from the
+    # previous reading of the same sensor
+    changes = np.asarray(dataframe['contact'].notna() | dataframe['illuminance'].notna(), dtype=bool)
+    readings = dataframe[changes]
+    order, sorted_times, run_starts, run_ends, _ = sorted_streams(readings, ['tenant', 'device'])
+    stream = np.repeat(np.arange(len(run_starts)), run_ends - run_starts)
+    reading_tenants = tenants[changes][order]
+    for kind, column in [('door', 'contact'), ('illuminance', 'illuminance')]:
+        values = readings[column].to_numpy()[order]
+        found = np.flatnonzero(pd.notna(values))
+        values = values[found]
+        if kind == 'door':
+            changed = values[1:] != values[:-1]
+        else:
+            changed = np.abs(values[1:].astype(float) - values[:-1].astype(float)) >= ILLUMINANCE_CHANGE
+        changed = found[1:][changed & (stream[found[1:]] == stream[found[:-1]])]
+        events.append((reading_tenants[changed], sorted_times[changed], pd.Timedelta(holds[kind]).value))
+
+    tenant = np.concatenate([event[0] for event in events])
+    time = np.concatenate([event[1] for event in events])
+    hold = np.concatenate([np.full(len(event[0]), event[2], dtype=np.int64) for event in events])
+    return tenant, time, hold
+
+
+def merge_intervals(groups, starts, ends):
+    # union of the intervals [start, end) of each group, without looping:
+    # sorted by group and start, an interval begins a new merged interval
+    # when it starts after every earlier interval of its group has ended
+    order = np.lexsort((starts, groups))
+    groups, starts, ends = groups[order], starts[order], ends[order]
+    reach = pd.Series(ends).groupby(groups).cummax().to_numpy()
+    first = np.flatnonzero(np.r_[True, (groups[1:] != groups[:-1]) | (starts[1:] > reach[:-1])])
+    return groups[first], starts[first], np.maximum.reduceat(ends, first) if len(first) else ends[first]
+
+
+def occupancy_intervals(dataframe, holds=OCCUPANCY_HOLDS, end=None):
+    # occupied and unoccupied intervals of each tenant, from its first to its
+    # last entry, or to the end of the entries given (e.g. the end of the month
+    # of a partition), where the events of the next ones take over
+    tenant, time, hold = occupancy_events(dataframe, holds)
+    names = pd.unique(np.asarray(dataframe['tenant'], dtype=object))
+    bounds = pd.Series(dataframe.index.asi8).groupby(
+        dataframe.groupby('tenant', sort=False).ngroup().to_numpy()).agg(['min', 'max'])
+    first, last = bounds['min'].to_numpy(), bounds['max'].to_numpy()
+    if end is not None:
+        last = np.full(len(last), pd.Timestamp(end).value)
+
+    # each event keeps the tenant present for its hold time (up to its last entry);
+    # the empty intervals at the first and last entries delimit the unoccupied time
+    codes = np.arange(len(names))
+    groups, starts, ends = merge_intervals(
+        np.r_[tenant, codes, codes],
+        np.r_[time, first, last],
+        np.r_[np.minimum(time + hold, last[tenant]), first, last])
+
+    # the tenant is away between two consecutive occupied intervals
+    occupied = ends > starts
+    away = np.flatnonzero(groups[1:] == groups[:-1])
+    intervals = pd.DataFrame({
+        'tenant': names[np.r_[groups[occupied], groups[away]]],
+        'start': np.r_[starts[occupied], ends[away]],
+        'end': np.r_[ends[occupied], starts[away + 1]],
+        'occupied': np.r_[np.ones(occupied.sum(), dtype=bool), np.zeros(len(away), dtype=bool)]
+    })
+    intervals = intervals.sort_values(['tenant', 'start'], kind='stable').reset_index(drop=True)
+    intervals['start'] = to_dates(intervals['start'].to_numpy(), dataframe.index.tz)
+    intervals['end'] = to_dates(intervals['end'].to_numpy(), dataframe.index.tz)
+    return intervals
+
+
+def presence_buckets(dataframe, holds=OCCUPANCY_HOLDS, end=None):
+    intervals = occupancy_intervals(dataframe, holds, end)
+
+    # split the intervals at the hours, weighting every part by the hours it lasted
+    piece, bucket, duration = split_intervals(
+        intervals['start'].to_numpy(dtype='datetime64[ns]').view(np.int64),
+        intervals['end'].to_numpy(dtype='datetime64[ns]').view(np.int64), 'h')
+    stats = pd.DataFrame({
+        'tenant': np.asarray(intervals['tenant'], dtype=object)[piece],
+        'variable': 'presence',
+        'date': to_dates(bucket, dataframe.index.tz),
+        'value': intervals['occupied'].to_numpy(dtype=float)[piece],
+        'weight': duration / pd.Timedelta('1h').value
+    })
+    stats['sum'] = stats['value'] * stats['weight']
+
+    # hourly statistics per tenant, in the layout of the pyramid, with the hours
+    # in 'count' and the occupied hours in 'sum' (so the mean is the occupied share)
+    return stats.groupby(['tenant', 'variable', 'date']).agg(
+        count=('weight', 'sum'),
+        sum=('sum', 'sum'),
+        sumsq=('sum', 'sum'),
+        min=('value', 'min'),
+        max=('value', 'max')
+    )
@@ -0,0 +1,219 @@
+import argparse
+import io
+import os
+
+import pandas as pd
+
+import data_processing
+from data_processing import (COMPRESSIONS, DUPLICATE_TOLERANCE, FILES, PYRAMID_VARIABLES, PrefetchReader,
+                             build_pyramid, decode_entries, discover_tenants, duplicate_entries, file_order,
+                             merge_pyramids, select_tenants)
+from comfort import COMFORT_BANDS
+from health import daily_device_health
+from occupancy import OCCUPANCY_COLUMNS
+
+# columns kept in the partitions and their types, in the format
+#   column -> type of the values
+# (the fields of the JSON objects not listed here are not kept)
+PARTITION_COLUMNS = {
+    'date': 'datetime64[ns]',
+    'device': 'string',
+    'sensor': 'string',
+    'contact': 'boolean',
+    'linkquality': 'float64',
+    'battery': 'float64',
+    'voltage': 'float64',
+    'temperature': 'float64',
+    'humidity': 'float64',
+    'pressure': 'float64',
+    'illuminance': 'float64',
+    'occupancy': 'boolean',
+    'state': 'string',
+    'description': 'string',
+    'windspeed': 'float64',
+    'precipitation': 'float64',
+    'winddirection': 'string',
+    'feedback': 'string',
+}
+
+# rows of a dataset file read (and decoded) at a time when it is partitioned
+PARTITION_CHUNK_ROWS = 500_000
+
+# rows of each row group of the partition files; the row groups keep the
+# range of each column, so the ones without the rows filtered are not read
+PARTITION_ROW_GROUP_ROWS = 1 << 16
+
+# columns read to build the pyramid: the values of its variables, the ones
+# of the comfort bands and of the occupancy events and the ones selecting the indoor readings
+PYRAMID_COLUMNS = sorted({column for _, column in PYRAMID_VARIABLES.values() if column} |
+                         set(COMFORT_BANDS) | set(OCCUPANCY_COLUMNS) | {'description'})
+
+# columns read to compute the health of the devices
+HEALTH_COLUMNS = ['device', 'battery', 'linkquality']
+
+
+################################################################
+#                  PARTITIONED DATASET                         #
+################################################################
+# - partition_name                                             #
+# - month_end                                                  #
+# - write_partitions                                           #
+# - list_partitions                                            #
+# - scan_partitions                                            #
+# - reduce_partitions                                          #
+# - partition_pyramid                                          #
+# - partition_device_health                                    #
+# - attach_partitions                                          #
+################################################################
+
+def partition_name(tenant, month):
+    # directory of a partition, in the 'key=value' layout understood by Arrow, e.g.
+    # 'tenant=sgh0201a8c87da4/month=2019-03'
+    return os.path.join(f'tenant={tenant.split(".")[0]}', f'month={month}')
+
+
+def month_end(dates):
+    # start of the month after the one of the dates (all in the same month)
+    first = dates.min()
+    return first.normalize().replace(day=1) + pd.DateOffset(months=1)
+
+
+def write_partitions(datasetdir, path, tenants=None, exclude=None, deduplicate=True,
+                     duplicate_tolerance=DUPLICATE_TOLERANCE, chunk_rows=PARTITION_CHUNK_ROWS):
+    # only imported when needed, since it is an optional dependency
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    found = discover_tenants(datasetdir)
+    schema = pa.Schema.from_pandas(pd.DataFrame(
+        {column: pd.Series(dtype=dtype) for column, dtype in PARTITION_COLUMNS.items()}), preserve_index=False)
+    written = {}
+    for fi in select_tenants(found, tenants, exclude):
+        # the file is read a chunk of rows at a time, so that the memory used does
+        # not depend on its size (copies re-sent across two chunks are kept)
+        opener = next((open_compressed for extension, open_compressed in COMPRESSIONS.items()
+                       if found[fi].endswith(extension)), None)
+        source = io.BufferedReader(PrefetchReader(opener(found[fi]))) if opener else found[fi]
+        with pd.read_csv(source, parse_dates=['date'], chunksize=chunk_rows) as chunks:
+            for part, raw in enumerate(chunks):
+                raw = raw.reset_index(drop=True).assign(tenant=fi)
+                if deduplicate:
+                    raw = raw[~duplicate_entries(raw, duplicate_tolerance)].reset_index(drop=True)
+                entries = decode_entries(raw).reset_index()
+                entries = entries.reindex(columns=list(PARTITION_COLUMNS)).astype(PARTITION_COLUMNS)
+
+                # a file per chunk and month, sorted by type of sensor so that
+                # the row groups of the other types are skipped when filtering by type
+                months = entries['date'].dt.strftime('%Y-%m')
+                for month, month_entries in entries.groupby(months):
+                    partition_path = os.path.join(path, partition_name(fi, month))
+                    os.makedirs(partition_path, exist_ok=True)
+                    pq.write_table(
+                        pa.Table.from_pandas(month_entries.sort_values(['sensor', 'date'], kind='stable'),
+                                             schema=schema, preserve_index=False),
+                        os.path.join(partition_path, f'part-{part}.parquet'),
+                        row_group_size=PARTITION_ROW_GROUP_ROWS)
+                    written[fi] = written.get(fi, 0) + len(month_entries)
+    return written
+
+
+def list_partitions(path, tenants=None, exclude=None, start=None, end=None):
+    # partitions of the selected tenants and months, in the format
+    #   (tenant file, month, directory of the partition)
+    found = {name.split('=', 1)[1] + '.csv': name for name in sorted(os.listdir(path))
+             if name.startswith('tenant=')}
+    if not found:
+        raise FileNotFoundError(
+            "Path \'{0}\' does not contain a partitioned dataset.".format(path))
+    partitions = []
+    for fi in select_tenants(found, tenants, exclude):
+        for name in sorted(os.listdir(os.path.join(path, found[fi]))):
+            month = name.split('=', 1)[1]
+            if (start is None or month >= start) and (end is None or month <= end):
+                partitions.append((fi, month, os.path.join(path, found[fi], name)))
+    return partitions
+
+
+def scan_partitions(path, columns=None, sensors=None, filters=None, **selection):
+    # entries of one partition at a time, indexed by date and with their tenant;
+    # only the given columns are read, and only the rows of the given types of
+    # sensor matching the filters (in the format of pyarrow.parquet.read_table)
+    import pyarrow.parquet as pq
+
+    columns = ['date'] + [column for column in (columns or PARTITION_COLUMNS) if column != 'date']
+    if sensors is not None:
+        sensor_filter = [('sensor', 'in', list(sensors))]
+        filters = [group + sensor_filter for group in filters] if filters else [sensor_filter]
+    for fi, _, partition_path in list_partitions(path, **selection):
+        entries = pq.read_table(partition_path, columns=columns, filters=filters).to_pandas()
+        entries = entries.sort_values('date', kind='stable').set_index('date')
+        entries['tenant'] = fi
+        yield entries
+
+
+def reduce_partitions(path, reduce, merge, **scan):
+    # combine the result of 'reduce' on each partition with 'merge',
+    # keeping a single partition in memory at a time
+    result = None
+    for entries in scan_partitions(path, **scan):
+        reduced = reduce(entries)
+        result = reduced if result is None else merge(result, reduced)
+    return result
+
+
+def partition_pyramid(path, **selection):
+    # the pyramid of every partition (all the entries are counted, so no
+    # type of sensor is filtered), merged bucket by bucket; the readings
+    # hold until the end of the month at most, so that the hours at the
+    # start of the next month are not counted in both partitions (the ones
+    # of the last month of a tenant hold as in the whole dataset)
+    last_months = {fi: month for fi, month, _ in list_partitions(path, **selection)}
+
+    def reduce(entries):
+        end = month_end(entries.index)
+        last = last_months[entries['tenant'].iloc[0]] == entries.index.min().strftime('%Y-%m')
+        return build_pyramid(entries, None if last else end)
+    return reduce_partitions(path, reduce, merge_pyramids, columns=PYRAMID_COLUMNS, **selection)
+
+
+def partition_device_health(path, **selection):
+    # the days are inside the months, so the health of each partition is final
+    def concat(health, update): return pd.concat([health, update])
+    health = reduce_partitions(path, daily_device_health, concat, columns=HEALTH_COLUMNS,
+                               filters=[[('battery', '>=', 0)], [('linkquality', '>=', 0)]], **selection)
+    return health.sort_index()
+
+
+def attach_partitions(path, title=True, **selection):
+    # the aggregates of the partitioned dataset, computed without loading it;
+    # only the charts drawn from the pyramid can be created
+    data_processing.SET_TITLES = title
+    data_processing.SAMPLE_FRACTION = None
+    data_processing.pyramid = partition_pyramid(path, **selection)
+    data_processing.event_index = None
+    data_processing.df = None
+    FILES[:] = sorted(set(data_processing.pyramid['m'].index.get_level_values('tenant')), key=file_order)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Write the dataset files as Parquet files partitioned by tenant and month.')
+    parser.add_argument('dataset_path', metavar='DATASET PATH', help='path to where the dataset files are')
+    parser.add_argument('partitions_path', metavar='PARTITIONS PATH',
+                        help='directory where the partitions will be written')
+    parser.add_argument('--tenants', nargs='+', metavar='TENANT',
+                        help='only partition these tenants, given by file name or pattern')
+    parser.add_argument('--exclude', nargs='+', metavar='TENANT',
+                        help='do not partition these tenants, given by file name or pattern')
+    parser.add_argument('--chunk-rows', type=int, default=PARTITION_CHUNK_ROWS,
+                        help=f'rows of a dataset file read at a time (default: {PARTITION_CHUNK_ROWS})')
+    args = parser.parse_args()
+
+    written = write_partitions(args.dataset_path, args.partitions_path, args.tenants, args.exclude,
+                               chunk_rows=args.chunk_rows)
+    for fi, rows in written.items():
+        print(f"{fi}: {rows} entries")
+
+
+if __name__ == "__main__":
+    main()
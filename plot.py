@@ -1,7 +1,124 @@
 import matplotlib.pyplot as plt
 import argparse
+import asyncio
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+import charts
+import data_processing
 from data_processing import *
+from charts import *
+from comfort import COMFORT_BANDS
+from health import RISK_HORIZON, devices_at_risk
+from partitions import attach_partitions, partition_device_health
+from similarity import (NEIGHBOURS, OCCUPANCY_CLUSTERS, OCCUPANCY_PROFILES, SIMILARITY_METRICS, nearest_neighbours,
+                        occupancy_clusters, occupancy_profiles)
+from watch import WATCH_DEBOUNCE, watch_dataset
+
+# charts created for all tenants together and for each tenant, in the format
+#   (file name, function, keyword arguments)
+TENANT_CHARTS = [
+    ('relative-amount-data-by-month.pdf', relative_amount_data_by_month, {}),
+    ('average-temperature-by-month.pdf', average_temperature_by_month, {}),
+    ('average-humidity-by-month.pdf', average_humidity_by_month, {}),
+    ('average-temperature-by-week.pdf', average_temperature_by_week, {}),
+    ('average-humidity-by-week.pdf', average_humidity_by_week, {}),
+    ('relative-occupancy-by-hour.pdf', relative_occupancy_by_hour, {}),
+    ('relative-occupancy-by-hour-week.pdf', relative_occupancy_by_hour_week, {}),
+    ('average-temperature-by-hour.pdf',
+     average_temperature_by_hour, {'with_std': False}),
+    ('average-temperature-by-hour-std.pdf',
+     average_temperature_by_hour, {'with_std': True}),
+    ('average-temperature-by-hour-quantiles.pdf',
+     average_temperature_by_hour, {'with_quantiles': True}),
+    ('average-temperature-by-hour-with-occupancy.pdf',
+     average_temperature_by_hour_with_occupancy, {'with_std': False}),
+    ('average-temperature-by-hour-with-occupancy-std.pdf',
+     average_temperature_by_hour_with_occupancy, {'with_std': True}),
+    ('average-temperature-by-hour-week.pdf',
+     average_temperature_by_hour_week, {'with_std': False}),
+    ('average-temperature-by-hour-week-std.pdf',
+     average_temperature_by_hour_week, {'with_std': True}),
+    ('average-temperature-by-hour-week-quantiles.pdf',
+     average_temperature_by_hour_week, {'with_quantiles': True}),
+    ('average-temperature-by-hour-week-with-occupancy.pdf',
+     average_temperature_by_hour_week_with_occupancy, {'with_std': False}),
+    ('average-temperature-by-hour-week-with-occupancy-std.pdf',
+     average_temperature_by_hour_week_with_occupancy, {'with_std': True}),
+    ('rolling-average-temperature.pdf',
+     rolling_average_temperature, {'with_std': False}),
+    ('rolling-average-temperature-std.pdf',
+     rolling_average_temperature, {'with_std': True}),
+    ('rolling-average-humidity.pdf',
+     rolling_average_humidity, {'with_std': False}),
+    ('rolling-average-humidity-std.pdf',
+     rolling_average_humidity, {'with_std': True}),
+    ('comfort-by-month.pdf', comfort_by_month, {}),
+    ('comfort-by-hour.pdf', comfort_by_hour, {}),
+    ('degree-hours-by-month.pdf', degree_hours_by_month, {}),
+]
+
+# pyramid variables each of the tenant charts is drawn from, so that the
+# charts of a tenant without them (e.g. without motion sensor) are skipped;
+# 'occupancy' stands for the variable of the selected OCCUPANCY_SOURCE
+TENANT_CHART_VARIABLES = {
+    relative_amount_data_by_month: ['entries'],
+    average_temperature_by_month: ['temperature'],
+    average_humidity_by_month: ['humidity'],
+    average_temperature_by_week: ['temperature'],
+    average_humidity_by_week: ['humidity'],
+    relative_occupancy_by_hour: ['occupancy'],
+    relative_occupancy_by_hour_week: ['occupancy'],
+    average_temperature_by_hour: ['temperature'],
+    average_temperature_by_hour_with_occupancy: ['temperature', 'occupancy'],
+    average_temperature_by_hour_week: ['temperature'],
+    average_temperature_by_hour_week_with_occupancy: ['temperature', 'occupancy'],
+    rolling_average_temperature: ['temperature'],
+    rolling_average_humidity: ['humidity'],
+    comfort_by_month: [f'{variable} comfort' for variable in COMFORT_BANDS],
+    comfort_by_hour: [f'{variable} comfort' for variable in COMFORT_BANDS],
+    degree_hours_by_month: ['temperature above', 'temperature below'],
+}
+
+# charts about the opening and closing of the doors
+DOOR_CHARTS = [
+    ('door-open-duration-distribution.pdf', door_open_duration_distribution, {}),
+    ('relative-door-openings-by-hour.pdf', relative_door_openings_by_hour, {}),
+    ('relative-door-openings-by-hour-week.pdf',
+     relative_door_openings_by_hour_week, {}),
+    ('average-door-open-time-by-day.pdf', average_door_open_time_by_day, {}),
+]
+
+# charts comparing the indoor readings with the meteorology data
+METEO_CHARTS = [
+    ('indoor-outdoor-temperature-by-hour.pdf',
+     indoor_outdoor_temperature_by_hour, {}),
+    ('indoor-outdoor-temperature-by-hour-week.pdf',
+     indoor_outdoor_temperature_by_hour_week, {}),
+]
+
+# charts comparing the different tenants
+CORRELATION_CHARTS = [
+    ('correlation-temperature.pdf', correlation_temperature, {}),
+    ('correlation-humidity.pdf', correlation_humidity, {}),
+    ('correlation-pressure.pdf', correlation_pressure, {}),
+    ('correlation-occupancy.pdf', correlation_occupancy, {}),
+]
+
+# charts comparing the evolution of the different tenants
+TREND_CHARTS = [
+    ('rolling-temperature-by-tenant.pdf', rolling_temperature_by_tenant, {}),
+]
+
+# ways of saving the heatmaps of the correlation charts
+HEATMAP_OUTPUTS = HEATMAP_RENDERERS + ['png']
+
+# formats in which the data behind the charts can be exported
+EXPORT_FORMATS = ['parquet', 'csv', 'json']
+
+# file describing the data exported to a directory
+EXPORT_MANIFEST = 'aggregates.json'
 
 
 def dir_path(path):
@@ -13,7 +130,7 @@ def dir_path(path):
 
 def parse_arguments():
     parser = argparse.ArgumentParser(
-        description='Process command line arguments.')
+        description='Process command line arguments.', fromfile_prefix_chars='@')
     parser.add_argument(
         'dataset_path',
         metavar='DATASET PATH',
@@ -43,182 +160,406 @@ def parse_arguments():
         dest='titles',
         help='create charts without titles'
     )
-    parser.set_defaults(titles=True)
-    return parser.parse_args()
-
-
-def clearPlt():
-    plt.cla()
-    plt.clf()
-
-
-def main():
-    args = parse_arguments()
-
-    save_to_path = os.path.join(
-        args.save_images_path, args.additional_directory) if args.additional_directory else args.save_images_path
-    if not os.path.exists(save_to_path):
-        os.makedirs(save_to_path)
-
-    setup(args.dataset_path, args.titles)
-
-    ax = relative_amount_data_by_month()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'relative-amount-data-by-month.pdf'),
-        format='pdf'
+    parser.add_argument(
+        '--per-tenant',
+        action='store_true',
+        help='also create the charts of each tenant, inside a directory named after the tenant'
     )
-
-    clearPlt()
-
-    ax = average_temperature_by_month()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'average-temperature-by-month.pdf'),
-        format='pdf'
+    parser.add_argument(
+        '-j', '--workers',
+        metavar='WORKERS',
+        help='number of processes creating the charts of each tenant (default: number of CPUs)',
+        type=int
     )
-
-    clearPlt()
-
-    ax = average_humidity_by_month()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'average-humidity-by-month.pdf'),
-        format='pdf'
+    parser.add_argument(
+        '--engine',
+        choices=CSV_ENGINES,
+        default='c',
+        help='engine used to parse the dataset files (default: c)'
     )
-
-    clearPlt()
-
-    ax = average_temperature_by_week()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'average-temperature-by-week.pdf'),
-        format='pdf'
+    parser.add_argument(
+        '--tenants',
+        nargs='+',
+        metavar='TENANT',
+        help='only load these tenants, given by file name or pattern, e.g. sgh0201a8c87da4 or \'sgh0201a*\' '
+             '(@FILE reads them from a file, one per line)'
     )
-
-    clearPlt()
-
-    ax = average_humidity_by_week()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'average-humidity-by-week.pdf'),
-        format='pdf'
+    parser.add_argument(
+        '--exclude',
+        nargs='+',
+        metavar='TENANT',
+        help='do not load these tenants, given by file name or pattern'
+    )
+    parser.add_argument(
+        '--partitioned',
+        action='store_true',
+        help='\'DATASET PATH\' holds the dataset partitioned by tenant and month (written by partitions.py), '
+             'which is read one partition at a time; only the charts drawn from the aggregates are created'
+    )
+    parser.add_argument(
+        '--loading-workers',
+        type=int,
+        default=LOADING_WORKERS,
+        help=f'number of threads reading the dataset files (default: {LOADING_WORKERS})'
+    )
+    parser.add_argument(
+        '--duplicate-tolerance',
+        help='longest delay between two entries with the same payload for the second one to be '
+             'removed as a copy re-sent by the device, e.g. 2s (default: only copies with the same date)'
+    )
+    parser.add_argument(
+        '--keep-duplicates',
+        dest='deduplicate',
+        action='store_false',
+        help='keep the copies of the entries re-sent by the devices'
     )
+    parser.add_argument(
+        '--gap-threshold',
+        metavar='GAP THRESHOLD',
+        default=GAP_THRESHOLD,
+        help=f'shortest silence considered a gap in the data, e.g. 30min or 2h (default: {GAP_THRESHOLD})'
+    )
+    parser.add_argument(
+        '--risk-horizon',
+        metavar='RISK HORIZON',
+        default=RISK_HORIZON,
+        help=f'devices projected to run out of battery within this time are at risk, e.g. 2w (default: {RISK_HORIZON})'
+    )
+    parser.add_argument(
+        '--meteo-tolerance',
+        metavar='METEO TOLERANCE',
+        default=METEO_TOLERANCE,
+        help=f'oldest meteorology entry attached to an indoor reading, e.g. 30min or 2h (default: {METEO_TOLERANCE})'
+    )
+    parser.add_argument(
+        '--heatmaps',
+        choices=HEATMAP_OUTPUTS,
+        default='vector',
+        help='draw the correlation heatmaps with one shape per pair of tenants (vector), '
+             'as a single image inside the PDF (raster) or as PNG images (png) (default: vector)'
+    )
+    parser.add_argument(
+        '--cluster-tenants',
+        action='store_true',
+        help='order the tenants of the correlation heatmaps by hierarchical clustering'
+    )
+    parser.add_argument(
+        '--similarity-profile',
+        choices=list(OCCUPANCY_PROFILES),
+        default='hour',
+        help='occupancy profile compared between the tenants: share of the occupied hours in each hour of the day (hour), '
+             'of the week (week) or in each day (day) (default: hour)'
+    )
+    parser.add_argument(
+        '--similarity-metric',
+        choices=SIMILARITY_METRICS,
+        default='chi2',
+        help='distance between the occupancy profiles of two tenants (default: chi2)'
+    )
+    parser.add_argument(
+        '--neighbours',
+        type=int,
+        default=NEIGHBOURS,
+        help=f'tenants with the most similar occupancy listed for each tenant (default: {NEIGHBOURS})'
+    )
+    parser.add_argument(
+        '--clusters',
+        type=int,
+        default=OCCUPANCY_CLUSTERS,
+        help=f'groups of tenants with similar occupancy (default: {OCCUPANCY_CLUSTERS})'
+    )
+    parser.add_argument(
+        '--occupancy-source',
+        choices=OCCUPANCY_SOURCES,
+        default=OCCUPANCY_SOURCE,
+        help='occupancy of the relative occupancy charts and of the temperature charts with occupancy: tenants '
+             'where movement was detected in each hour (movement) or hours the tenants were at home, inferred from '
+             f'the movement, door and illuminance events (intervals) (default: {OCCUPANCY_SOURCE})'
+    )
+    parser.add_argument(
+        '--export',
+        choices=EXPORT_FORMATS,
+        help='also save the data behind each chart next to it, listed in \'aggregates.json\''
+    )
+    parser.add_argument(
+        '--sample',
+        type=sample_fraction,
+        metavar='FRACTION',
+        help='preview the charts with a fraction (e.g. 0.05) of the entries of each tenant, '
+             'type of sensor and month, drawing confidence intervals'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='keep following the dataset files, updating the aggregates with the rows appended '
+             'to them and saving the charts of all the tenants again'
+    )
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        default=WATCH_DEBOUNCE,
+        help=f'seconds new rows wait for others before the charts are saved again (default: {WATCH_DEBOUNCE})'
+    )
+    parser.set_defaults(titles=True)
+    args = parser.parse_args()
+    if args.watch and args.sample is not None:
+        parser.error('--watch cannot be used with --sample')
+    if args.partitioned and (args.watch or args.sample is not None):
+        parser.error('--partitioned cannot be used with --watch or --sample')
+    return args
 
-    clearPlt()
 
-    ax = relative_occupancy_by_hour()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'relative-occupancy-by-hour.pdf'),
-        format='pdf'
-    )
+def sample_fraction(value):
+    fraction = float(value)
+    if not 0 < fraction <= 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a fraction in ]0, 1]")
+    return fraction
 
-    clearPlt()
 
-    ax = relative_occupancy_by_hour_week()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'relative-occupancy-by-hour-week.pdf'),
-        format='pdf'
-    )
+def clearPlt():
+    plt.cla()
+    plt.clf()
 
-    clearPlt()
 
-    ax = average_temperature_by_hour(with_std=False)
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'average-temperature-by-hour.pdf'),
-        format='pdf'
-    )
+def export_aggregate(aggregate, file_path, export):
+    # a flat table, with a column per level of the index and per column
+    frame = aggregate.to_frame() if isinstance(aggregate, pd.Series) else aggregate.copy()
+    frame.columns = [' '.join(map(str, column)) if isinstance(column, tuple) else str(column)
+                     for column in frame.columns]
+    frame = frame.reset_index(drop=isinstance(frame.index, pd.RangeIndex))
 
-    clearPlt()
+    # durations in seconds, which every format (and reader) understands
+    durations = frame.columns[frame.dtypes == 'timedelta64[ns]']
+    frame[durations] = frame[durations].apply(lambda column: column.dt.total_seconds())
+    frame = frame.rename(columns={column: f'{column} (s)' for column in durations})
 
-    ax = average_temperature_by_hour(with_std=True)
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'average-temperature-by-hour-std.pdf'),
-        format='pdf'
-    )
+    if export == 'parquet':
+        frame.to_parquet(file_path, index=False)
+    elif export == 'csv':
+        frame.to_csv(file_path, index=False)
+    else:
+        frame.to_json(file_path, orient='table', index=False)
+    return frame
+
+
+def write_export_manifest(save_to_path, exported):
+    with open(os.path.join(save_to_path, EXPORT_MANIFEST), 'w') as manifest:
+        json.dump(exported, manifest, indent=2)
+
+
+def save_charts(charts_list, save_to_path, export=None):
+    # description of the data exported next to the charts
+    exported = []
+
+    for file_name, chart, kwargs in charts_list:
+        charts.last_aggregate = None
+        ax = chart(**kwargs)
+        ax.get_figure().savefig(
+            os.path.join(save_to_path, file_name),
+            format=os.path.splitext(file_name)[1][1:]
+        )
+
+        # the data behind the chart, when it keeps it
+        if export and charts.last_aggregate is not None:
+            data_name = f'{os.path.splitext(file_name)[0]}.{export}'
+            frame = export_aggregate(charts.last_aggregate,
+                                     os.path.join(save_to_path, data_name), export)
+            exported.append({
+                'chart': file_name,
+                'data': data_name,
+                'format': export,
+                'rows': len(frame),
+                'columns': list(frame.columns),
+                'arguments': {name: str(value) for name, value in kwargs.items()}
+            })
+
+        clearPlt()
+    return exported
+
+
+def publish_charts(save_to_path, export):
+    # charts made from the aggregates, saved again with the newest entries
+    exported = save_charts(TENANT_CHARTS, save_to_path, export)
+    if not export:
+        return
+
+    # the entries of these charts replace the previous ones in the manifest
+    with open(os.path.join(save_to_path, EXPORT_MANIFEST)) as manifest:
+        previous = json.load(manifest)
+    charts_saved = {entry['chart'] for entry in exported}
+    write_export_manifest(save_to_path, [
+        entry for entry in previous if entry['chart'] not in charts_saved] + exported)
+
+
+def save_tenant_charts(tenant, tenant_pyramid, save_to_path, titles, export, sample, occupancy_source):
+    # the worker only holds the pyramid of this tenant,
+    # so the charts describe the tenant alone
+    data_processing.pyramid = tenant_pyramid
+    data_processing.SET_TITLES = titles
+    data_processing.SAMPLE_FRACTION = sample
+    data_processing.OCCUPANCY_SOURCE = occupancy_source
 
-    clearPlt()
+    if not os.path.exists(save_to_path):
+        os.makedirs(save_to_path)
 
-    ax = average_temperature_by_hour_with_occupancy(with_std=False)
-    ax.get_figure().savefig(
-        os.path.join(
-            save_to_path, 'average-temperature-by-hour-with-occupancy.pdf'),
-        format='pdf'
-    )
+    # tenants without data for a chart (e.g. no motion sensor) are skipped
+    variables = set(tenant_pyramid['h'].index.get_level_values('variable'))
+    occupancy = 'presence' if occupancy_source == 'intervals' else 'occupancy'
+    exported = []
+    for file_name, chart, kwargs in TENANT_CHARTS:
+        missing = [occupancy if variable == 'occupancy' else variable
+                   for variable in TENANT_CHART_VARIABLES[chart]]
+        missing = [variable for variable in missing if variable not in variables]
+        if missing:
+            print(f"skipping \'{file_name}\' for tenant \'{tenant}\': no {', '.join(missing)} data")
+            continue
+        exported += save_charts([(file_name, chart, kwargs)], save_to_path, export)
+
+    if export:
+        write_export_manifest(save_to_path, exported)
+
+
+def save_charts_per_tenant(save_to_path, titles, workers, export=None):
+    # aggregates of every tenant come from the same pyramid, split in one pass
+    tenant_pyramids = split_pyramid()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                save_tenant_charts,
+                tenant,
+                tenant_pyramid,
+                os.path.join(save_to_path, tenant.split('.')[0]),
+                titles,
+                export,
+                data_processing.SAMPLE_FRACTION,
+                data_processing.OCCUPANCY_SOURCE
+            )
+            for tenant, tenant_pyramid in tenant_pyramids.items()
+        ]
+        for future in futures:
+            future.result()
+
+
+def save_occupancy_similarity(args, save_to_path):
+    # tenants with the most similar occupancy and groups of similar tenants
+    profiles = occupancy_profiles(args.similarity_profile)
+    nearest_neighbours(profiles, args.similarity_metric, args.neighbours).to_csv(
+        os.path.join(save_to_path, 'occupancy-neighbours.csv'), index=False)
+    occupancy_clusters(profiles, args.similarity_metric, args.clusters).to_csv(
+        os.path.join(save_to_path, 'occupancy-clusters.csv'), index=False)
+
+
+def save_partitioned_charts(args, save_to_path):
+    # the aggregates are merged from the partitions, without loading the
+    # dataset, so the charts drawn from the entries themselves are not created
+    attach_partitions(args.dataset_path, args.titles, tenants=args.tenants, exclude=args.exclude)
+
+    exported = save_charts(TENANT_CHARTS + TREND_CHARTS, save_to_path, args.export)
+    save_occupancy_similarity(args, save_to_path)
+
+    health = partition_device_health(args.dataset_path, tenants=args.tenants, exclude=args.exclude)
+    exported += save_charts([('device-battery-by-day.pdf', device_battery_by_day, {'health': health})],
+                            save_to_path, args.export)
+    devices_at_risk(args.risk_horizon, health).to_csv(
+        os.path.join(save_to_path, 'devices-at-risk.csv'), index=False)
+
+    if args.export:
+        write_export_manifest(save_to_path, exported)
+
+    if args.per_tenant:
+        save_charts_per_tenant(save_to_path, args.titles, args.workers, args.export)
 
-    clearPlt()
 
-    ax = average_temperature_by_hour_with_occupancy(with_std=True)
-    ax.get_figure().savefig(
-        os.path.join(
-            save_to_path, 'average-temperature-by-hour-with-occupancy-std.pdf'),
-        format='pdf'
-    )
+def main():
+    args = parse_arguments()
 
-    clearPlt()
+    save_to_path = os.path.join(
+        args.save_images_path, args.additional_directory) if args.additional_directory else args.save_images_path
+    if not os.path.exists(save_to_path):
+        os.makedirs(save_to_path)
 
-    ax = average_temperature_by_hour_week(with_std=False)
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'average-temperature-by-hour-week.pdf'),
-        format='pdf'
-    )
+    # the occupancy the charts are drawn with, in this process and in the workers
+    data_processing.OCCUPANCY_SOURCE = args.occupancy_source
 
-    clearPlt()
+    if args.partitioned:
+        save_partitioned_charts(args, save_to_path)
+        return
 
-    ax = average_temperature_by_hour_week(with_std=True)
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'average-temperature-by-hour-week-std.pdf'),
-        format='pdf'
-    )
+    setup(args.dataset_path, args.titles, args.engine, args.sample,
+          args.deduplicate, args.duplicate_tolerance, args.tenants, args.exclude, args.loading_workers)
+    print(f"removed {data_processing.removed_duplicates.sum()} duplicated entries")
 
-    clearPlt()
+    exported = save_charts(TENANT_CHARTS, save_to_path, args.export)
 
-    ax = average_temperature_by_hour_week_with_occupancy(with_std=False)
-    ax.get_figure().savefig(
-        os.path.join(
-            save_to_path, 'average-temperature-by-hour-week-with-occupancy.pdf'),
-        format='pdf'
-    )
+    #####################
+    #  CREATE CHARTS 2  #
+    #####################
 
-    clearPlt()
+    # PNG images are rasterized heatmaps saved in another format
+    renderer = 'vector' if args.heatmaps == 'vector' else 'raster'
+    extension = '.png' if args.heatmaps == 'png' else '.pdf'
+    exported += save_charts([(file_name.replace('.pdf', extension), chart, {**kwargs, 'renderer': renderer, 'cluster': args.cluster_tenants})
+                             for file_name, chart, kwargs in CORRELATION_CHARTS], save_to_path, args.export)
+    exported += save_charts(TREND_CHARTS, save_to_path, args.export)
+    save_occupancy_similarity(args, save_to_path)
 
-    ax = average_temperature_by_hour_week_with_occupancy(with_std=True)
-    ax.get_figure().savefig(
-        os.path.join(
-            save_to_path, 'average-temperature-by-hour-week-with-occupancy-std.pdf'),
-        format='pdf'
-    )
+    #####################
+    #  CREATE CHARTS 3  #
+    #####################
 
-    clearPlt()
+    exported += save_charts([('coverage-timeline.pdf', coverage_timeline,
+                             {'threshold': args.gap_threshold})], save_to_path, args.export)
+    detect_gaps(args.gap_threshold).to_csv(
+        os.path.join(save_to_path, 'gaps.csv'), index=False)
 
     #####################
-    #  CREATE CHARTS 2  #
+    #  CREATE CHARTS 4  #
     #####################
 
-    ax = correlation_temperature()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'correlation-temperature.pdf'),
-        format='pdf'
-    )
+    exported += save_charts(DOOR_CHARTS, save_to_path, args.export)
 
-    clearPlt()
+    #####################
+    #  CREATE CHARTS 5  #
+    #####################
 
-    ax = correlation_humidity()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'correlation-humidity.pdf'),
-        format='pdf'
-    )
+    exported += save_charts([(file_name, chart, {**kwargs, 'tolerance': args.meteo_tolerance})
+                             for file_name, chart, kwargs in METEO_CHARTS], save_to_path, args.export)
 
-    clearPlt()
+    #####################
+    #  CREATE CHARTS 6  #
+    #####################
 
-    ax = correlation_pressure()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'correlation-pressure.pdf'),
-        format='pdf'
-    )
+    # raw signals of each tenant, downsampled to the width of the chart
+    raw_signals_path = os.path.join(save_to_path, 'raw-signals')
+    if not os.path.exists(raw_signals_path):
+        os.makedirs(raw_signals_path)
+    save_charts([(f"{tenant.split('.')[0]}.pdf", raw_signals, {'tenant': tenant})
+                for tenant in FILES], raw_signals_path)
 
-    clearPlt()
+    #####################
+    #  CREATE CHARTS 7  #
+    #####################
 
-    ax = correlation_occupancy()
-    ax.get_figure().savefig(
-        os.path.join(save_to_path, 'correlation-occupancy.pdf'),
-        format='pdf'
-    )
+    exported += save_charts([('device-battery-by-day.pdf', device_battery_by_day, {})],
+                            save_to_path, args.export)
+    devices_at_risk(args.risk_horizon).to_csv(
+        os.path.join(save_to_path, 'devices-at-risk.csv'), index=False)
+
+    if args.export:
+        write_export_manifest(save_to_path, exported)
+
+    if args.per_tenant:
+        save_charts_per_tenant(save_to_path, args.titles, args.workers, args.export)
+
+    if args.watch:
+        print(f"following the files in '{args.dataset_path}' (Ctrl+C to stop)")
+        try:
+            asyncio.run(watch_dataset(args.dataset_path, lambda: publish_charts(save_to_path, args.export),
+                                      debounce=args.debounce, deduplicate=args.deduplicate,
+                                      duplicate_tolerance=args.duplicate_tolerance))
+        except KeyboardInterrupt:
+            pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+
+from data_processing import variable_buckets
+
+# profiles of the occupancy of each tenant, in the format
+#   name -> attributes of the hourly buckets grouped into each bin
+# 'day' has a bin per date of the dataset
+OCCUPANCY_PROFILES = {
+    'hour': ['hour'],
+    'week': ['dayofweek', 'hour'],
+    'day': ['date'],
+}
+
+# distances between two occupancy profiles (0 when they are the same)
+SIMILARITY_METRICS = ['chi2', 'jensenshannon', 'cosine']
+
+# memory (bytes) of the distances computed at once, between a block of
+# tenants and all the others, with the temporary arrays of each step
+SIMILARITY_BLOCK_MEMORY = 16 * 2**20
+
+# nearest tenants listed for each tenant
+NEIGHBOURS = 5
+
+# groups of tenants with similar occupancy, and most rounds of reassigning
+# the tenants to the nearest medoid (the tenant representing each group)
+OCCUPANCY_CLUSTERS = 4
+CLUSTER_ITERATIONS = 20
+
+
+################################################################
+#                  OCCUPANCY SIMILARITY                        #
+################################################################
+# - occupancy_profiles                                         #
+# - block_distances                                            #
+# - distance_blocks                                            #
+# - nearest_neighbours                                         #
+# - occupancy_clusters                                         #
+################################################################
+
+def occupancy_profiles(profile='hour'):
+    if profile not in OCCUPANCY_PROFILES:
+        raise ValueError(f"unknown occupancy profile \'{profile}\' (use one of {list(OCCUPANCY_PROFILES)})")
+
+    # hours in which movement was detected, per tenant
+    stats = variable_buckets('h', 'occupancy')
+    occupied = stats[stats['sum'] > 0]
+    dates = occupied.index.get_level_values('date')
+
+    # occupied hours of each tenant in each bin, as a share of all its occupied hours
+    # (tenants where movement was never detected have no profile)
+    keys = [dates.floor('d').rename('date') if attribute == 'date' else getattr(dates, attribute).rename(attribute)
+            for attribute in OCCUPANCY_PROFILES[profile]]
+    counts = occupied['sum'].groupby([occupied.index.get_level_values('tenant')] + keys).size()
+    profiles = counts.unstack(list(range(1, len(keys) + 1)), fill_value=0)
+    if profile == 'hour':
+        profiles = profiles.reindex(columns=range(24), fill_value=0)
+    elif profile == 'week':
+        profiles = profiles.reindex(columns=pd.MultiIndex.from_product(
+            [range(7), range(24)], names=['dayofweek', 'hour']), fill_value=0)
+    return profiles.div(profiles.sum(axis=1), axis=0).astype(np.float32)
+
+
+def block_distances(x, y, metric='chi2'):
+    # distances between every row of x and every row of y (distributions),
+    # accumulated bin by bin so that only a len(x) x len(y) array is kept
+    x = np.asarray(x, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+
+    if metric == 'cosine':
+        norms = np.linalg.norm(x, axis=1)[:, None] * np.linalg.norm(y, axis=1)[None, :]
+        return np.maximum(1 - (x @ y.T) / np.where(norms > 0, norms, 1), 0)
+
+    # one contiguous row per bin, read at each step of the sums below
+    x_bins = np.ascontiguousarray(x.T)[:, :, None]
+    y_bins = np.ascontiguousarray(y.T)[:, None, :]
+
+    # the bins of both profiles, reused at every step; the smallest float
+    # keeps the empty bins (0 in both profiles) from dividing by 0
+    distances = np.zeros((len(x), len(y)), dtype=np.float32)
+    total = np.empty_like(distances)
+    term = np.empty_like(distances)
+    tiny = np.finfo(np.float32).tiny
+
+    if metric == 'chi2':
+        # sum of (p - q)^2 / (p + q), the opposite of sklearn's additive_chi2_kernel
+        for k in range(x.shape[1]):
+            np.add(x_bins[k], y_bins[k], out=total)
+            total += tiny
+            np.subtract(x_bins[k], y_bins[k], out=term)
+            term *= term
+            term /= total
+            distances += term
+        return distances
+
+    if metric == 'jensenshannon':
+        # JS(p, q) = (sum p log p + sum q log q - sum (p + q) log((p + q) / 2)) / 2,
+        # where only the last sum depends on both; the distance is its square root (base 2)
+        def entropy_terms(p): return np.sum(p * np.log2(p + tiny), axis=1)
+        for k in range(x.shape[1]):
+            np.add(x_bins[k], y_bins[k], out=total)
+            total += tiny
+            np.log2(total, out=term)
+            term -= 1
+            term *= total
+            distances -= term
+        distances += entropy_terms(x)[:, None] + entropy_terms(y)[None, :]
+        return np.sqrt(np.maximum(distances / 2, 0))
+
+    raise ValueError(f"unknown similarity metric \'{metric}\' (use one of {SIMILARITY_METRICS})")
+
+
+def distance_blocks(profiles, metric='chi2', memory=SIMILARITY_BLOCK_MEMORY):
+    # distances between a block of tenants and all the tenants at a time, in the format
+    #   (position of the first tenant of the block, distances of the block)
+    values = profiles.to_numpy(dtype=np.float32)
+    rows = max(1, memory // (3 * 4 * len(values)))
+    for start in range(0, len(values), rows):
+        yield start, block_distances(values[start:start + rows], values, metric)
+
+
+def nearest_neighbours(profiles, metric='chi2', neighbours=NEIGHBOURS, memory=SIMILARITY_BLOCK_MEMORY):
+    # the nearest tenants of each tenant, keeping only them from each block
+    neighbours = min(neighbours, len(profiles) - 1)
+    tenants = profiles.index.to_numpy()
+    found = []
+    for start, distances in distance_blocks(profiles, metric, memory):
+        rows = np.arange(len(distances))
+        distances[rows, start + rows] = np.inf
+        nearest = np.argpartition(distances, neighbours - 1, axis=1)[:, :neighbours] if neighbours > 0 \
+            else np.empty((len(distances), 0), dtype=np.int64)
+        nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+        order = np.argsort(nearest_distances, axis=1, kind='stable')
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        found.append(pd.DataFrame({
+            'tenant': np.repeat(tenants[start:start + len(distances)], neighbours),
+            'rank': np.tile(np.arange(1, neighbours + 1), len(distances)),
+            'neighbour': tenants[nearest.ravel()],
+            'distance': np.take_along_axis(nearest_distances, order, axis=1).ravel()
+        }))
+    return pd.concat(found, ignore_index=True)
+
+
+def occupancy_clusters(profiles, metric='chi2', clusters=OCCUPANCY_CLUSTERS, iterations=CLUSTER_ITERATIONS):
+    # groups of tenants around medoids, computing only the distances to the
+    # medoids (never the whole matrix), so that it scales to many tenants
+    values = profiles.to_numpy(dtype=np.float32)
+    clusters = min(clusters, len(values))
+
+    # first medoids: the tenant nearest to the average profile, and then
+    # each time the tenant farthest from the medoids already chosen
+    medoids = [int(np.argmin(block_distances(values, values.mean(axis=0, keepdims=True), metric)[:, 0]))]
+    nearest = block_distances(values, values[medoids], metric)[:, 0]
+    while len(medoids) < clusters:
+        medoids.append(int(np.argmax(nearest)))
+        nearest = np.minimum(nearest, block_distances(values, values[medoids[-1:]], metric)[:, 0])
+
+    # each tenant belongs to the nearest medoid; each medoid moves to the
+    # tenant of its group nearest to the average profile of the group
+    for _ in range(iterations):
+        distances = block_distances(values, values[medoids], metric)
+        labels = np.argmin(distances, axis=1)
+        moved = []
+        for cluster, medoid in enumerate(medoids):
+            members = np.flatnonzero(labels == cluster)
+            if len(members) == 0:
+                # a medoid with the same profile as another one keeps its place
+                moved.append(medoid)
+                continue
+            center = values[members].mean(axis=0, keepdims=True)
+            moved.append(int(members[np.argmin(block_distances(values[members], center, metric)[:, 0])]))
+        if moved == medoids:
+            break
+        medoids = moved
+
+    distances = block_distances(values, values[medoids], metric)
+    labels = np.argmin(distances, axis=1)
+    return pd.DataFrame({
+        'tenant': profiles.index,
+        'cluster': labels,
+        'medoid': profiles.index.to_numpy()[np.asarray(medoids)[labels]],
+        'distance': distances[np.arange(len(values)), labels]
+    })
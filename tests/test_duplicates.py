@@ -0,0 +1,76 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from data_processing import duplicate_entries
+
+# tolerances the removal is checked with, None taking as copies only the
+# entries with the same date
+TOLERANCES = [None, '2s', '1min']
+
+
+def random_raw(rng, entries):
+    # raw entries of two tenants, drawn from a few JSON texts so that most
+    # texts repeat, at whole seconds so that many gaps equal the tolerances
+    infos = [f'{{"device": "d{i % 3}", "temperature": {20 + i}}}' for i in range(8)]
+    raw = pd.DataFrame({
+        'date': pd.Timestamp('2019-03-01') + pd.to_timedelta(np.sort(rng.integers(0, 600, entries)), unit='s'),
+        'info': rng.choice(infos, size=entries),
+        'tenant': rng.choice(['a.csv', 'b.csv'], size=entries)
+    })
+
+    # copies re-sent exactly at the tolerances, and just after them
+    copies = raw.sample(200, random_state=0)
+    delays = pd.to_timedelta(rng.choice([0, 1, 2, 3, 60, 61], size=len(copies)), unit='s')
+    copies = copies.assign(date=copies['date'] + delays)
+    return pd.concat([raw, copies]).sample(frac=1, random_state=1).reset_index(drop=True)
+
+
+def explicit_duplicates(raw, tolerance):
+    # an entry is a copy when an entry of the same tenant and text comes
+    # before it (by date, then by order in the file) at most 'tolerance' earlier
+    window = pd.Timedelta(0) if tolerance is None else pd.Timedelta(tolerance)
+    ordered = raw.sort_values('date', kind='stable')
+    repeated = ordered.duplicated(['tenant', 'info'], keep='first')
+    gaps = ordered.groupby(['tenant', 'info'])['date'].diff()
+    return (repeated & (gaps <= window)).reindex(raw.index).to_numpy()
+
+
+class DuplicateEntriesTest(unittest.TestCase):
+    # the removal by hash and date must find the copies of an explicit check
+
+    @classmethod
+    def setUpClass(cls):
+        cls.raw = random_raw(np.random.default_rng(0), 2000)
+
+    def test_explicit_check(self):
+        for tolerance in TOLERANCES:
+            with self.subTest(tolerance=tolerance):
+                np.testing.assert_array_equal(
+                    duplicate_entries(self.raw, tolerance), explicit_duplicates(self.raw, tolerance))
+
+    def test_same_date(self):
+        np.testing.assert_array_equal(
+            duplicate_entries(self.raw), self.raw.duplicated(['tenant', 'info', 'date']).to_numpy())
+
+    def test_tolerance_boundary(self):
+        # a copy exactly at the tolerance is removed, one a second later is kept;
+        # a chain of copies is removed when each is close enough to the previous one
+        dates = pd.Timestamp('2019-03-01') + pd.to_timedelta([0, 2, 4, 10, 13, 13, 20], unit='s')
+        raw = pd.DataFrame({
+            'date': dates,
+            'info': ['{"device": "d1"}'] * 7,
+            'tenant': ['a.csv'] * 6 + ['b.csv']
+        })
+        np.testing.assert_array_equal(
+            duplicate_entries(raw, '2s'), [False, True, True, False, False, True, False])
+        np.testing.assert_array_equal(
+            duplicate_entries(raw, '3s'), [False, True, True, False, True, True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
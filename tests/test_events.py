@@ -0,0 +1,111 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import data_processing
+from events import build_event_index, state_transitions, time_in_state
+
+# values of the state messages, repeated in a row now and then
+STATES = ['home', 'away', 'sleep']
+
+# values of the feedback messages
+FEEDBACKS = ['cold', 'ok', 'hot']
+
+# periods the durations are checked in, (None, None) being the whole dataset
+PERIODS = [(None, None), ('2019-03-01 12:00', '2019-03-02 06:00'), ('2019-03-02', '2019-03-10')]
+
+
+def random_events(rng, tenant, devices, entries):
+    # state and feedback messages of the devices of a tenant, at distinct whole
+    # minutes, followed by readings of other sensors an hour later, so that
+    # the last value of every stream is still open at the end of the tenant
+    minutes = np.sort(rng.choice(3 * 24 * 60, size=entries, replace=False))
+    dates = pd.Timestamp('2019-03-01', tz='Europe/Madrid') + pd.to_timedelta(minutes, unit='min')
+    feedback = rng.random(entries) < .3
+    events = pd.DataFrame({
+        'tenant': tenant,
+        'device': rng.choice(devices, size=entries),
+        'state': np.where(feedback, None, rng.choice(STATES, size=entries, p=[.6, .3, .1])),
+        'feedback': np.where(feedback, rng.choice(FEEDBACKS, size=entries), None),
+        'temperature': np.nan
+    }, index=pd.DatetimeIndex(dates, name='date'))
+    readings = pd.DataFrame({
+        'tenant': tenant, 'device': devices[0], 'state': None, 'feedback': None, 'temperature': 20.
+    }, index=pd.DatetimeIndex([dates[-1] + pd.Timedelta('1h')], name='date'))
+    return pd.concat([events, readings])
+
+
+def walk(dataframe, kind):
+    # intervals of each stream, walking its messages one by one, in the
+    # format (tenant, device, previous value, value, start, end)
+    intervals = []
+    tenant_ends = dataframe.index.to_series().groupby(dataframe['tenant']).max()
+    messages = dataframe[dataframe[kind].notna()]
+    for (tenant, device), stream in messages.groupby(['tenant', 'device']):
+        previous, current, start = None, None, None
+        for date, value in stream[kind].items():
+            if value == current:
+                continue
+            if current is not None:
+                intervals.append((tenant, device, previous, current, start, date))
+            previous, current, start = current, value, date
+        intervals.append((tenant, device, previous, current, start, tenant_ends[tenant]))
+    return pd.DataFrame(intervals, columns=['tenant', 'device', 'from', 'to', 'start', 'end'])
+
+
+class EventIndexTest(unittest.TestCase):
+    # the durations of the event index must be those of a walk over the messages
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        cls.dataframe = pd.concat([
+            random_events(rng, 'a.csv', ['d1', 'd2'], 600),
+            random_events(rng, 'b.csv', ['d3'], 300)
+        ]).sort_index(kind='stable')
+        data_processing.event_index = build_event_index(cls.dataframe)
+
+    @classmethod
+    def tearDownClass(cls):
+        data_processing.event_index = None
+
+    def test_time_in_state(self):
+        for kind, values in [('state', STATES), ('feedback', FEEDBACKS)]:
+            intervals = walk(self.dataframe, kind)
+            for start, end in PERIODS:
+                lower = intervals['start'] if start is None else np.maximum(
+                    intervals['start'], pd.Timestamp(start, tz='Europe/Madrid'))
+                upper = intervals['end'] if end is None else np.minimum(
+                    intervals['end'], pd.Timestamp(end, tz='Europe/Madrid'))
+                durations = (upper - lower).clip(lower=pd.Timedelta(0))
+                for value in values:
+                    with self.subTest(kind=kind, value=value, start=start, end=end):
+                        expected = durations[intervals['to'] == value].groupby(
+                            [intervals['tenant'], intervals['device']]).sum()
+                        result = time_in_state(value, start, end, kind)
+                        expected = expected.reindex(result.index, fill_value=pd.Timedelta(0))
+                        pd.testing.assert_series_equal(result, expected, check_names=False)
+
+    def test_state_transitions(self):
+        for kind in ['state', 'feedback']:
+            intervals = walk(self.dataframe, kind)
+            intervals = intervals[intervals['from'].notna()].assign(
+                duration=intervals['end'] - intervals['start'])
+            for start, end in PERIODS:
+                with self.subTest(kind=kind, start=start, end=end):
+                    selected = intervals
+                    if start is not None:
+                        selected = selected[selected['start'] >= pd.Timestamp(start, tz='Europe/Madrid')]
+                    if end is not None:
+                        selected = selected[selected['start'] < pd.Timestamp(end, tz='Europe/Madrid')]
+                    expected = selected.groupby(['tenant', 'device', 'from', 'to']).agg(
+                        count=('duration', 'size'), median=('duration', 'median'), total=('duration', 'sum'))
+                    pd.testing.assert_frame_equal(state_transitions(start, end, kind), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
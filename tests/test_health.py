@@ -0,0 +1,97 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from health import (BATTERY_DEPLETED, BATTERY_FIT_DAYS, BATTERY_FIT_MIN_DAYS, DEVICE_KEYS,
+                    LINKQUALITY_QUANTILES, battery_depletion, daily_device_health, devices_at_risk)
+
+# devices with readings, in the format (tenant, device, readings, battery drained per day)
+DEVICES = [('a.csv', 'd1', 600, .8), ('a.csv', 'd2', 300, 0), ('b.csv', 'd3', 400, 2.5), ('b.csv', 'd4', 40, -.1)]
+
+# device with a single reading, whose battery slope is undefined
+SINGLE = ('b.csv', 'd5')
+
+
+def random_readings(rng, tenant, device, readings, drain):
+    # battery and link quality readings of a device over 45 days, each reading
+    # having one or both of them, mixed with readings of other sensors
+    days = np.sort(rng.random(readings) * 45)
+    battery = np.round(95 - drain * days + rng.normal(0, 1, readings))
+    linkquality = rng.integers(0, 255, readings).astype(float)
+    kind = rng.choice(3, size=readings, p=[.4, .3, .3])
+    return pd.DataFrame({
+        'tenant': tenant,
+        'device': device,
+        'battery': np.where(kind == 1, np.nan, battery),
+        'linkquality': np.where(kind == 2, np.nan, linkquality),
+        'temperature': np.where(rng.random(readings) < .2, 20., np.nan)
+    }, index=pd.DatetimeIndex(pd.Timestamp('2019-02-01', tz='Europe/Madrid') +
+                              pd.to_timedelta(days, unit='d'), name='date'))
+
+
+class DeviceHealthTest(unittest.TestCase):
+    # the health of the devices must be the one of pandas' grouped statistics and np.polyfit
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        readings = [random_readings(rng, *device) for device in DEVICES]
+        single = random_readings(rng, *SINGLE, 1, 0).assign(battery=50., linkquality=100.)
+        others = random_readings(rng, 'a.csv', 'd6', 50, 0).assign(battery=np.nan, linkquality=np.nan)
+        cls.dataframe = pd.concat(readings + [single, others]).sort_index(kind='stable')
+        cls.health = daily_device_health(cls.dataframe)
+
+    def test_daily_health(self):
+        readings = self.dataframe[self.dataframe['battery'].notna() | self.dataframe['linkquality'].notna()]
+        groups = [readings['tenant'], readings['device'], readings.index.floor('d').rename('date')]
+        with_battery = readings[readings['battery'].notna()]
+        battery = with_battery['battery']
+        battery_groups = [with_battery['tenant'], with_battery['device'],
+                          with_battery.index.floor('d').rename('date')]
+        expected = pd.DataFrame({
+            'readings': readings.groupby(groups).size(),
+            'battery last': battery.groupby(battery_groups).last(),
+            'battery min': battery.groupby(battery_groups).min(),
+            'battery mean': battery.groupby(battery_groups).mean()
+        })
+        linkquality = readings['linkquality'].groupby(groups)
+        for quantile in LINKQUALITY_QUANTILES:
+            expected[f'linkquality p{quantile * 100:.0f}'] = linkquality.quantile(quantile)
+        pd.testing.assert_frame_equal(self.health, expected, check_names=False)
+        self.assertNotIn('d6', self.health.index.get_level_values('device'))
+
+    def test_battery_slope(self):
+        depletion = battery_depletion(self.health).set_index(DEVICE_KEYS)
+        for (tenant, device), daily in self.health['battery mean'].dropna().groupby(level=DEVICE_KEYS):
+            with self.subTest(device=device):
+                dates = daily.index.get_level_values('date')
+                x = (dates - dates[-1]) / pd.Timedelta('1d')
+                fitted = x > -BATTERY_FIT_DAYS
+                result = depletion.loc[(tenant, device)]
+                self.assertEqual(result['fitted days'], fitted.sum())
+                if fitted.sum() < BATTERY_FIT_MIN_DAYS:
+                    self.assertTrue(np.isnan(result['slope (%/day)']))
+                    self.assertTrue(np.isnan(result['days left']))
+                    continue
+                slope, level = np.polyfit(x[fitted], daily.to_numpy()[fitted], 1)
+                self.assertAlmostEqual(result['slope (%/day)'], slope)
+                if slope < 0:
+                    self.assertAlmostEqual(result['days left'], max((BATTERY_DEPLETED - level) / slope, 0))
+                else:
+                    self.assertTrue(np.isnan(result['days left']))
+
+    def test_single_reading(self):
+        depletion = battery_depletion(self.health).set_index(DEVICE_KEYS).loc[SINGLE]
+        self.assertEqual(depletion['fitted days'], 1)
+        self.assertTrue(np.isnan(depletion['slope (%/day)']))
+        self.assertTrue(pd.isna(depletion['depletion']))
+        at_risk = devices_at_risk(health=self.health).set_index(DEVICE_KEYS)
+        self.assertNotIn(SINGLE, at_risk.index)
+
+
+if __name__ == "__main__":
+    unittest.main()
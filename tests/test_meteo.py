@@ -0,0 +1,52 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from meteo import latest_meteo_entries
+
+# tolerances the join is checked with
+TOLERANCES = ['5min', '1h']
+
+
+def random_entries(rng, tenants, entries, start):
+    # entries of the tenants at whole minutes, so that some indoor and
+    # meteorology entries have the same time, in the format of the dataframe
+    minutes = rng.choice(3 * 24 * 60, size=entries, replace=False)
+    return pd.DataFrame({
+        'tenant': rng.choice(tenants, size=entries),
+        'position': np.arange(entries)
+    }, index=pd.DatetimeIndex(pd.Timestamp(start) + pd.to_timedelta(np.sort(minutes), unit='min'), name='date'))
+
+
+class LatestMeteoEntriesTest(unittest.TestCase):
+    # the search over all the tenants must find the entries of pandas' as-of join
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        # the indoor readings start before the first meteorology entry, and
+        # the last tenant has no meteorology entries
+        cls.indoor = random_entries(rng, ['a.csv', 'b.csv', 'c.csv', 'd.csv'], 3000, '2019-03-01')
+        cls.meteo = random_entries(rng, ['a.csv', 'b.csv', 'c.csv'], 400, '2019-03-01 06:00')
+
+    def test_merge_asof(self):
+        for tolerance in TOLERANCES:
+            with self.subTest(tolerance=tolerance):
+                order, matches = latest_meteo_entries(self.indoor, self.meteo, pd.Timedelta(tolerance).value)
+
+                expected = pd.merge_asof(
+                    self.indoor.reset_index(), self.meteo.reset_index().rename(columns={'position': 'meteo'}),
+                    on='date', by='tenant', direction='backward', tolerance=pd.Timedelta(tolerance))
+                expected = expected.set_index('position')['meteo'].fillna(-1).astype(np.int64)
+
+                np.testing.assert_array_equal(matches, expected.to_numpy()[order])
+                self.assertTrue((matches[self.indoor['tenant'].to_numpy()[order] == 'd.csv'] == -1).all())
+                self.assertTrue((matches[self.indoor.index.asi8[order] < self.meteo.index.asi8.min()] == -1).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from occupancy import ILLUMINANCE_CHANGE, OCCUPANCY_HOLDS, merge_intervals, occupancy_intervals, presence_buckets
+
+# timezone of the entries, and start of the month the random entries cross into
+TIMEZONE = 'Europe/Madrid'
+MONTH_END = pd.Timestamp('2019-05-01', tz=TIMEZONE)
+
+
+def readings(rows):
+    # entries in the format (tenant, time, device, occupancy, contact, illuminance)
+    frame = pd.DataFrame(rows, columns=['tenant', 'date', 'device', 'occupancy', 'contact', 'illuminance'])
+    frame['date'] = pd.DatetimeIndex(frame['date']).tz_localize(TIMEZONE)
+    return frame.set_index('date')
+
+
+def random_readings(rng, tenant, entries):
+    # readings of a motion sensor (movement and light) and a door sensor of a
+    # tenant at whole minutes over the two days around the end of the month
+    minutes = np.sort(rng.choice(2 * 24 * 60, size=entries, replace=False))
+    door = rng.random(entries) < .3
+    return pd.DataFrame({
+        'tenant': tenant,
+        'device': np.where(door, 'door', 'motion'),
+        'occupancy': np.where(door, None, rng.random(entries) < .2),
+        'contact': np.where(door, rng.random(entries) < .5, None),
+        'illuminance': np.where(door, np.nan, rng.choice([0, 30, 60, 200], size=entries).astype(float))
+    }, index=pd.DatetimeIndex(MONTH_END - pd.Timedelta('1d') + pd.to_timedelta(minutes, unit='min'), name='date'))
+
+
+def minute_intervals(dataframe, holds=OCCUPANCY_HOLDS):
+    # occupied and unoccupied intervals of each tenant, marking minute by minute
+    # the hold time after each event, in the format of occupancy_intervals
+    found = []
+    for tenant, entries in dataframe.groupby('tenant'):
+        first, last = entries.index.min(), entries.index.max()
+        occupied = np.zeros(int((last - first) / pd.Timedelta('1min')), dtype=bool)
+
+        def hold(times, kind):
+            for time in times:
+                start = int((time - first) / pd.Timedelta('1min'))
+                occupied[start:start + int(pd.Timedelta(holds[kind]) / pd.Timedelta('1min'))] = True
+        hold(entries.index[entries['occupancy'].eq(True)], 'movement')
+        for device, sensor in entries.groupby('device'):
+            contact = sensor['contact'].dropna()
+            hold(contact.index[1:][contact.to_numpy()[1:] != contact.to_numpy()[:-1]], 'door')
+            light = sensor['illuminance'].dropna()
+            hold(light.index[1:][np.abs(np.diff(light.to_numpy())) >= ILLUMINANCE_CHANGE], 'illuminance')
+
+        changes = np.flatnonzero(np.r_[True, occupied[1:] != occupied[:-1]])
+        bounds = np.r_[changes, len(occupied)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            found.append((tenant, first + pd.Timedelta(minutes=int(start)),
+                          first + pd.Timedelta(minutes=int(end)), occupied[start]))
+    return pd.DataFrame(found, columns=['tenant', 'start', 'end', 'occupied'])
+
+
+class OccupancyIntervalsTest(unittest.TestCase):
+    # the occupied intervals merged with a running maximum must be the ones
+    # of marking the hold time of each event minute by minute
+
+    def test_merge_intervals(self):
+        # overlapping, adjacent, contained and separate intervals of two groups
+        groups, starts, ends = merge_intervals(
+            np.array([0, 0, 0, 0, 1, 1, 0]),
+            np.array([10, 15, 30, 50, 10, 20, 12]),
+            np.array([20, 30, 40, 60, 20, 25, 18]))
+        np.testing.assert_array_equal(groups, [0, 0, 1])
+        np.testing.assert_array_equal(starts, [10, 50, 10])
+        np.testing.assert_array_equal(ends, [40, 60, 25])
+
+    def test_sources(self):
+        # movement, door and light events overlapping and following each other
+        # without a gap, a light change too small to count, and a movement whose
+        # hold time is cut at the last entry of its tenant
+        dataframe = readings([
+            ('a.csv', '2019-04-29 09:00', 'door', None, True, np.nan),
+            ('a.csv', '2019-04-29 10:00', 'motion', True, None, 0.),
+            ('a.csv', '2019-04-29 10:20', 'door', None, False, np.nan),
+            ('a.csv', '2019-04-29 10:35', 'motion', False, None, 100.),
+            ('a.csv', '2019-04-29 12:00', 'motion', True, None, 100.),
+            ('a.csv', '2019-04-29 12:30', 'door', None, True, np.nan),
+            ('a.csv', '2019-04-29 12:40', 'motion', False, None, 130.),
+            ('a.csv', '2019-04-29 14:00', 'motion', False, None, 130.),
+            ('b.csv', '2019-04-29 13:00', 'door', None, False, np.nan),
+            ('b.csv', '2019-04-29 13:50', 'motion', True, None, 10.),
+            ('b.csv', '2019-04-29 14:00', 'motion', False, None, 10.),
+        ])
+        expected = pd.DataFrame([
+            ('a.csv', '09:00', '10:00', False),
+            ('a.csv', '10:00', '10:45', True),
+            ('a.csv', '10:45', '12:00', False),
+            ('a.csv', '12:00', '12:45', True),
+            ('a.csv', '12:45', '14:00', False),
+            ('b.csv', '13:00', '13:50', False),
+            ('b.csv', '13:50', '14:00', True),
+        ], columns=['tenant', 'start', 'end', 'occupied'])
+        for column in ['start', 'end']:
+            expected[column] = pd.DatetimeIndex('2019-04-29 ' + expected[column]).tz_localize(TIMEZONE)
+        intervals = occupancy_intervals(dataframe)
+        pd.testing.assert_frame_equal(intervals, expected, check_dtype=False)
+        pd.testing.assert_frame_equal(minute_intervals(dataframe), expected, check_dtype=False)
+
+    def test_random_events(self):
+        rng = np.random.default_rng(0)
+        dataframe = pd.concat([random_readings(rng, tenant, 400) for tenant in ['a.csv', 'b.csv', 'c.csv']])
+        dataframe = dataframe.sort_index(kind='stable')
+        pd.testing.assert_frame_equal(occupancy_intervals(dataframe), minute_intervals(dataframe),
+                                      check_dtype=False)
+
+    def test_partition_end(self):
+        # the presence of the months of a partitioned dataset, each cut at the end
+        # of its month, must be the one of the whole dataset, but for the hour
+        # after the end of the month (before the first entry of the next month,
+        # and the rest of the hold times crossing into it, are not known there)
+        rng = np.random.default_rng(1)
+        dataframe = pd.concat([random_readings(rng, tenant, 400) for tenant in ['a.csv', 'b.csv']])
+        dataframe = dataframe.sort_index(kind='stable')
+        before = dataframe[dataframe.index < MONTH_END]
+        after = dataframe[dataframe.index >= MONTH_END]
+
+        crossing = occupancy_intervals(dataframe)
+        self.assertTrue(((crossing['start'] < MONTH_END) & (crossing['end'] > MONTH_END)).any())
+        intervals = occupancy_intervals(before, end=MONTH_END)
+        self.assertTrue((intervals.groupby('tenant')['end'].max() == MONTH_END).all())
+
+        whole = presence_buckets(dataframe)
+        partitioned = pd.concat([presence_buckets(before, end=MONTH_END), presence_buckets(after)])
+        partitioned = partitioned.groupby(level=['tenant', 'variable', 'date']).sum()
+        dates = whole.index.get_level_values('date')
+        kept = dates != MONTH_END
+        pd.testing.assert_frame_equal(
+            partitioned.loc[whole.index[kept], ['count', 'sum']], whole.loc[kept, ['count', 'sum']])
+        self.assertEqual(len(partitioned), len(whole))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+import data_processing
+from data_processing import SKETCH_BIN_WIDTHS, build_pyramid, histogram_quantiles, merged_histograms, setup
+from quantiles import GROUPS, QUANTILES, exact_quantiles
+from synthetic import write_synthetic_dataset
+
+
+class QuantilesTest(unittest.TestCase):
+    # the quantiles of the histogram sketches, on the synthetic dataset
+
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as dataset_path:
+            write_synthetic_dataset(dataset_path, days=30)
+            setup(dataset_path)
+        data_processing.get_pyramid()
+
+    @classmethod
+    def tearDownClass(cls):
+        data_processing.df = None
+        data_processing.pyramid = None
+
+    def test_accuracy(self):
+        # the exact quantile lies between two readings; the quantile of the
+        # sketch must fall in the bins of those readings (it may be further
+        # than a bin from the exact one when the readings are far apart)
+        for variable, width in SKETCH_BIN_WIDTHS.items():
+            for name, by in GROUPS.items():
+                with self.subTest(variable=variable, group=name):
+                    sketch = histogram_quantiles(merged_histograms(variable, by), variable, QUANTILES)
+                    lower = exact_quantiles(variable, by, 'lower')
+                    higher = exact_quantiles(variable, by, 'higher')
+                    inside = (sketch >= np.floor(lower / width) * width - 1e-9) & (
+                        sketch <= (np.floor(higher / width) + 1) * width + 1e-9)
+                    self.assertTrue(inside.to_numpy().all(),
+                                    f'quantiles of \'{variable}\' by {name} are outside the bins of the readings')
+
+    def test_merge(self):
+        # histograms built from separate shards of the tenants, merged by adding
+        # their counts, must be the histograms built from the whole dataset
+        dataframe = data_processing.df
+        tenants = dataframe['tenant'].unique()
+        shards = [dataframe[dataframe['tenant'].isin(tenants[i::3])] for i in range(3)]
+        merged = pd.concat([build_pyramid(shard)['hist'] for shard in shards])
+        merged = merged.groupby(level=['tenant', 'variable', 'date', 'bin']).sum()
+        pd.testing.assert_frame_equal(merged, data_processing.get_pyramid()['hist'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+import charts
+import data_processing
+from charts import ROLLING_WINDOWS, rolling_average
+from data_processing import rolling_buckets, setup
+from synthetic import write_synthetic_dataset
+
+# days of the dataset of the charts, shorter than the longest window
+SHORT_DAYS = 10
+
+
+def random_buckets(rng, tenants, hours):
+    # hourly statistics of the tenants, with hours missing at random, in the
+    # format of the levels of the pyramid
+    buckets = []
+    for tenant in tenants:
+        dates = pd.date_range('2019-03-01', periods=hours, freq='h', tz='Europe/Madrid')
+        dates = dates[rng.random(hours) < .7]
+        count = rng.integers(1, 20, len(dates)).astype(float)
+        buckets.append(pd.DataFrame({
+            'count': count,
+            'sum': count * rng.normal(21, 2, len(dates)),
+            'sumsq': count * rng.normal(450, 20, len(dates))
+        }, index=pd.MultiIndex.from_arrays(
+            [np.full(len(dates), tenant, dtype=object), np.full(len(dates), 'temperature', dtype=object), dates],
+            names=['tenant', 'variable', 'date'])))
+    return pd.concat(buckets)
+
+
+class RollingBucketsTest(unittest.TestCase):
+    # the windows from cumulative sums must be the ones of pandas' time-based rolling
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        cls.stats = random_buckets(rng, ['a.csv', 'b.csv', 'c.csv'], 60 * 24)
+
+    def test_tenant_windows(self):
+        for window in ROLLING_WINDOWS:
+            with self.subTest(window=window):
+                expected = pd.concat([
+                    group.droplevel(['tenant', 'variable']).rolling(window).sum().set_index(group.index)
+                    for _, group in self.stats.groupby(level=['tenant', 'variable'])
+                ])
+                pd.testing.assert_frame_equal(rolling_buckets(self.stats, window), expected)
+
+    def test_pooled_windows(self):
+        pooled = self.stats.groupby(level='date').sum()
+        for window in ROLLING_WINDOWS:
+            with self.subTest(window=window):
+                pd.testing.assert_frame_equal(rolling_buckets(pooled, window), pooled.rolling(window).sum())
+
+
+class ShortRollingAverageTest(unittest.TestCase):
+    # the rolling charts of a dataset shorter than the longest window
+
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as dataset_path:
+            write_synthetic_dataset(dataset_path, days=SHORT_DAYS, files=data_processing.DEFAULT_FILES[:2])
+            setup(dataset_path)
+        data_processing.get_pyramid()
+
+    @classmethod
+    def tearDownClass(cls):
+        data_processing.df = None
+        data_processing.pyramid = None
+
+    def test_windows_longer_than_data(self):
+        # the windows longer than the data are left out, the others drawn
+        drawn = [window for window in ROLLING_WINDOWS if pd.Timedelta(window) <= pd.Timedelta(f'{SHORT_DAYS}d')]
+        for with_std in [False, True]:
+            with self.subTest(with_std=with_std):
+                plt.figure()
+                ax = rolling_average('temperature', 'Temperature (ºC)', with_std)
+                self.assertEqual(len(ax.get_lines()), len(drawn))
+                self.assertEqual(list(charts.last_aggregate.columns),
+                                 [f'{window} {statistic}' for window in drawn for statistic in ['mean', 'std']])
+                plt.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
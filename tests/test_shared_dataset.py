@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+import data_processing
+from data_processing import attach_dataset, publish_dataset, setup
+from gaps import detect_gaps, stream_coverage
+from synthetic import write_synthetic_dataset
+
+
+class SharedDatasetTest(unittest.TestCase):
+    # the streams of a published dataset (categorical columns, where the meteo
+    # entries have no device) must be the streams of the dataset loaded by setup()
+
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as dataset_path:
+            write_synthetic_dataset(dataset_path, days=30)
+            setup(dataset_path)
+        cls.loaded = data_processing.df
+        cls.shared_path = tempfile.TemporaryDirectory()
+        publish_dataset(cls.shared_path.name, cls.loaded)
+        cls.attached = attach_dataset(cls.shared_path.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        data_processing.df = None
+        cls.shared_path.cleanup()
+
+    def assert_same(self, loaded, attached):
+        pd.testing.assert_frame_equal(loaded.astype(object), attached.astype(object))
+
+    def test_detect_gaps(self):
+        self.assert_same(detect_gaps(dataframe=self.loaded), detect_gaps(dataframe=self.attached))
+
+    def test_stream_coverage(self):
+        self.assert_same(stream_coverage(dataframe=self.loaded), stream_coverage(dataframe=self.attached))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy.spatial.distance import cdist, jensenshannon
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from similarity import SIMILARITY_METRICS, block_distances, distance_blocks, nearest_neighbours
+
+# largest difference with the distances in double precision, for each metric
+# (the square root of the Jensen-Shannon divergence magnifies the float32
+# rounding of the profiles closest to each other)
+TOLERANCES = {'chi2': 1e-5, 'jensenshannon': 2e-3, 'cosine': 1e-5}
+
+# memory of the blocks checked: one tenant at a time, a few tenants at a
+# time (the last block being shorter) and every tenant at once
+BLOCK_MEMORIES = [1, 3 * 4 * 50 * 3, 2**30]
+
+
+def random_profiles(rng, tenants, bins):
+    # occupancy profiles with empty bins, and pairs of tenants with the same
+    # profile, so that another tenant may be as near as the tenant itself
+    counts = rng.poisson(3, size=(tenants, bins)) * (rng.random((tenants, bins)) < .7)
+    counts[:, 0] += 1
+    counts[1::10] = counts[::10]
+    profiles = pd.DataFrame(counts, index=[f't{i}.csv' for i in range(tenants)], columns=range(bins))
+    return profiles.div(profiles.sum(axis=1), axis=0).astype(np.float32)
+
+
+def chi2_distances(x, y):
+    # sum of (p - q)^2 / (p + q), leaving out the bins empty in both profiles
+    total = x[:, None, :] + y[None, :, :]
+    squares = (x[:, None, :] - y[None, :, :]) ** 2
+    return np.sum(np.divide(squares, total, out=np.zeros_like(total), where=total > 0), axis=2)
+
+
+def scipy_distances(values, metric):
+    values = values.astype(np.float64)
+    if metric == 'chi2':
+        return chi2_distances(values, values)
+    if metric == 'cosine':
+        return cdist(values, values, 'cosine')
+    return np.array([[jensenshannon(p, q, base=2) for q in values] for p in values])
+
+
+class SimilarityTest(unittest.TestCase):
+    # the distances computed bin by bin and block by block must be scipy's
+
+    @classmethod
+    def setUpClass(cls):
+        cls.profiles = random_profiles(np.random.default_rng(0), 50, 24)
+        cls.expected = {metric: scipy_distances(cls.profiles.to_numpy(), metric) for metric in SIMILARITY_METRICS}
+
+    def test_block_distances(self):
+        for metric in SIMILARITY_METRICS:
+            with self.subTest(metric=metric):
+                np.testing.assert_allclose(block_distances(self.profiles, self.profiles, metric),
+                                           self.expected[metric], rtol=0, atol=TOLERANCES[metric])
+
+    def test_distance_blocks(self):
+        for metric in SIMILARITY_METRICS:
+            for memory in BLOCK_MEMORIES:
+                with self.subTest(metric=metric, memory=memory):
+                    blocks = list(distance_blocks(self.profiles, metric, memory))
+                    if memory == 1:
+                        self.assertEqual(len(blocks), len(self.profiles))
+                    self.assertEqual([start for start, _ in blocks],
+                                     list(np.cumsum([0] + [len(block) for _, block in blocks[:-1]])))
+                    np.testing.assert_allclose(np.vstack([block for _, block in blocks]),
+                                               self.expected[metric], rtol=0, atol=TOLERANCES[metric])
+
+    def test_nearest_neighbours(self):
+        for metric in SIMILARITY_METRICS:
+            expected = self.expected[metric].copy()
+            np.fill_diagonal(expected, np.inf)
+            expected = np.sort(expected, axis=1)[:, :5]
+            for memory in BLOCK_MEMORIES:
+                with self.subTest(metric=metric, memory=memory):
+                    neighbours = nearest_neighbours(self.profiles, metric, 5, memory)
+                    self.assertFalse((neighbours['neighbour'] == neighbours['tenant']).any())
+                    self.assertEqual(list(neighbours['tenant'].unique()), list(self.profiles.index))
+                    distances = neighbours['distance'].to_numpy().reshape(len(self.profiles), 5)
+                    self.assertTrue((np.diff(distances, axis=1) >= 0).all())
+                    np.testing.assert_allclose(distances, expected, rtol=0, atol=TOLERANCES[metric])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+import data_processing
+from data_processing import OCCUPANCY_SOURCES, build_pyramid, is_movement, setup, split_pyramid
+from plot import TENANT_CHARTS, save_tenant_charts
+from synthetic import write_synthetic_dataset
+
+# days of movement kept for the sparse tenant, less than a week
+SPARSE_DAYS = 3
+
+
+class TenantChartsTest(unittest.TestCase):
+    # every chart of a tenant whose movement covers only part of a week
+
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as dataset_path:
+            write_synthetic_dataset(dataset_path, days=14, files=data_processing.DEFAULT_FILES[:2])
+            setup(dataset_path)
+        dataframe = data_processing.df
+        cls.tenant = data_processing.FILES[0]
+        late = dataframe.index >= dataframe.index.min() + pd.Timedelta(f'{SPARSE_DAYS}d')
+        cls.dataframe = dataframe[~((dataframe['tenant'] == cls.tenant) & is_movement(dataframe) & late)]
+
+    @classmethod
+    def tearDownClass(cls):
+        data_processing.OCCUPANCY_SOURCE = 'movement'
+        data_processing.df = None
+        data_processing.pyramid = None
+
+    def test_sparse_occupancy(self):
+        for source in OCCUPANCY_SOURCES:
+            with self.subTest(source=source), tempfile.TemporaryDirectory() as save_to_path:
+                data_processing.OCCUPANCY_SOURCE = source
+                data_processing.pyramid = build_pyramid(self.dataframe)
+                tenant_pyramid = split_pyramid()[self.tenant]
+                save_tenant_charts(self.tenant, tenant_pyramid, save_to_path, True, None, None, source)
+                for file_name, _, _ in TENANT_CHARTS:
+                    self.assertTrue(os.path.exists(os.path.join(save_to_path, file_name)), file_name)
+
+
+if __name__ == "__main__":
+    unittest.main()
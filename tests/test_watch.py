@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+import data_processing
+from data_processing import build_pyramid, setup
+from synthetic import write_synthetic_dataset
+from watch import read_appended_rows, update_aggregates
+
+# delay of the copies re-sent by the synthetic devices
+RESENT_TOLERANCE = '2s'
+
+# shares of the rows of the file at which it is appended
+SPLITS = [.5, .75]
+
+# variables weighted by the time each reading held, which is only known
+# inside each group of new rows (see the README)
+TIME_WEIGHTED = (' comfort', ' above', ' below', 'presence')
+
+
+class WatchTest(unittest.TestCase):
+    # the pyramid updated with the rows appended to a file must be the
+    # pyramid built from the whole file, with the same copies removed
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fi = data_processing.DEFAULT_FILES[0]
+        with tempfile.TemporaryDirectory() as dataset_path:
+            write_synthetic_dataset(dataset_path, days=6, files=[cls.fi], resent=.05)
+            with open(os.path.join(dataset_path, cls.fi)) as f:
+                cls.lines = f.readlines()
+
+    @classmethod
+    def tearDownClass(cls):
+        data_processing.df = None
+        data_processing.pyramid = None
+
+    def split_positions(self):
+        # split the rows right before a re-sent copy, so that the copy and
+        # the entry it repeats are read in different checks
+        infos = [line.split(',', 1)[1] for line in self.lines]
+        positions = []
+        for share in SPLITS:
+            position = int(len(self.lines) * share)
+            while infos[position] != infos[position - 1]:
+                position += 1
+            positions.append(position)
+        return positions
+
+    def test_appended_rows(self):
+        positions = self.split_positions()
+        with tempfile.TemporaryDirectory() as dataset_path:
+            file_path = os.path.join(dataset_path, self.fi)
+            with open(file_path, 'w') as f:
+                f.writelines(self.lines[:positions[0]])
+            setup(dataset_path, duplicate_tolerance=RESENT_TOLERANCE)
+            data_processing.get_pyramid()
+
+            offset = data_processing.loaded_sizes[self.fi]
+            for start, end in zip(positions, positions[1:] + [len(self.lines)]):
+                with open(file_path, 'a') as f:
+                    f.writelines(self.lines[start:end])
+                rows, offset = read_appended_rows(file_path, offset)
+                update_aggregates([rows.assign(tenant=self.fi)], True, RESENT_TOLERANCE)
+            merged = data_processing.pyramid
+            entries = len(data_processing.df)
+
+            setup(dataset_path, duplicate_tolerance=RESENT_TOLERANCE)
+            rebuilt = build_pyramid()
+
+        self.assertEqual(entries, len(data_processing.df))
+        for level in ['h', 'd', 'm', 'hist']:
+            with self.subTest(level=level):
+                variables = rebuilt[level].index.get_level_values('variable')
+                kept = ~variables.str.endswith(TIME_WEIGHTED)
+                pd.testing.assert_frame_equal(
+                    merged[level].loc[rebuilt[level].index[kept]], rebuilt[level][kept], check_dtype=False)
+                self.assertEqual(len(merged[level]), len(rebuilt[level]))
+
+
+if __name__ == "__main__":
+    unittest.main()
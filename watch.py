@@ -0,0 +1,116 @@
+import asyncio
+import io
+import os
+import time
+
+import pandas as pd
+
+import data_processing
+from data_processing import (DUPLICATE_TOLERANCE, FILES, build_pyramid, decode_entries, duplicate_entries, get_pyramid,
+                             merge_pyramids, recent_entries)
+
+# seconds between two checks of the sizes of the dataset files
+WATCH_INTERVAL = 1
+
+# seconds new entries wait for others before the aggregates are updated and
+# published, so that a burst of entries is published once
+WATCH_DEBOUNCE = 5
+
+
+################################################################
+#                        WATCH MODE                            #
+################################################################
+# - file_sizes                                                 #
+# - read_appended_rows                                         #
+# - update_aggregates                                          #
+# - watch_dataset                                              #
+################################################################
+
+def file_sizes(datasetdir):
+    # size of each dataset file kept as is (compressed files cannot be followed)
+    sizes = {}
+    for fi in FILES:
+        file_path = os.path.join(datasetdir, fi)
+        if os.path.exists(file_path):
+            sizes[fi] = os.path.getsize(file_path)
+    return sizes
+
+
+def read_appended_rows(file_path, offset):
+    # complete rows written after the offset and the offset after the last of
+    # them; a row still being written is left for the next check
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        appended = f.read()
+    end = appended.rfind(b'\n') + 1
+    if end == 0:
+        return None, offset
+    rows = pd.read_csv(io.BytesIO(appended[:end]), names=['date', 'info'], parse_dates=['date'])
+    return rows, offset + end
+
+
+def update_aggregates(batches, deduplicate=True, duplicate_tolerance=DUPLICATE_TOLERANCE):
+    raw = pd.concat(batches, ignore_index=True)
+    if deduplicate:
+        # the new rows are checked together with the last rows already
+        # aggregated, so that a copy re-sent across two checks is removed
+        # as setup() removes it
+        previous = data_processing.last_entries
+        if previous is None:
+            previous = raw.iloc[:0]
+        checked = pd.concat([previous, raw], ignore_index=True)
+        duplicated = duplicate_entries(checked, duplicate_tolerance)[len(previous):]
+        data_processing.last_entries = recent_entries(checked, duplicate_tolerance)
+        raw = raw[~duplicated].reset_index(drop=True)
+
+    # the new entries, with the same columns as the loaded ones
+    # (so that the selections of the sensors find every field)
+    entries = decode_entries(raw).reindex(columns=data_processing.df.columns)
+
+    # only the new entries are aggregated; their buckets are merged into the
+    # pyramid, adding to the buckets (e.g. the current hour) that already exist
+    data_processing.pyramid = merge_pyramids(get_pyramid(), build_pyramid(entries))
+    data_processing.df = pd.concat([data_processing.df, entries])
+    data_processing.event_index = None
+    return len(entries)
+
+
+async def watch_dataset(datasetdir, publish, interval=WATCH_INTERVAL, debounce=WATCH_DEBOUNCE, deduplicate=True,
+                        duplicate_tolerance=DUPLICATE_TOLERANCE):
+    loop = asyncio.get_running_loop()
+
+    # the rows already in the files when setup() read them were loaded,
+    # so the files are followed from the sizes they had then
+    offsets = dict(data_processing.loaded_sizes)
+    batches = []
+    first_pending = None
+
+    while True:
+        await asyncio.sleep(interval)
+
+        # rows appended to each file since the last check
+        for fi, size in file_sizes(datasetdir).items():
+            offset = offsets.get(fi, 0)
+            if size < offset:
+                # the file was truncated or replaced: it is followed from its new end
+                print(f"\'{fi}\' is smaller than before, following it from its end")
+                offsets[fi] = size
+            elif size > offset:
+                rows, offsets[fi] = await loop.run_in_executor(
+                    None, read_appended_rows, os.path.join(datasetdir, fi), offset)
+                if rows is not None:
+                    batches.append(rows.assign(tenant=fi))
+                    first_pending = first_pending or time.monotonic()
+
+        # the aggregates are updated and published once the first
+        # pending rows waited for the others during the debounce
+        if batches and time.monotonic() - first_pending >= debounce:
+            start = time.monotonic()
+            added = await loop.run_in_executor(None, update_aggregates, batches, deduplicate, duplicate_tolerance)
+            # the charts are drawn in this thread, since pyplot is not thread-safe
+            publish()
+            print(f"added {added} entries from {len({batch['tenant'][0] for batch in batches})} files, "
+                  f"published in {time.monotonic() - start:.1f}s "
+                  f"({time.monotonic() - first_pending:.1f}s after the first of them was found)")
+            batches = []
+            first_pending = None